@@ -0,0 +1,44 @@
+"""批量生成的多核扩展性基准。
+
+生成一组相同参数的路线，工作进程数从 1 按倍数递增到CPU核心数，输出每秒点数
+和相对单进程的加速比。
+
+用法::
+
+    python benchmarks/bench_batch.py --routes 16 --laps 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campus_run.batch import DEFAULTS, run_batch
+
+POINTS = [(27.918553, 120.681379), (27.919372, 120.681212), (27.919234, 120.680402)]
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成扩展性基准 / Batch generation scaling benchmark")
+    parser.add_argument('--routes', type=int, default=16, help="路线数量 / Number of routes")
+    parser.add_argument('--laps', type=int, default=5, help="每条路线的圈数 / Laps per route")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        specs = [{**DEFAULTS, 'points': POINTS, 'round_count': args.laps,
+                  'output': os.path.join(directory, f'route{i}.gpx')} for i in range(args.routes)]
+        baseline = None
+        workers = 1
+        while True:
+            summary = run_batch(specs, workers, base_seed=0)
+            baseline = baseline or summary['seconds']
+            summary['speedup'] = baseline / summary['seconds']
+            print(json.dumps(summary), flush=True)
+            if workers >= args.max_workers:
+                break
+            workers = min(workers * 2, args.max_workers)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""后台服务端到端测试与客户端接入延迟基准。
+
+以假设备启动后台服务子进程，依次测量：客户端接入（连接 + ping）延迟、init 耗时、
+播放过程中 status 与 stop 命令的响应延迟（不应排在播放之后），并确认订阅连接
+能收到播放进度事件，最后关闭服务。
+
+用法::
+
+    python benchmarks/bench_daemon.py --attach 50
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from campus_run.daemon import DaemonClient
+from campus_run.generate import write_gpx
+
+POINTS = [(27.918553, 120.681379), (27.919372, 120.681212), (27.919234, 120.680402)]
+
+def wait_for_daemon(state_file, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client = DaemonClient.find(state_file)
+        if client is not None:
+            return client
+        time.sleep(0.05)
+    raise RuntimeError("后台服务未能启动 / Daemon did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description="后台服务基准 / Daemon benchmark")
+    parser.add_argument('--attach', type=int, default=50, help="测量接入延迟的次数 / Attach attempts to time")
+    parser.add_argument('--rate', type=float, default=50, help="播放频率 / Playback rate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        state_file = os.path.join(directory, 'daemon.json')
+        track = os.path.join(directory, 'route.gpx')
+        os.chdir(directory)  # 播放进度文件写在客户端工作目录中
+        random.seed(0)
+        with open(track, 'w') as f:
+            write_gpx(f, POINTS, 1, 0.5, 20)
+
+        process = subprocess.Popen([sys.executable, '-m', 'campus_run.daemon', '--fake', '--state-file', state_file],
+                                   cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        ok = False
+        try:
+            control = wait_for_daemon(state_file)
+
+            samples = []
+            for _ in range(args.attach):
+                begin = time.perf_counter()
+                client = DaemonClient(state_file)
+                client.call('ping')
+                samples.append(time.perf_counter() - begin)
+                client.close()
+            samples.sort()
+            print(json.dumps({'name': 'attach', 'count': len(samples), 'median_ms': samples[len(samples) // 2] * 1000,
+                              'max_ms': samples[-1] * 1000}), flush=True)
+
+            begin = time.perf_counter()
+            control.run('init', lambda text: None)
+            print(json.dumps({'name': 'init', 'seconds': time.perf_counter() - begin}), flush=True)
+
+            events = []
+            subscriber = DaemonClient(state_file)
+            threading.Thread(target=lambda: events.extend(subscriber.events()), daemon=True).start()
+
+            output = []
+            player = threading.Thread(target=lambda: control.run(f'start {track} --rate {args.rate:g}', output.append))
+            begin = time.perf_counter()
+            player.start()
+            time.sleep(1.0)
+
+            side = DaemonClient(state_file)
+            status_begin = time.perf_counter()
+            side.run('status', lambda text: None)
+            status_latency = time.perf_counter() - status_begin
+            time.sleep(5.5)  # 至少经过一次进度输出（每5秒）
+            stop_begin = time.perf_counter()
+            side.run('stop', lambda text: None)
+            player.join()
+            stop_latency = time.perf_counter() - stop_begin
+            side.close()
+
+            playback = time.perf_counter() - begin
+            subscriber.close()
+            progress = sum(1 for event, data in events if event == 'output' and 'Sent' in data)
+            print(json.dumps({'name': 'playback', 'seconds': playback, 'status_during_playback_ms': status_latency * 1000,
+                              'stop_ms': stop_latency * 1000, 'output_chunks': len(output),
+                              'progress_events': progress}), flush=True)
+
+            control.call('shutdown')
+            control.close()
+            process.wait(timeout=10)
+            ok = progress > 0 and status_latency < 1.0 and stop_latency < 1.0 and not os.path.exists(state_file)
+        finally:
+            if process.poll() is None:
+                process.kill()
+            os.chdir(ROOT)
+        print(json.dumps({'name': 'result', 'status': 'ok' if ok else 'failed'}), flush=True)
+        sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""多设备编排吞吐量基准。
+
+通过 Orchestrator.play 驱动假设备（不连接真实手机、不启动隧道），测量单个进程在
+给定更新频率下能同时驱动多少台设备。所有设备播放同一条合成轨迹，轨迹只加载一次。
+设备数按倍数递增，直到平均延迟超过节拍间隔的 10% 或最大延迟超过一个节拍间隔。
+
+用法::
+
+    python benchmarks/bench_orchestrator.py --rate 20 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campus_run.orchestrator import Orchestrator
+from campus_run.playback import SAMPLE_RATE
+
+class FakeDevice:
+    """模拟设备往返延迟的异步假位置服务。"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.count = 0
+
+    async def set(self, lat, lon):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.count += 1
+
+async def run_devices(count, rate, duration, latency):
+    # 轨迹按 SAMPLE_RATE 采样，由 play 重采样到 rate，与真实播放路径一致
+    points = [(31.0 + i * 1e-6, 121.0) for i in range(int(SAMPLE_RATE * duration))]
+    orchestrator = Orchestrator(connect=lambda udid: FakeDevice(latency), spawn=None,
+                                loader=lambda path: points)
+    try:
+        results = await orchestrator.play({f'fake-{i}': 'synthetic' for i in range(count)}, rate)
+    finally:
+        orchestrator.close()
+    errors = [result for result in results.values() if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+
+    players = orchestrator.players.values()
+    ticks = sum(p.stats.ticks for p in players)
+    return {
+        'devices': count,
+        'points_sent': sum(results.values()),
+        'mean_lateness_ms': sum(p.stats.total_jitter for p in players) / ticks * 1000,
+        'max_lateness_ms': max(p.stats.max_jitter for p in players) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=20, help="每台设备每秒更新次数 / Updates per second per device")
+    parser.add_argument('--duration', type=float, default=5, help="每轮测试时长（秒）/ Seconds per round")
+    parser.add_argument('--latency', type=float, default=0.002, help="假设备单次推送延迟（秒）/ Fake device send latency (s)")
+    parser.add_argument('--max-devices', type=int, default=4096)
+    args = parser.parse_args()
+
+    interval_ms = 1000 / args.rate
+    supported = 0
+    count = 1
+    while count <= args.max_devices:
+        result = asyncio.run(run_devices(count, args.rate, args.duration, args.latency))
+        result['ok'] = result['mean_lateness_ms'] < interval_ms * 0.1 and result['max_lateness_ms'] < interval_ms
+        print(json.dumps(result))
+        if not result['ok']:
+            break
+        supported = count
+        count *= 2
+
+    print(json.dumps({'rate': args.rate, 'max_supported_devices': supported}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""轨迹预览多级细节金字塔的构建与单帧绘制数据准备耗时基准。
+
+生成约 --points 个点的路线，测量 TrackPyramid 的构建耗时，以及在全图、中等缩放
+和最大缩放下选择层级、裁剪可见块并转换为像素坐标（即 GUI 每帧的全部计算，
+不含 Tk 本身的绘制）的耗时与需要绘制的点数。
+
+用法::
+
+    python benchmarks/bench_preview.py --points 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campus_run.generate import iter_coordinates
+from campus_run.gpx_io import Coordinates
+from campus_run.preview import PreviewView, TrackPyramid
+
+POINTS = [(27.918553, 120.681379), (27.919372, 120.681212), (27.919234, 120.680402)]
+
+def frame(pyramid, view):
+    """准备一帧的绘制数据，返回需要绘制的点数。"""
+    count = 0
+    for xs, ys in pyramid.polylines(view.scale, view.viewport()):
+        count += len(view.flatten(xs, ys)) // 2
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="轨迹预览基准 / Track preview benchmark")
+    parser.add_argument('--points', type=int, default=1_000_000, help="轨迹点数 / Track points")
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--frames', type=int, default=20, help="每种缩放测量的帧数 / Frames timed per zoom level")
+    args = parser.parse_args()
+
+    random.seed(0)
+    per_lap = sum(1 for _ in iter_coordinates(POINTS, 1, 0.5, 3))
+    coordinates = Coordinates()
+    coordinates.extend(iter_coordinates(POINTS, max(1, round(args.points / per_lap)), 0.5, 3))
+
+    begin = time.perf_counter()
+    pyramid = TrackPyramid(coordinates)
+    build = time.perf_counter() - begin
+    print(json.dumps({'name': 'build', 'points': len(pyramid), 'seconds': build,
+                      'levels': [len(level) for level in pyramid.levels]}), flush=True)
+
+    view = PreviewView(args.width, args.height)
+    for zoom in (1, 8, 64):
+        # 以轨迹起点为中心放大，保证放大后画面中仍有轨迹
+        view.fit(pyramid.bounds)
+        view.zoom(zoom, *view.to_pixels(0.0, 0.0))
+        samples = []
+        drawn = 0
+        for _ in range(args.frames):
+            begin = time.perf_counter()
+            drawn = frame(pyramid, view)
+            samples.append(time.perf_counter() - begin)
+        frame_ms = statistics.median(samples) * 1000
+        print(json.dumps({'name': f'frame/zoom={zoom}', 'scale_m_per_px': view.scale, 'drawn_points': drawn,
+                          'frame_ms': frame_ms, 'fps': 1000 / frame_ms}), flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""冷启动基准：导入耗时与命令行/GUI 就绪耗时。
+
+每项测量都在全新的子进程中进行，取多次运行的中位数，超出预算时以非零状态退出，
+可直接用于 CI。
+
+用法::
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-import 0.15 --budget-cli 0.5 --budget-gui 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_import(module):
+    """在子进程中导入 module，返回导入本身的耗时（秒）。"""
+    code = (f"import time; t = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - t)")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def time_cli_prompt(prompt='run> ', timeout=30):
+    """启动 main.py，返回从启动进程到输出命令提示符的耗时（秒）。"""
+    begin = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-u', 'main.py'], cwd=ROOT, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        seen = b''
+        while prompt.encode() not in seen:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError("命令行未输出提示符即退出 / CLI exited before showing its prompt")
+            seen += chunk
+            if time.perf_counter() - begin > timeout:
+                raise TimeoutError("等待命令行提示符超时 / Timed out waiting for the CLI prompt")
+        return time.perf_counter() - begin
+    finally:
+        process.stdin.close()
+        process.kill()
+        process.wait()
+
+def time_gui_window(timeout=30):
+    """启动 campus_run_gui.py，返回进入 Tk 主循环前的耗时（秒），无图形环境时返回 None。"""
+    code = ("import sys, time, runpy, tkinter; t = time.perf_counter(); "
+            "tkinter.Misc.mainloop = lambda self, n=0: (print('READY', time.perf_counter() - t), sys.exit(0)); "
+            "runpy.run_path('campus_run_gui.py', run_name='__main__')")
+    begin = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+    elapsed = time.perf_counter() - begin
+    if 'READY' not in result.stdout:
+        return None
+    return elapsed
+
+def measure(func, repeat):
+    samples = [func() for _ in range(repeat)]
+    if any(sample is None for sample in samples):
+        return None
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的运行次数 / Runs per measurement")
+    parser.add_argument('--budget-import', type=float, default=0.15, help="import campus_run 预算（秒）")
+    parser.add_argument('--budget-shell', type=float, default=0.3, help="import campus_run.shell 预算（秒）")
+    parser.add_argument('--budget-cli', type=float, default=1.0, help="命令行出现提示符的预算（秒）")
+    parser.add_argument('--budget-gui', type=float, default=2.0, help="GUI 进入主循环的预算（秒）")
+    args = parser.parse_args()
+
+    results = {
+        'import_campus_run': (measure(lambda: time_import('campus_run'), args.repeat), args.budget_import),
+        'import_shell': (measure(lambda: time_import('campus_run.shell'), args.repeat), args.budget_shell),
+        'cli_time_to_prompt': (measure(time_cli_prompt, args.repeat), args.budget_cli),
+        'gui_time_to_window': (measure(time_gui_window, args.repeat), args.budget_gui),
+    }
+
+    failed = False
+    for name, (seconds, budget) in results.items():
+        if seconds is None:
+            status = 'skipped'
+        elif seconds > budget:
+            status = 'over_budget'
+            failed = True
+        else:
+            status = 'ok'
+        print(json.dumps({'name': name, 'seconds': seconds, 'budget': budget, 'status': status}))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""生成、解析与播放热路径的可复现基准套件。
+
+不需要网络或真实设备，包含三组测量：
+
+- generate：不同圈数、速度和计算方式下 write_gpx 与 write_polygon_gpx（圆弧拐角的
+  多边形路线）的吞吐量（点/秒）与峰值内存；
+- parse：iter_trkpts 与 load_gpx 解析 example_data.gpx 和合成大文件（默认100MB）的吞吐量；
+- playback：PlaybackPipeline 以假设备端到端播放时的节拍抖动与推送延迟。
+
+随机数种子固定，每项取多次运行的中位数，结果以 JSON 行输出，也可保存为文件并在
+之后与其比较，吞吐量下降或内存、抖动上升超过阈值时以非零状态退出::
+
+    python benchmarks/bench_suite.py --output baseline.json
+    python benchmarks/bench_suite.py --baseline baseline.json --threshold 0.15
+    python benchmarks/bench_suite.py --quick --only generate,parse
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from campus_run.fake import FakeLocationService
+from campus_run.generate import iter_coordinates, iter_polygon_coordinates, write_gpx, write_polygon_gpx
+from campus_run.gpx_io import iter_trkpts, load_gpx
+from campus_run.optional import _numpy
+from campus_run.pipeline import PlaybackPipeline
+
+POINTS = [(27.918553, 120.681379), (27.919372, 120.681212), (27.919234, 120.680402)]
+POLYGON = [(27.918553, 120.681379), (27.919372, 120.681212), (27.919234, 120.680402), (27.918421, 120.680569)]
+EXAMPLE = os.path.join(ROOT, 'example_data.gpx')
+SEED = 0
+GROUPS = ('generate', 'parse', 'playback')
+
+# 参与基准比较的指标及其方向：True 表示越大越好
+DIRECTIONS = {
+    'points_per_sec': True,
+    'mb_per_sec': True,
+    'peak_mb': False,
+    'mean_jitter_ms': False,
+    'p95_interval_error_ms': False,
+    'max_lateness_ms': False,
+}
+
+class NullWriter:
+    """丢弃写入内容、只统计字符数的文本输出，使生成基准不受磁盘影响。"""
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, text):
+        self.written += len(text)
+        return len(text)
+
+def median_seconds(func, repeat):
+    """运行 func repeat 次，返回耗时的中位数（秒）与最后一次的返回值。"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - begin)
+    return statistics.median(samples), result
+
+def peak_memory(func):
+    """返回 func 执行期间 Python 分配内存的峰值（MB）。"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def bench_generate(laps_list, speeds, repeat):
+    engines = [False, True] if _numpy() is not None else [False]
+    for use_numpy in engines:
+        for laps in laps_list:
+            for speed in speeds:
+                def run():
+                    random.seed(SEED)
+                    return write_gpx(NullWriter(), POINTS, laps, 0.5, speed, use_numpy=use_numpy)
+
+                random.seed(SEED)
+                points = sum(1 for _ in iter_coordinates(POINTS, laps, 0.5, speed, use_numpy))
+                seconds, chars = median_seconds(run, repeat)
+                yield {
+                    'name': f"generate/{'numpy' if use_numpy else 'python'}/laps={laps}/speed={speed:g}",
+                    'points': points,
+                    'mb': chars / 1e6,
+                    'seconds': seconds,
+                    'points_per_sec': points / seconds,
+                    'peak_mb': peak_memory(run),
+                }
+        for laps in laps_list:
+            def run():
+                random.seed(SEED)
+                writer = NullWriter()
+                write_polygon_gpx(writer, POLYGON, laps, 0.5, 3, 'arc', use_numpy=use_numpy)
+                return writer.written
+
+            random.seed(SEED)
+            points = sum(1 for _ in iter_polygon_coordinates(POLYGON, laps, 0.5, 3, 'arc', use_numpy=use_numpy))
+            seconds, chars = median_seconds(run, repeat)
+            yield {
+                'name': f"generate/polygon-arc/{'numpy' if use_numpy else 'python'}/laps={laps}",
+                'points': points,
+                'mb': chars / 1e6,
+                'seconds': seconds,
+                'points_per_sec': points / seconds,
+                'peak_mb': peak_memory(run),
+            }
+
+def write_synthetic(path, target_mb):
+    """用真实的路线生成器写出约 target_mb 大小的GPX文件，返回圈数。"""
+    random.seed(SEED)
+    sample = NullWriter()
+    write_gpx(sample, POINTS, 1, 0.5, 3)
+    laps = max(1, round(target_mb * 1e6 / sample.written))
+    with open(path, 'w') as f:
+        write_gpx(f, POINTS, laps, 0.5, 3)
+    return laps
+
+def bench_parse(parse_mb, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic = os.path.join(directory, 'synthetic.gpx')
+        write_synthetic(synthetic, parse_mb)
+        for label, path, count in ((os.path.basename(EXAMPLE), EXAMPLE, repeat),
+                                   (f'synthetic-{parse_mb:g}mb', synthetic, 1)):
+            size = os.path.getsize(path) / 1e6
+            for parser, func in (('iter_trkpts', lambda: sum(1 for _ in iter_trkpts(path))),
+                                 ('load_gpx', lambda: len(load_gpx(path)))):
+                seconds, points = median_seconds(func, count)
+                yield {
+                    'name': f'parse/{parser}/{label}',
+                    'points': points,
+                    'mb': size,
+                    'seconds': seconds,
+                    'points_per_sec': points / seconds,
+                    'mb_per_sec': size / seconds,
+                }
+
+def bench_playback(rates, duration, latency, jitter):
+    random.seed(SEED)
+    points = list(iter_trkpts(EXAMPLE))
+    for rate in rates:
+        count = int(rate * duration)
+        service = FakeLocationService(latency, jitter)
+        pipeline = PlaybackPipeline(service, rate=rate, source_rate=rate)
+        begin = time.perf_counter()
+        pipeline.run(points[:count])
+        seconds = time.perf_counter() - begin
+        times = [sent[0] for sent in service.sent]
+        # 相邻两次推送间隔与理想节拍间隔之差，反映设备侧看到的抖动
+        errors = sorted(abs(b - a - 1 / rate) for a, b in zip(times, times[1:]))
+        latency_histogram = pipeline.metrics.histogram('send_latency_seconds')
+        yield {
+            'name': f'playback/rate={rate:g}',
+            'points': pipeline.sent,
+            'dropped': pipeline.dropped,
+            'late': pipeline.late,
+            'seconds': seconds,
+            'mean_jitter_ms': pipeline.stats.mean_jitter * 1000,
+            'max_lateness_ms': pipeline.stats.max_jitter * 1000,
+            'p95_interval_error_ms': errors[int(len(errors) * 0.95)] * 1000 if errors else 0.0,
+            'mean_send_latency_ms': latency_histogram.mean * 1000,
+        }
+
+def environment():
+    numpy = _numpy()
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__ if numpy is not None else None,
+        'seed': SEED,
+    }
+
+def compare(results, baseline, threshold, min_ms):
+    """与基准结果逐项比较，返回回退的指标列表。
+
+    毫秒级指标的绝对变化不超过 min_ms 时不计为回退，避免亚毫秒抖动的相对变化被放大。
+    """
+    regressions = []
+    previous = {result['name']: result for result in baseline['results']}
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        for metric, higher_is_better in DIRECTIONS.items():
+            if metric not in result or not old.get(metric):
+                continue
+            change = (result[metric] - old[metric]) / old[metric]
+            regressed = change < -threshold if higher_is_better else change > threshold
+            if metric.endswith('_ms') and abs(result[metric] - old[metric]) <= min_ms:
+                regressed = False
+            record = {'name': result['name'], 'metric': metric, 'baseline': old[metric],
+                      'current': result[metric], 'change': change, 'regressed': regressed}
+            print(json.dumps({'compare': record}), flush=True)
+            if regressed:
+                regressions.append(record)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', default=','.join(GROUPS), help="要运行的分组，逗号分隔 / Groups to run: generate,parse,playback")
+    parser.add_argument('--quick', action='store_true', help="缩小规模快速运行 / Smaller sizes for a quick run")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的运行次数 / Runs per measurement")
+    parser.add_argument('--parse-mb', type=float, help="合成GPX文件大小（MB），默认100 / Synthetic GPX size in MB (default 100)")
+    parser.add_argument('--duration', type=float, help="每个播放频率的时长（秒），默认5 / Seconds of playback per rate (default 5)")
+    parser.add_argument('--latency', type=float, default=0.001, help="假设备单次推送延迟（秒）/ Fake device send latency (s)")
+    parser.add_argument('--jitter', type=float, default=0.001, help="假设备额外随机延迟上限（秒）/ Fake device random extra latency (s)")
+    parser.add_argument('--output', help="保存结果的JSON文件 / Write results to this JSON file")
+    parser.add_argument('--baseline', help="用于比较的基准结果文件 / Baseline results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="允许的相对变化，默认0.1 / Allowed relative change (default 0.1)")
+    parser.add_argument('--min-ms', type=float, default=1.0, help="毫秒级指标允许的绝对变化，默认1 / Allowed absolute change for ms metrics (default 1)")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.only.split(',') if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"未知分组 / Unknown groups: {', '.join(sorted(unknown))}")
+    laps_list = (1, 5) if args.quick else (1, 5, 20)
+    speeds = (3,) if args.quick else (3, 5)
+    parse_mb = args.parse_mb if args.parse_mb is not None else (10 if args.quick else 100)
+    duration = args.duration if args.duration is not None else (2 if args.quick else 5)
+    repeat = 1 if args.quick else args.repeat
+
+    benchmarks = {
+        'generate': lambda: bench_generate(laps_list, speeds, repeat),
+        'parse': lambda: bench_parse(parse_mb, repeat),
+        'playback': lambda: bench_playback((20, 50), duration, args.latency, args.jitter),
+    }
+    results = []
+    for group in groups:
+        for result in benchmarks[group]():
+            print(json.dumps(result), flush=True)
+            results.append(result)
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != report['environment']:
+            print(json.dumps({'warning': "运行环境与基准不同 / Environment differs from the baseline",
+                              'baseline': baseline.get('environment')}), flush=True)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        print(json.dumps({'name': 'result', 'status': 'regressed' if regressions else 'ok',
+                          'regressions': len(regressions)}), flush=True)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Campus-Real-Run 库接口。
+
+导入本包没有任何副作用，子模块及其依赖（NumPy、psutil、pymobiledevice3 等）
+都在首次访问对应名称时才加载::
+
+    import campus_run
+    track = campus_run.load_gpx('data.gpx')   # 此时才导入 gpx_io
+"""
+import importlib
+
+_EXPORTS = {
+    'CampusRunShell': 'shell',
+    'generate_gpx': 'generate',
+    'iter_gpx': 'generate',
+    'write_gpx': 'generate',
+    'write_route_gpx': 'generate',
+    'iter_coordinates': 'generate',
+    'RouteCache': 'cache',
+    'run_batch': 'batch',
+    'load_manifest': 'batch',
+    'GPXError': 'gpx_io',
+    'Coordinates': 'gpx_io',
+    'load_gpx': 'gpx_io',
+    'open_gpx': 'gpx_io',
+    'iter_trkpts': 'gpx_io',
+    'write_gpx_points': 'gpx_io',
+    'Track': 'track_format',
+    'load_track': 'track_format',
+    'gpx_to_track': 'track_format',
+    'track_to_gpx': 'track_format',
+    'Route': 'route',
+    'LapTemplate': 'route',
+    'decimate': 'simplify',
+    'LocationService': 'playback',
+    'PlaybackError': 'playback',
+    'PlaybackPipeline': 'pipeline',
+    'FakeLocationService': 'fake',
+    'Daemon': 'daemon',
+    'DaemonClient': 'daemon',
+    'Profiler': 'profiling',
+    'TrackPyramid': 'preview',
+    'write_polygon_gpx': 'generate',
+    'iter_polygon_coordinates': 'generate',
+    'TickScheduler': 'playback',
+    'resample': 'playback',
+    'TunnelSupervisor': 'tunnel',
+    'Checkpoint': 'checkpoint',
+    'MetricsRegistry': 'metrics',
+    'MetricsServer': 'metrics',
+    'Orchestrator': 'orchestrator',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
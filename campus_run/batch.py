@@ -0,0 +1,225 @@
+"""按清单批量生成路线，使用多进程并行。
+
+清单为 JSON 文件，可以是路线列表，也可以是带有公共默认值的对象::
+
+    {
+        "defaults": {"round_count": 10, "fluctuation_range": 0.5, "speed": 3},
+        "routes": [
+            {"points": [[27.918553, 120.681379], [27.919372, 120.681212], [27.919234, 120.680402]],
+             "output": "east.gpx", "seed": 1},
+            {"points": [[31.022987, 121.428446], [31.023510, 121.428270], [31.023466, 121.427430]],
+             "round_count": 5, "output": "west.trk"}
+        ]
+    }
+
+相对输出路径以清单所在目录为基准，扩展名为 .trk 时写入二进制轨迹，为 .gpx.gz 时边写边
+压缩。可选的 precision 和 compact 字段控制GPX坐标精度与元素格式。指定 corners
+（'sharp'、'arc' 或 'spline'，可配合 radius）时，points 为任意 N 个控制点围成的闭合路线，
+否则为三点操场。未指定 seed 的路线使用由基础种子和序号派生的种子，同一基础种子总是
+生成相同的结果。指定 --cache 时先在 RouteCache 中查找相同参数和种子的路线，
+命中则直接复制，不再重新生成。
+
+用法::
+
+    python -m campus_run.batch routes.json --workers 4 --seed 42
+    python -m campus_run.batch routes.json --seed 42 --cache
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cache import RouteCache
+from .generate import _iter_gpx_counted, iter_coordinates, iter_polygon_coordinates, write_polygon_gpx
+from .gpx_io import open_gpx, write_gpx_points
+from .route import CORNER_STYLES, DEFAULT_CORNER_RADIUS
+from .track_format import TRACK_EXTENSION, write_track
+
+DEFAULTS = {'round_count': 10, 'fluctuation_range': 0.5, 'speed': 3}
+
+class ManifestError(ValueError):
+    """清单格式错误。"""
+
+def derive_seed(base_seed, index):
+    """由基础种子和路线序号派生出互不相关的种子。"""
+    digest = hashlib.sha256(f'{base_seed}:{index}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+def load_manifest(path):
+    """读取并校验清单，返回补全默认值后的路线列表。
+
+    Raises:
+        ManifestError: 清单格式无效。
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except ValueError as e:
+        raise ManifestError(f"清单不是有效的JSON: {e} / Manifest is not valid JSON: {e}") from e
+
+    defaults = dict(DEFAULTS)
+    if isinstance(manifest, dict):
+        defaults.update(manifest.get('defaults', {}))
+        manifest = manifest.get('routes')
+    if not isinstance(manifest, list) or not manifest:
+        raise ManifestError("清单中没有路线 / Manifest contains no routes")
+
+    base = os.path.dirname(os.path.abspath(path))
+    specs = []
+    for index, route in enumerate(manifest):
+        spec = {**defaults, **route}
+        if 'output' not in spec:
+            raise ManifestError(f"第 {index} 条路线缺少 output / Route {index} has no output")
+        try:
+            spec['points'] = [(float(lat), float(lon)) for lat, lon in spec['points']]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ManifestError(f"第 {index} 条路线的 points 无效 / Route {index} has invalid points") from e
+        if len(spec['points']) < 3:
+            raise ManifestError(f"第 {index} 条路线至少需要三个控制点 / Route {index} needs at least three control points")
+        if spec.get('corners') is not None and spec['corners'] not in CORNER_STYLES:
+            raise ManifestError(f"第 {index} 条路线的 corners 无效 / Route {index} has invalid corners: {spec['corners']}")
+        spec['output'] = os.path.join(base, spec['output'])
+        specs.append(spec)
+    return specs
+
+def _write_cached(cache, spec, args, corners, radius):
+    """从缓存取出路线（未命中时生成并写入缓存）并复制到输出文件，返回 (点数, 是否命中)。"""
+    output = spec['output']
+    hits = cache.hits
+    with cache.get(*args, spec['seed'], corners=corners, radius=radius) as track:
+        if output.endswith(TRACK_EXTENSION):
+            shutil.copyfile(track.path, output)
+        else:
+            with open_gpx(output, 'w') as f:
+                write_gpx_points(f, track, track.bounds if len(track) else None,
+                                 precision=spec.get('precision'), compact=spec.get('compact', False))
+        return len(track), cache.hits > hits
+
+def run_job(spec, cache_dir=None):
+    """在工作进程中生成一条路线并流式写入输出文件。
+
+    Args:
+        spec (dict): load_manifest 返回的一条路线，已指定 seed。
+        cache_dir (str): 不为 None 时经由该目录下的 RouteCache 生成，空字符串表示默认目录。
+
+    Returns:
+        dict: output、seed、points（坐标点数）和 seconds（耗时），使用缓存时还有 cached（是否命中）。
+    """
+    begin = time.perf_counter()
+    args = (spec['points'], spec['round_count'], spec['fluctuation_range'], spec['speed'])
+    output = spec['output']
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    corners = spec.get('corners')
+    radius = spec.get('radius', DEFAULT_CORNER_RADIUS)
+    if cache_dir is not None:
+        count, cached = _write_cached(RouteCache(cache_dir or None), spec, args, corners, radius)
+        return {'output': output, 'seed': spec['seed'], 'points': count, 'cached': cached,
+                'seconds': time.perf_counter() - begin}
+
+    random.seed(spec['seed'])
+    if output.endswith(TRACK_EXTENSION):
+        with open(output, 'wb') as f:
+            if corners is None:
+                count = write_track(f, iter_coordinates(*args))
+            else:
+                count = write_track(f, iter_polygon_coordinates(*args, corners, radius))
+    elif corners is not None:
+        with open_gpx(output, 'w') as f:
+            count = write_polygon_gpx(f, *args, corners, radius, precision=spec.get('precision'),
+                                      compact=spec.get('compact', False))
+    else:
+        count = 0
+        with open_gpx(output, 'w') as f:
+            for chunk, points in _iter_gpx_counted(*args, precision=spec.get('precision'),
+                                                   compact=spec.get('compact', False)):
+                f.write(chunk)
+                count += points
+    return {'output': output, 'seed': spec['seed'], 'points': count,
+            'seconds': time.perf_counter() - begin}
+
+def run_batch(specs, workers=None, base_seed=None, on_result=None, cache_dir=None):
+    """并行生成全部路线。
+
+    Args:
+        specs (list): load_manifest 返回的路线列表。
+        workers (int): 工作进程数，默认使用全部CPU核心。
+        base_seed (int): 基础种子，未指定时随机选取并记录在结果中。
+        on_result (callable): 每完成一条路线时以结果字典调用，用于流式输出进度。
+        cache_dir (str): 不为 None 时使用路线缓存，见 run_job。
+
+    Returns:
+        dict: 汇总统计，包含总点数、墙钟耗时、每秒点数和并行效率。
+    """
+    workers = workers or os.cpu_count() or 1
+    if base_seed is None:
+        base_seed = random.SystemRandom().getrandbits(32)
+    jobs = []
+    for index, spec in enumerate(specs):
+        spec = dict(spec)
+        if spec.get('seed') is None:
+            spec['seed'] = derive_seed(base_seed, index)
+        jobs.append(spec)
+
+    begin = time.perf_counter()
+    points = 0
+    busy = 0.0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, spec, cache_dir): spec for spec in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                result = {'output': futures[future]['output'], 'seed': futures[future]['seed'], 'error': str(e)}
+            else:
+                points += result['points']
+                busy += result['seconds']
+            if on_result is not None:
+                on_result(result)
+    wall = time.perf_counter() - begin
+    return {
+        'routes': len(jobs),
+        'failed': failed,
+        'workers': workers,
+        'base_seed': base_seed,
+        'points': points,
+        'seconds': wall,
+        'points_per_sec': points / wall if wall else 0.0,
+        # 各任务耗时之和与 (墙钟耗时 × 进程数) 之比，衡量多核利用率
+        'efficiency': busy / (wall * workers) if wall else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="按清单批量生成路线 / Generate routes from a manifest in parallel")
+    parser.add_argument('manifest', help="清单文件 (JSON) / Manifest file (JSON)")
+    parser.add_argument('--workers', type=int, help="工作进程数，默认为CPU核心数 / Worker processes, default: CPU count")
+    parser.add_argument('--seed', type=int, help="基础随机种子 / Base random seed")
+    parser.add_argument('--cache', nargs='?', const='', metavar='DIR',
+                        help="使用路线缓存，可指定目录 / Reuse routes from the route cache, optionally in DIR")
+    args = parser.parse_args()
+
+    try:
+        specs = load_manifest(args.manifest)
+    except (ManifestError, OSError) as e:
+        print(f"清单无效 / Invalid manifest: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    def report(result):
+        print(json.dumps(result), flush=True)
+
+    summary = run_batch(specs, args.workers, args.seed, report, args.cache)
+    print(json.dumps({'summary': summary}), flush=True)
+    if summary['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
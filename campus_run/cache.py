@@ -0,0 +1,228 @@
+"""生成路线的内容寻址磁盘缓存。
+
+以控制点、圈数、速度、浮动范围、拐角样式、随机种子和计算方式的哈希作为键，将
+生成结果以二进制轨迹（.trk）保存。generate_route.py 设置 seed 时和
+python -m campus_run.batch --cache 都会先查找缓存。命中时直接内存映射返回，无需重新计算。缓存总大小超过
+上限时按最近使用时间淘汰最旧的条目。
+
+用法::
+
+    python -m campus_run.cache stats
+    python -m campus_run.cache clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+
+from .generate import iter_coordinates, iter_polygon_coordinates
+from .optional import _numpy
+from .playback import SAMPLE_RATE
+from .route import DEFAULT_CORNER_RADIUS
+from .track_format import TRACK_EXTENSION, VERSION, Track, write_track
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'campus_run', 'routes')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+STATS_PREFIX = 'stats'
+
+# 同一进程内的多个实例共用一个统计文件，更新时需互斥
+_stats_lock = threading.Lock()
+
+class RouteCache:
+    """generate 模块输出的 LRU 磁盘缓存。
+
+    Args:
+        directory (str): 缓存目录，默认 ~/.cache/campus_run/routes，
+            可通过环境变量 CAMPUS_RUN_CACHE 覆盖。
+        max_bytes (int): 缓存总大小上限（字节）。
+
+    Attributes:
+        hits (int): 本进程内的命中次数。
+        misses (int): 本进程内的未命中次数。
+        evictions (int): 本进程内淘汰的条目数。
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get('CAMPUS_RUN_CACHE') or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(points, round_count, fluctuation_range, speed, seed, use_numpy, corners=None, radius=DEFAULT_CORNER_RADIUS):
+        """计算路线参数的内容哈希，操场路线（corners 为 None）的键与拐角参数无关。"""
+        spec = {
+            'points': [[float(lat), float(lon)] for lat, lon in points],
+            'round_count': round_count,
+            'fluctuation_range': float(fluctuation_range),
+            'speed': float(speed),
+            'seed': seed,
+            'engine': 'numpy' if use_numpy else 'python',
+            'sample_rate': SAMPLE_RATE,
+            'format': VERSION,
+        }
+        if corners is not None:
+            spec['corners'] = corners
+            spec['radius'] = float(radius)
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + TRACK_EXTENSION)
+
+    def get(self, points, round_count, fluctuation_range, speed, seed=0, use_numpy=None,
+            corners=None, radius=DEFAULT_CORNER_RADIUS):
+        """返回缓存的路线，未命中时生成并写入缓存。
+
+        Args:
+            points (list): 各坐标点列表。
+            round_count (int): GPX路径需要重复的圈数。
+            fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+            speed (float): 速度，单位为米每秒。
+            seed (int): 随机种子，相同参数和种子总是得到相同路线。
+            use_numpy (bool): 是否使用NumPy批量计算，默认在可用时自动启用。
+            corners (str): 为 None 时生成三点操场，否则为 iter_polygon_coordinates 的拐角样式。
+            radius (float): 圆弧拐角的半径（米）。
+
+        Returns:
+            Track: 内存映射打开的路线，使用完毕后应调用 close()。
+        """
+        if use_numpy is None:
+            use_numpy = _numpy() is not None
+        key = self.key(points, round_count, fluctuation_range, speed, seed, use_numpy, corners, radius)
+        path = self._path(key)
+
+        if os.path.exists(path):
+            os.utime(path)
+            self.hits += 1
+            self._record(hits=1)
+            return Track(path)
+
+        self.misses += 1
+        state = random.getstate()
+        random.seed(seed)
+        temp = f'{path}.{os.getpid()}.tmp'
+        try:
+            if corners is None:
+                coordinates = iter_coordinates(points, round_count, fluctuation_range, speed, use_numpy)
+            else:
+                coordinates = iter_polygon_coordinates(points, round_count, fluctuation_range, speed, corners,
+                                                       radius, use_numpy=use_numpy)
+            with open(temp, 'wb') as f:
+                write_track(f, coordinates)
+            os.replace(temp, path)
+        finally:
+            random.setstate(state)
+            if os.path.exists(temp):
+                os.remove(temp)
+        self._record(misses=1)
+        self.evict(keep=path)
+        return Track(path)
+
+    def entries(self):
+        """返回 [(path, size, mtime), ...]，按最近使用时间从旧到新排序。"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(TRACK_EXTENSION):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self, keep=None):
+        """淘汰最久未使用的条目，直到总大小不超过 max_bytes。"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Windows 上仍被内存映射的文件无法删除，留到下次淘汰
+                continue
+            total -= size
+            evicted += 1
+        if evicted:
+            self.evictions += evicted
+            self._record(evictions=evicted)
+        return evicted
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _stats_files(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.startswith(STATS_PREFIX) and name.endswith('.json')]
+
+    @staticmethod
+    def _read_stats(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, **counts):
+        """累加持久化的统计计数，便于跨进程查看缓存收益。
+
+        批量生成时多个进程会同时更新统计，共用一个文件的读改写会丢失计数，
+        因此每个进程只写自己的计数文件，由 stats() 汇总。
+        """
+        path = os.path.join(self.directory, f'{STATS_PREFIX}-{os.getpid()}.json')
+        with _stats_lock:
+            stats = self._read_stats(path)
+            for name, count in counts.items():
+                stats[name] = stats.get(name, 0) + count
+            temp = path + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(stats, f)
+            os.replace(temp, path)
+
+    def stats(self):
+        """返回各进程持久化计数的累计值：hits、misses、evictions。"""
+        totals = {'hits': 0, 'misses': 0, 'evictions': 0}
+        for path in self._stats_files():
+            for name, count in self._read_stats(path).items():
+                totals[name] = totals.get(name, 0) + count
+        return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="路线缓存管理 / Route cache management")
+    parser.add_argument('action', choices=['stats', 'clear'])
+    parser.add_argument('--dir', help="缓存目录 / Cache directory")
+    args = parser.parse_args()
+
+    cache = RouteCache(args.dir)
+    if args.action == 'clear':
+        cache.clear()
+        print("已清空缓存 / Cache cleared")
+        return
+    entries = cache.entries()
+    stats = cache.stats()
+    lookups = stats.get('hits', 0) + stats.get('misses', 0)
+    print(json.dumps({
+        'directory': cache.directory,
+        'entries': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': cache.max_bytes,
+        **stats,
+        'hit_ratio': stats.get('hits', 0) / lookups if lookups else 0.0,
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
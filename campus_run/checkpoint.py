@@ -0,0 +1,73 @@
+import json
+import os
+import time
+
+CHECKPOINT_FILE = '.campus_run_checkpoint.json'
+
+class Checkpoint:
+    """播放进度检查点，用于中断后从上次位置继续播放。
+
+    进度以 JSON 保存到小文件中，写入频率不超过每 min_interval 秒一次，
+    并通过临时文件加 os.replace 原子替换，避免中断时留下损坏的文件。
+
+    Args:
+        path (str): 检查点文件路径。
+        min_interval (float): 两次写入之间的最短间隔（秒）。
+        clock (callable): 单调时钟，用于限制写入频率。
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, min_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.min_interval = min_interval
+        self.clock = clock
+        self.state = None
+        self._last_save = None
+
+    def load(self):
+        """读取检查点，不存在或损坏时返回 None。
+
+        Returns:
+            dict: 包含 track、index、total、rate、timestamp 的字典。
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or not {'track', 'index', 'total', 'rate'} <= state.keys():
+            return None
+        return state
+
+    def begin(self, track, total, rate, index=0):
+        """开始记录一次播放。
+
+        Args:
+            track (str): 轨迹文件的绝对路径。
+            total (int): 按 rate 采样后的总点数。
+            rate (float): 播放频率（每秒点数）。
+            index (int): 起始点下标。
+        """
+        self.state = {'track': track, 'index': index, 'total': total, 'rate': rate}
+        self.save()
+
+    def update(self, index):
+        """记录下一个待播放的点下标，距上次写入不足 min_interval 时只更新内存。"""
+        self.state['index'] = index
+        if self.clock() - self._last_save >= self.min_interval:
+            self.save()
+
+    def save(self):
+        self.state['timestamp'] = time.time()
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temp, self.path)
+        self._last_save = self.clock()
+
+    def clear(self):
+        """播放完成后删除检查点。"""
+        self.state = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,511 @@
+"""常驻后台服务，持有设备连接和播放引擎，供命令行和GUI作为轻量客户端共享。
+
+后台服务在 127.0.0.1 上监听，协议为逐行 JSON。连接地址和随机令牌写入
+~/.campus_run/daemon.json（仅当前用户可读），客户端读取该文件后连接::
+
+    -> {"id": 1, "token": "...", "method": "run", "params": {"line": "start data.gpx", "cwd": "/path"}}
+    <- {"id": 1, "event": "output", "data": "已推送 100/12680 个坐标点 ..."}
+    <- {"id": 1, "result": true}
+
+方法：
+    run        执行一条命令并流式返回其输出。status、metrics、stop、help 立即执行，
+               其他命令在同一个工作线程中依次执行。
+    subscribe  持续接收所有命令的输出和后台事件（如隧道重启），直到断开连接。
+    ping       返回服务进程信息。
+    shutdown   清理连接并退出服务。
+
+用法::
+
+    python -m campus_run.daemon           # 启动后台服务（需管理员权限）
+    python -m campus_run.daemon --fake    # 使用假设备，无需连接手机
+    python main.py --connect              # 命令行客户端
+"""
+import argparse
+import cmd
+import io
+import json
+import logging
+import os
+import queue
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from .fake import FakeLocationService, FakeTunnel
+from .shell import CampusRunShell
+
+logger = logging.getLogger(__name__)
+
+DAEMON_FILE = os.path.join(os.path.expanduser('~'), '.campus_run', 'daemon.json')
+# 这些命令只读取状态或请求停止，不必排在正在进行的播放之后
+IMMEDIATE_COMMANDS = {'status', 'metrics', 'stop', 'help', '?'}
+# 退出客户端不应关闭后台服务，由客户端自行处理
+CLIENT_COMMANDS = {'exit', 'quit', 'EOF'}
+
+class DaemonError(RuntimeError):
+    """后台服务不可用或返回错误。"""
+
+class _OutputRouter(io.TextIOBase):
+    """按线程转发 print 输出：已绑定的线程写入对应客户端，其余写入原 stdout。"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.sinks = {}
+
+    def bind(self, sink):
+        self.sinks[threading.get_ident()] = sink
+
+    def unbind(self):
+        self.sinks.pop(threading.get_ident(), None)
+
+    def write(self, text):
+        sink = self.sinks.get(threading.get_ident())
+        if sink is None:
+            return self.fallback.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+class _LogRouter(logging.Handler):
+    """将日志转发给产生该日志的命令所属客户端，后台线程的日志广播给所有订阅者。"""
+
+    def __init__(self, router, broadcast):
+        super().__init__()
+        self.router = router
+        self.broadcast = broadcast
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        try:
+            text = self.format(record) + '\n'
+        except Exception:
+            self.handleError(record)
+            return
+        sink = self.router.sinks.get(record.thread)
+        if sink is not None:
+            sink(text)
+        else:
+            self.broadcast('log', text)
+
+class FakeDeviceShell(CampusRunShell):
+    """连接假设备的命令行，用于在没有手机的环境中运行后台服务和客户端。
+
+    Args:
+        latency (float): 假设备每次推送的耗时（秒）。
+        jitter (float): 额外随机耗时上限（秒）。
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0):
+        super().__init__()
+        self.fake_latency = latency
+        self.fake_jitter = jitter
+
+    def do_init(self, arg):
+        if self.initialized:
+            logger.warning("已经初始化过了！ / Already initialized!")
+            return
+        self.tunnel = FakeTunnel()
+        self.location_service = FakeLocationService(self.fake_latency, self.fake_jitter)
+        self.service_generation = self.tunnel.generation
+        self.initialized = True
+        logger.info("已连接假设备 / Connected to fake device")
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self._send_lock = threading.Lock()
+
+    def send(self, message):
+        data = (json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._send_lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except OSError:
+                pass
+
+    def handle(self):
+        daemon = self.server.daemon
+        for raw in self.rfile:
+            try:
+                request = json.loads(raw)
+                request_id = request.get('id')
+            except ValueError:
+                self.send({'error': "无效的请求 / Invalid request"})
+                return
+            if not secrets.compare_digest(str(request.get('token', '')), daemon.token):
+                self.send({'id': request_id, 'error': "令牌无效 / Invalid token"})
+                return
+
+            method = request.get('method')
+            params = request.get('params') or {}
+            if method == 'run':
+                sink = lambda text, request_id=request_id: self.send({'id': request_id, 'event': 'output', 'data': text})
+                daemon.run(params.get('line', ''), params.get('cwd'), sink)
+                self.send({'id': request_id, 'result': True})
+            elif method == 'subscribe':
+                daemon.subscribe(self.send)
+                self.send({'id': request_id, 'result': True})
+                try:
+                    # 订阅连接只用于接收事件，读到 EOF 即客户端已断开
+                    self.rfile.read()
+                finally:
+                    daemon.unsubscribe(self.send)
+                return
+            elif method == 'ping':
+                pipeline = daemon.shell.pipeline
+                self.send({'id': request_id, 'result': {'pid': os.getpid(), 'uptime': time.monotonic() - daemon.started,
+                                                       'initialized': daemon.shell.initialized,
+                                                       'playing': pipeline is not None,
+                                                       'position': pipeline.last_point if pipeline is not None else None}})
+            elif method == 'shutdown':
+                self.send({'id': request_id, 'result': True})
+                threading.Thread(target=daemon.shutdown, daemon=True).start()
+                return
+            else:
+                self.send({'id': request_id, 'error': f"未知方法: {method} / Unknown method: {method}"})
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class Daemon:
+    """后台服务本体。
+
+    Args:
+        shell (CampusRunShell): 执行命令的命令行实例，默认新建。
+        host (str): 监听地址，只应使用本机地址。
+        port (int): 监听端口，0 表示由系统分配。
+        state_file (str): 写入地址和令牌的文件路径。
+    """
+
+    def __init__(self, shell=None, host='127.0.0.1', port=0, state_file=DAEMON_FILE):
+        self.shell = shell or CampusRunShell()
+        self.token = secrets.token_hex(16)
+        self.state_file = state_file
+        self.started = time.monotonic()
+        self._server = _Server((host, port), _Handler)
+        self._server.daemon = self
+        self._jobs = queue.Queue()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._router = None
+        self._worker = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def subscribe(self, send):
+        with self._lock:
+            self._subscribers.append(send)
+
+    def unsubscribe(self, send):
+        with self._lock:
+            if send in self._subscribers:
+                self._subscribers.remove(send)
+
+    def broadcast(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for send in subscribers:
+            send({'event': event, 'data': data})
+
+    def _execute(self, line, sink):
+        def forward(text):
+            sink(text)
+            self.broadcast('output', text)
+
+        self._router.bind(forward)
+        try:
+            self.shell.onecmd(line)
+        except Exception as e:
+            logger.error(f"命令执行失败: {e} / Command failed: {e}")
+        finally:
+            self._router.unbind()
+
+    def _run_jobs(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            line, cwd, sink, done = job
+            self.broadcast('command', {'line': line, 'state': 'started'})
+            # 相对路径按客户端的工作目录解析，不改变整个服务进程的当前目录
+            self.shell.cwd = cwd or None
+            try:
+                self._execute(line, sink)
+            finally:
+                self.shell.cwd = None
+                self.broadcast('command', {'line': line, 'state': 'finished'})
+                done.set()
+
+    def run(self, line, cwd, sink):
+        """执行一条命令，返回时命令已结束。"""
+        words = line.split()
+        name = words[0] if words else ''
+        if name in CLIENT_COMMANDS:
+            sink("后台服务中请使用 shutdown 关闭服务 / Use 'shutdown' to stop the daemon\n")
+        elif name in IMMEDIATE_COMMANDS or words == ['profile']:
+            # 不带参数的 profile 只显示报告，无需等待正在播放的命令
+            self._execute(line, sink)
+        else:
+            done = threading.Event()
+            self._jobs.put((line, cwd, sink, done))
+            done.wait()
+
+    def _write_state(self):
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        host, port = self.address
+        temp = self.state_file + '.tmp'
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'host': host, 'port': port, 'token': self.token, 'pid': os.getpid()}, f)
+        os.replace(temp, self.state_file)
+
+    def serve_forever(self):
+        """安装输出转发、写入地址文件并处理请求，直到 shutdown。"""
+        self._router = _OutputRouter(sys.stdout)
+        sys.stdout = self._router
+        shell_stdout = self.shell.stdout
+        self.shell.stdout = self._router
+        handler = _LogRouter(self._router, self.broadcast)
+        logging.getLogger().addHandler(handler)
+        self._worker = threading.Thread(target=self._run_jobs, name='daemon-worker', daemon=True)
+        self._worker.start()
+        self._write_state()
+        host, port = self.address
+        logger.info(f"后台服务已启动: {host}:{port} / Daemon listening on {host}:{port}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self.shell.do_stop('')
+            self._jobs.put(None)
+            self._worker.join()
+            self.shell.do_cleanup('')
+            self.shell.stop_metrics_server()
+            logging.getLogger().removeHandler(handler)
+            self.shell.stdout = shell_stdout
+            sys.stdout = self._router.fallback
+            self._server.server_close()
+            try:
+                os.remove(self.state_file)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        self._server.shutdown()
+
+def read_state(state_file=DAEMON_FILE):
+    """读取后台服务地址文件，服务未运行时返回 None。"""
+    try:
+        with open(state_file, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class DaemonClient:
+    """后台服务客户端。
+
+    Args:
+        state_file (str): 后台服务地址文件。
+        timeout (float): 建立连接的超时时间（秒）。
+
+    Attributes:
+        host (str): 后台服务监听地址。
+        port (int): 后台服务端口。
+
+    Raises:
+        DaemonError: 后台服务未运行或无法连接。
+    """
+
+    def __init__(self, state_file=DAEMON_FILE, timeout=2.0):
+        self.state_file = state_file
+        state = read_state(state_file)
+        if state is None:
+            raise DaemonError("后台服务未运行 / Daemon is not running")
+        self.host = state['host']
+        self.port = state['port']
+        try:
+            self._socket = socket.create_connection((self.host, self.port), timeout=timeout)
+        except OSError as e:
+            raise DaemonError(f"无法连接后台服务: {e} / Cannot connect to daemon: {e}") from e
+        self._socket.settimeout(None)
+        self._file = self._socket.makefile('rwb')
+        self._token = state['token']
+        self._next_id = 0
+
+    @classmethod
+    def find(cls, state_file=DAEMON_FILE):
+        """后台服务正在运行时返回已连接的客户端，否则返回 None。"""
+        try:
+            return cls(state_file)
+        except DaemonError:
+            return None
+
+    def call(self, method, on_event=None, **params):
+        """调用方法并等待结果，期间收到的事件交给 on_event(event, data)。
+
+        Raises:
+            DaemonError: 服务返回错误或连接断开。
+        """
+        self._send(method, params)
+        return self.wait(on_event)
+
+    def _send(self, method, params):
+        self._next_id += 1
+        request = {'id': self._next_id, 'token': self._token, 'method': method, 'params': params}
+        self._file.write((json.dumps(request) + '\n').encode('utf-8'))
+        self._file.flush()
+
+    def wait(self, on_event=None):
+        """继续等待最近一次调用的结果，用于被 Ctrl+C 打断后接着接收剩余输出。"""
+        for raw in self._file:
+            message = json.loads(raw)
+            if 'event' in message:
+                if on_event is not None:
+                    on_event(message['event'], message['data'])
+                continue
+            if 'error' in message:
+                raise DaemonError(message['error'])
+            if message.get('id') == self._next_id:
+                return message.get('result')
+        raise DaemonError("后台服务已断开连接 / Daemon closed the connection")
+
+    def run(self, line, on_output):
+        """在后台服务中执行命令，输出逐段交给 on_output(text)。"""
+        return self.call('run', lambda event, data: on_output(data), line=line, cwd=os.getcwd())
+
+    def events(self):
+        """订阅后台服务事件，逐个产出 (event, data)，连接断开时结束。"""
+        self._send('subscribe', {})
+        while True:
+            try:
+                raw = self._file.readline()
+            except (OSError, ValueError):  # 连接已在其他线程中关闭
+                return
+            if not raw:
+                return
+            message = json.loads(raw)
+            if 'event' in message:
+                yield message['event'], message['data']
+
+    def close(self):
+        try:
+            # 先关闭套接字，使其他线程中阻塞的读取（如 events()）立即返回
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self._file.close()
+            self._socket.close()
+        except OSError:
+            pass
+
+class RemoteShell(cmd.Cmd):
+    """连接后台服务的命令行客户端，命令在后台服务中执行，设备连接在多次会话间保持。"""
+
+    intro = '''
+已连接到 Campus-Real-Run 后台服务，设备连接由后台服务保持。
+输入 help 查看命令，exit 仅断开客户端，shutdown 关闭后台服务。
+Connected to the Campus-Real-Run daemon; device connections are kept by the daemon.
+Type help for commands. 'exit' only detaches this client, 'shutdown' stops the daemon.
+    '''
+    prompt = 'run> '
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def emptyline(self):
+        pass
+
+    def _write(self, text):
+        self.stdout.write(text)
+        self.stdout.flush()
+
+    def default(self, line):
+        try:
+            self.client.run(line, self._write)
+        except KeyboardInterrupt:
+            # 在另一条连接上请求停止，然后继续接收原命令的剩余输出
+            stopper = DaemonClient(self.client.state_file)
+            try:
+                stopper.run('stop', self._write)
+            finally:
+                stopper.close()
+            self.client.wait(lambda event, data: self._write(data))
+        except DaemonError as e:
+            logger.error(str(e))
+            return True
+
+    def do_help(self, arg):
+        return self.default(f'help {arg}')
+
+    def do_shutdown(self, arg):
+        """
+        关闭后台服务 / Stop the daemon
+        用法 / Usage: shutdown
+        """
+        self.client.call('shutdown')
+        return True
+
+    def do_exit(self, arg):
+        """
+        断开客户端，后台服务继续运行 / Detach this client, the daemon keeps running
+        用法 / Usage: exit
+        """
+        return True
+
+    do_quit = do_exit
+    do_EOF = do_exit
+
+def connect_main(state_file=DAEMON_FILE):
+    """命令行客户端入口。"""
+    try:
+        client = DaemonClient(state_file)
+    except DaemonError as e:
+        logger.error(e)
+        logger.error("请先运行 'python -m campus_run.daemon' / Start it with 'python -m campus_run.daemon' first")
+        sys.exit(1)
+    try:
+        RemoteShell(client).cmdloop()
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Campus-Real-Run 后台服务 / Campus-Real-Run daemon")
+    parser.add_argument('--port', type=int, default=0, help="监听端口，默认自动分配 / Port to listen on, default: any free port")
+    parser.add_argument('--state-file', default=DAEMON_FILE, help="地址与令牌文件 / Address and token file")
+    parser.add_argument('--fake', action='store_true', help="使用假设备 / Use a fake device")
+    parser.add_argument('--fake-latency', type=float, default=0.0, help="假设备推送耗时（秒） / Fake device send latency (s)")
+    parser.add_argument('--profile', action='store_true', help="剖析每一条命令的各阶段耗时 / Profile the phases of every command")
+    parser.add_argument('--profile-dir', help="同时将 cProfile 结果写入该目录 / Also write cProfile output to this directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    existing = DaemonClient.find(args.state_file)
+    if existing is not None:
+        pid = existing.call('ping')['pid']
+        existing.close()
+        logger.error(f"后台服务已在运行 (pid {pid}) / Daemon already running (pid {pid})")
+        sys.exit(1)
+
+    shell = FakeDeviceShell(args.fake_latency) if args.fake else CampusRunShell()
+    shell.profiler.enabled = args.profile or args.profile_dir is not None
+    shell.profiler.output_dir = args.profile_dir
+    daemon = Daemon(shell, port=args.port, state_file=args.state_file)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
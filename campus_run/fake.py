@@ -0,0 +1,80 @@
+"""不连接真实设备的假位置服务，用于测试播放流程和基准测试。"""
+import random
+import threading
+import time
+
+class FakeLocationService:
+    """记录每次推送的假位置服务，可注入固定延迟、随机抖动和长时间卡顿。
+
+    Args:
+        latency (float): 每次 set 的固定耗时（秒）。
+        jitter (float): 在 latency 之上额外增加的随机耗时上限（秒）。
+        stalls (dict): {第 n 次推送: 卡顿秒数}，模拟设备连接短暂停滞。
+        fail_at (int): 第 fail_at 次推送时抛出 ConnectionError，None 表示不失败。
+        clock (callable): 记录推送时刻所用的时钟。
+
+    Attributes:
+        sent (list): [(时刻, lat, lon), ...]。
+        cleared (int): clear 调用次数。
+        closed (bool): 是否已关闭。
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, stalls=None, fail_at=None, clock=time.monotonic):
+        self.latency = latency
+        self.jitter = jitter
+        self.stalls = dict(stalls or {})
+        self.fail_at = fail_at
+        self.clock = clock
+        self.sent = []
+        self.cleared = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def set(self, lat, lon):
+        count = len(self.sent)
+        if count == self.fail_at:
+            raise ConnectionError("模拟的设备连接断开 / Simulated device disconnect")
+        delay = self.latency + self.stalls.get(count, 0.0)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.sent.append((self.clock(), lat, lon))
+
+    def clear(self):
+        self.cleared += 1
+
+    def close(self):
+        self.closed = True
+
+def parse_stalls(text):
+    """解析 '100:1.5,300:0.5' 形式的卡顿设置，返回 {推送序号: 秒数}。"""
+    stalls = {}
+    for item in filter(None, text.split(',')):
+        index, seconds = item.split(':')
+        stalls[int(index)] = float(seconds)
+    return stalls
+
+class FakeTunnel:
+    """始终可用的假隧道，接口与 TunnelSupervisor 一致。"""
+
+    def __init__(self):
+        self.processes = []
+        self.generation = 1
+        self.restarts = 0
+        self.connect_latency = 0.0
+        self.ready_since = time.monotonic()
+
+    @property
+    def uptime(self):
+        return time.monotonic() - self.ready_since if self.ready_since is not None else 0.0
+
+    def healthy(self):
+        return self.ready_since is not None
+
+    def wait_ready(self, timeout=None):
+        return self.healthy()
+
+    def stop(self):
+        self.ready_since = None
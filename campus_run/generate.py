@@ -0,0 +1,335 @@
+import math
+import random
+
+from .gpx_io import trkpt_formatter, write_gpx_points
+from .optional import _numpy
+from .playback import SAMPLE_RATE
+from .route import ARC_SEGMENTS, DEFAULT_CORNER_RADIUS, Route
+
+# 每圈三个轨迹段（直线+弯道、直线、弯道）对应的起止标签，保持原有输出格式不变
+_SEGMENT_TAGS = (
+    ('''
+    <trk>
+      <trkseg>''', '''
+      </trkseg>
+    </trk>'''),
+    ('''
+    <trk>
+        <trkseg>''', '''
+        </trkseg>
+    </trk>'''),
+    ('''
+    <trk>
+        <trkseg>''', '''
+        </trkseg>
+    </trk>'''),
+)
+_COMPACT_SEGMENT_TAGS = (('''
+<trk><trkseg>''', '''
+</trkseg></trk>'''),) * 3
+
+def _lap_parameters(points, coordinate_spacing):
+    """计算一圈的几何参数，每圈都相同，只需计算一次。"""
+    lat0, lon0 = points[0]
+    lat1, lon1 = points[1]
+    lat2, lon2 = points[2]
+
+    distance_straight = math.hypot(lat1 - lat0, lon1 - lon0)
+    num_points_straight = int(distance_straight / coordinate_spacing)
+    lat_step = (lat1 - lat0) / num_points_straight
+    lon_step = (lon1 - lon0) / num_points_straight
+
+    center_lat = (lat1 + lat2) / 2
+    center_lon = (lon1 + lon2) / 2
+    radius = math.hypot(lat1 - center_lat, lon1 - center_lon)
+    num_points_curve = int((math.pi * radius) / coordinate_spacing)
+    begin_angle = math.atan2(lat0 - lat1, -lon0 + lon1)
+
+    return (num_points_straight, lat_step, lon_step,
+            center_lat, center_lon, radius, num_points_curve, begin_angle)
+
+def _iter_laps_python(points, round_count, fluctuation_range, coordinate_spacing):
+    """纯Python实现，逐点计算坐标。NumPy不可用时使用。
+
+    Yields:
+        list: 每圈三个轨迹段，每段为 (lat, lon) 元组列表。
+    """
+    def add_fluctuation(value, fluctuation_range):
+        """为坐标点添加随机浮动。
+
+        Args:
+            value (float): 原始坐标点。
+            fluctuation_range (float): 浮动范围。
+
+        Returns:
+            float: 添加浮动后的坐标点。
+        """
+        return value + (random.uniform(-fluctuation_range, fluctuation_range) / 111000)
+
+    lat0, lon0 = points[0]
+    lat2, lon2 = points[2]
+    (num_points_straight, lat_step, lon_step,
+     center_lat, center_lon, radius, num_points_curve, begin_angle) = \
+        _lap_parameters(points, coordinate_spacing)
+
+    for _ in range(round_count):
+        first, second, third = [], [], []
+
+        # 生成从点0到点1的直线段
+        for i in range(num_points_straight + 1):
+            lat = add_fluctuation(lat0 + lat_step * i, fluctuation_range)
+            lon = add_fluctuation(lon0 + lon_step * i, fluctuation_range)
+            first.append((lat, lon))
+
+        # 生成从点1到点2的弯曲段
+        for i in range(num_points_curve + 1):
+            angle = math.pi * (1 - i / num_points_curve) + begin_angle
+            lat = add_fluctuation(center_lat + radius * math.cos(angle), fluctuation_range)
+            lon = add_fluctuation(center_lon + radius * math.sin(angle), fluctuation_range)
+            first.append((lat, lon))
+
+        # 再次生成直线段
+        for i in range(num_points_straight + 1):
+            lat = add_fluctuation(lat2 - lat_step * i, fluctuation_range)
+            lon = add_fluctuation(lon2 - lon_step * i, fluctuation_range)
+            second.append((lat, lon))
+
+        # 再次生成弯曲段，圆心取上一段终点与起点的中点
+        back_lat = (lat + lat0) / 2
+        back_lon = (lon + lon0) / 2
+        for i in range(num_points_curve + 1):
+            angle = math.pi * (1 - i / num_points_curve) + begin_angle
+            lat = add_fluctuation(back_lat - radius * math.cos(angle), fluctuation_range)
+            lon = add_fluctuation(back_lon - radius * math.sin(angle), fluctuation_range)
+            third.append((lat, lon))
+
+        yield [first, second, third]
+
+def _iter_laps_numpy(points, round_count, fluctuation_range, coordinate_spacing):
+    """NumPy批量实现：一圈的几何只计算一次，每圈仅做一次向量化随机浮动。
+
+    Yields:
+        list: 每圈三个轨迹段，每段为 (N, 2) 的 lat/lon 数组。
+    """
+    np = _numpy()
+    lat0, lon0 = points[0]
+    lat2, lon2 = points[2]
+    (num_points_straight, lat_step, lon_step,
+     center_lat, center_lon, radius, num_points_curve, begin_angle) = \
+        _lap_parameters(points, coordinate_spacing)
+
+    i_straight = np.arange(num_points_straight + 1)
+    angles = math.pi * (1 - np.arange(num_points_curve + 1) / num_points_curve) + begin_angle
+    cos_angles = radius * np.cos(angles)
+    sin_angles = radius * np.sin(angles)
+
+    straight = np.column_stack((lat0 + lat_step * i_straight, lon0 + lon_step * i_straight))
+    curve = np.column_stack((center_lat + cos_angles, center_lon + sin_angles))
+    straight_back = np.column_stack((lat2 - lat_step * i_straight, lon2 - lon_step * i_straight))
+    # 第二个弯道的圆心依赖上一段带浮动的终点，这里先按无浮动终点计算，逐圈再修正
+    back_center = (straight_back[-1] + (lat0, lon0)) / 2
+    curve_back = np.column_stack((back_center[0] - cos_angles, back_center[1] - sin_angles))
+
+    template = np.concatenate((straight, curve, straight_back, curve_back))
+    first_end = len(straight) + len(curve)
+    second_end = first_end + len(straight_back)
+
+    # 用 random 模块派生种子，使 random.seed() 对两种实现都生效
+    rng = np.random.default_rng(random.getrandbits(64))
+    scale = fluctuation_range / 111000
+    for _ in range(round_count):
+        noise = rng.uniform(-scale, scale, size=template.shape)
+        lap = template + noise
+        lap[second_end:] += noise[second_end - 1] / 2
+        yield [lap[:first_end], lap[first_end:second_end], lap[second_end:]]
+
+def iter_laps(points, round_count, fluctuation_range, speed, use_numpy=None):
+    """按圈生成带浮动的轨迹坐标。
+
+    Args:
+        points (list): 各坐标点列表。
+        round_count (int): GPX路径需要重复的圈数。
+        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+        speed (float): 速度，单位为米每秒。
+        use_numpy (bool): 是否使用NumPy批量计算，默认在可用时自动启用。
+
+    Yields:
+        list: 每圈三个轨迹段，每段为 (lat, lon) 序列。
+    """
+    if use_numpy is None:
+        use_numpy = _numpy() is not None
+    elif use_numpy and _numpy() is None:
+        raise ImportError("NumPy 未安装 / NumPy is not installed")
+
+    coordinate_spacing = speed/SAMPLE_RATE/111000 # 计算坐标间隔经纬度，每个点代表 1/SAMPLE_RATE 秒
+    if use_numpy:
+        return _iter_laps_numpy(points, round_count, fluctuation_range, coordinate_spacing)
+    return _iter_laps_python(points, round_count, fluctuation_range, coordinate_spacing)
+
+def iter_coordinates(points, round_count, fluctuation_range, speed, use_numpy=None):
+    """与 iter_gpx 相同的路线，直接逐点产出 (lat, lon)，不生成GPX文本。"""
+    for lap in iter_laps(points, round_count, fluctuation_range, speed, use_numpy):
+        for segment in lap:
+            yield from (segment if isinstance(segment, list) else segment.tolist())
+
+def iter_gpx(points, round_count, fluctuation_range, speed, use_numpy=None, precision=None, compact=False):
+    """逐段生成GPX文本片段的生成器。
+
+    与一次性拼接整个字符串不同，这里每次只产出一小段文本（文件头、单个轨迹段或
+    文件尾），调用方可以边生成边写入，内存占用与圈数无关。
+
+    Args:
+        points (list): 各坐标点列表。
+        round_count (int): GPX路径需要重复的圈数。
+        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+        speed (float): 速度，单位为米每秒。
+        use_numpy (bool): 是否使用NumPy批量计算，默认在可用时自动启用。
+        precision (int): 坐标保留的小数位数，默认完整精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Yields:
+        str: GPX文本片段，按顺序拼接即为完整文件。
+    """
+    for chunk, _ in _iter_gpx_counted(points, round_count, fluctuation_range, speed, use_numpy, precision, compact):
+        yield chunk
+
+def _iter_gpx_counted(points, round_count, fluctuation_range, speed, use_numpy=None, precision=None, compact=False):
+    """与 iter_gpx 相同，但同时产出每个片段包含的坐标点数：(text, count)。"""
+    # 提取边界值
+    minlat = min(points, key=lambda x: x[0])[0]
+    minlon = min(points, key=lambda x: x[1])[1]
+    maxlat = max(points, key=lambda x: x[0])[0]
+    maxlon = max(points, key=lambda x: x[1])[1]
+
+    # GPX文件头部
+    yield f'''<?xml version="1.0"?>
+<gpx version="1.1" creator="GDAL 2.2.2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:ogr="http://osgeo.org/gdal" xmlns="http://www.topografix.com/GPX/1/1" xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd">
+<metadata><bounds minlat="{minlat}" minlon="{minlon}" maxlat="{maxlat}" maxlon="{maxlon}"/></metadata>''', 0
+
+    trkpt = trkpt_formatter(precision, compact)
+    tags = _COMPACT_SEGMENT_TAGS if compact else _SEGMENT_TAGS
+    for lap in iter_laps(points, round_count, fluctuation_range, speed, use_numpy):
+        for (open_tag, close_tag), segment in zip(tags, lap):
+            if not isinstance(segment, list):
+                segment = segment.tolist()
+            yield open_tag + ''.join([trkpt(lat, lon) for lat, lon in segment]) + close_tag, len(segment)
+
+    # GPX文件尾部
+    yield '</gpx>', 0
+
+def write_gpx(file, points, round_count, fluctuation_range, speed, buffer_size=64 * 1024, use_numpy=None,
+              precision=None, compact=False):
+    """将GPX流式写入文件对象，内存占用与路线长度无关。
+
+    Args:
+        file: 任意带有 write 方法的可写对象（如 open() 或 open_gpx() 返回的文件句柄，
+            后者在路径以 .gz 结尾时边写边压缩）。
+        points (list): 各坐标点列表。
+        round_count (int): GPX路径需要重复的圈数。
+        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+        speed (float): 速度，单位为米每秒。
+        buffer_size (int): 累积多少字符后写入一次，默认64K。
+        use_numpy (bool): 是否使用NumPy批量计算，默认在可用时自动启用。
+        precision (int): 坐标保留的小数位数，默认完整精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Returns:
+        int: 写入的字符总数。
+    """
+    buffer = []
+    buffered = 0
+    written = 0
+    for chunk in iter_gpx(points, round_count, fluctuation_range, speed, use_numpy, precision, compact):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= buffer_size:
+            file.write(''.join(buffer))
+            written += buffered
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        file.write(''.join(buffer))
+        written += buffered
+    return written
+
+def generate_gpx(points, round_count, fluctuation_range,speed, use_numpy=None, precision=None, compact=False):
+    """生成GPX文件的主要函数。
+
+    Args:
+        points (list): 各坐标点列表。
+        round_count (int): GPX路径需要重复的圈数。
+        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+        speed (float): 速度，单位为米每秒。
+        use_numpy (bool): 是否使用NumPy批量计算，默认在可用时自动启用。
+        precision (int): 坐标保留的小数位数，默认完整精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Returns:
+        str: 完整的GPX文本。
+    """
+    return ''.join(iter_gpx(points, round_count, fluctuation_range, speed, use_numpy, precision, compact))
+
+def _expand_bounds(bounds, scale):
+    """将路线几何的边界向外扩展浮动幅度 scale（度），使其包含叠加浮动后的所有点。"""
+    minlat, minlon, maxlat, maxlon = bounds
+    return minlat - scale, minlon - scale, maxlat + scale, maxlon + scale
+
+def write_route_gpx(file, points, round_count, fluctuation_range, speed, precision=None, compact=False):
+    """按米制弧长等距采样生成GPX。
+
+    与 generate_gpx 直接在经纬度上计算间隔不同，这里先构建 Route 并在其累计距离
+    索引上采样，经度方向按纬度修正，任意纬度下点间距都是 speed/SAMPLE_RATE 米。
+
+    Args:
+        file: 任意带有 write 方法的可写对象。
+        points (list): 各坐标点列表。
+        round_count (int): GPX路径需要重复的圈数。
+        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+        speed (float): 速度，单位为米每秒。
+        precision (int): 坐标保留的小数位数，默认完整精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Returns:
+        int: 写入的轨迹点数量。
+    """
+    route = Route.stadium(points)
+    scale = fluctuation_range / 111000
+    noisy = ((lat + random.uniform(-scale, scale), lon + random.uniform(-scale, scale))
+             for lat, lon in route.sample(speed=speed, laps=round_count))
+    return write_gpx_points(file, noisy, _expand_bounds(route.bounds, scale), precision=precision, compact=compact)
+
+def iter_polygon_coordinates(points, round_count, fluctuation_range, speed, corners='sharp',
+                             radius=DEFAULT_CORNER_RADIUS, segments=ARC_SEGMENTS, use_numpy=None):
+    """由任意 N 个控制点围成的闭合路线逐点产出 (lat, lon)。
+
+    一圈的几何只在构建模板时计算一次，之后每圈只叠加随机浮动，耗时与圈长成正比。
+
+    Args:
+        points (list): 至少三个控制点 [(lat, lon), ...]，按行进顺序排列。
+        round_count (int): 圈数。
+        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+        speed (float): 速度，单位为米每秒。
+        corners (str): 拐角样式，'sharp'、'arc' 或 'spline'，见 Route.polygon。
+        radius (float): 圆弧拐角的半径（米）。
+        segments (int): 圆弧每半圈、样条每段的折线段数。
+        use_numpy (bool): 是否使用NumPy批量叠加浮动，默认在可用时自动启用。
+    """
+    template = Route.polygon(points, corners, radius, segments).template(speed=speed)
+    return template.iter_points(round_count, fluctuation_range, use_numpy)
+
+def write_polygon_gpx(file, points, round_count, fluctuation_range, speed, corners='sharp',
+                      radius=DEFAULT_CORNER_RADIUS, segments=ARC_SEGMENTS, use_numpy=None, precision=None, compact=False):
+    """将 N 点闭合路线流式写为单轨迹段的GPX，参数同 iter_polygon_coordinates。
+
+    Args:
+        file: 任意带有 write 方法的可写对象。
+        precision (int): 坐标保留的小数位数，默认完整精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Returns:
+        int: 写入的轨迹点数量。
+    """
+    route = Route.polygon(points, corners, radius, segments)
+    coordinates = route.template(speed=speed).iter_points(round_count, fluctuation_range, use_numpy)
+    bounds = _expand_bounds(route.bounds, fluctuation_range / 111000)
+    return write_gpx_points(file, coordinates, bounds, precision=precision, compact=compact)
@@ -0,0 +1,43 @@
+import math
+
+EARTH_RADIUS = 6371008.8  # 地球平均半径（米）
+METERS_PER_DEGREE = 111000  # 与 campus_run.generate 中使用的近似值一致
+
+def haversine(lat1, lon1, lat2, lon2):
+    """计算两个经纬度坐标之间的球面距离。
+
+    Args:
+        lat1, lon1 (float): 第一个点的纬度、经度（度）。
+        lat2, lon2 (float): 第二个点的纬度、经度（度）。
+
+    Returns:
+        float: 距离，单位为米。
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+def to_local(lat, lon, origin):
+    """将经纬度投影到以 origin 为原点的局部平面坐标（米）。
+
+    使用等距圆柱投影，经度方向按原点纬度的余弦缩放，在操场尺度内误差可忽略。
+
+    Args:
+        lat, lon (float): 待投影的坐标（度）。
+        origin (tuple): 原点 (lat, lon)。
+
+    Returns:
+        tuple: (x, y)，x 向东、y 向北，单位为米。
+    """
+    scale = math.radians(EARTH_RADIUS)
+    return ((lon - origin[1]) * scale * math.cos(math.radians(origin[0])),
+            (lat - origin[0]) * scale)
+
+def from_local(x, y, origin):
+    """to_local 的逆变换，返回 (lat, lon)。"""
+    scale = math.radians(EARTH_RADIUS)
+    return (origin[0] + y / scale,
+            origin[1] + x / (scale * math.cos(math.radians(origin[0]))))
@@ -0,0 +1,239 @@
+import gzip
+import math
+import os
+import zlib
+from array import array
+
+from .geo import haversine
+
+GPX_HEADER = '''<?xml version="1.0"?>
+<gpx version="1.1" creator="Campus-Real-Run" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns="http://www.topografix.com/GPX/1/1" xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd">'''
+GPX_FOOTER = '''
+</gpx>'''
+GZIP_EXTENSION = '.gz'
+GPX_EXTENSIONS = ('.gpx', '.gpx' + GZIP_EXTENSION)
+GZIP_LEVEL = 6  # 压缩率与最高级别相差无几，速度快数倍
+
+def _local_name(tag):
+    """去掉XML命名空间前缀，如 '{http://...}trkpt' -> 'trkpt'。"""
+    return tag.rsplit('}', 1)[-1]
+
+class GPXError(ValueError):
+    """GPX文件格式错误。"""
+
+def is_gpx_path(path):
+    """路径是否为 .gpx 或 .gpx.gz 文件。"""
+    return str(path).lower().endswith(GPX_EXTENSIONS)
+
+def open_gpx(path, mode='r'):
+    """打开GPX文件，路径以 .gz 结尾时透明地进行gzip流式压缩/解压。
+
+    Args:
+        path: 文件路径。
+        mode (str): 'r'、'w'（文本）或 'rb'、'wb'（二进制）。
+
+    Returns:
+        文件对象，文本模式下使用 UTF-8 编码。
+    """
+    binary = 'b' in mode
+    if str(path).lower().endswith(GZIP_EXTENSION):
+        mode = mode.replace('b', '').replace('t', '')
+        if binary:
+            return gzip.open(path, mode + 'b', compresslevel=GZIP_LEVEL)
+        return gzip.open(path, mode + 't', compresslevel=GZIP_LEVEL, encoding='utf-8')
+    if binary:
+        return open(path, mode)
+    return open(path, mode, encoding='utf-8')
+
+def add_gpx_output_options(parser):
+    """为命令行工具添加 --precision 和 --compact 两个GPX输出选项。"""
+    parser.add_argument('--precision', type=int,
+                        help="坐标保留的小数位数，默认完整精度 / Decimal places per coordinate, default: full precision")
+    parser.add_argument('--compact', action='store_true',
+                        help="使用单行自闭合的 <trkpt/> 元素 / Write single-line self-closing <trkpt/> elements")
+
+def trkpt_formatter(precision=None, compact=False):
+    """返回将 (lat, lon) 格式化为 trkpt 元素文本的函数。
+
+    Args:
+        precision (int): 坐标保留的小数位数，None 表示完整精度。小数点后7位约为1厘米，
+            已远高于GPS精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Returns:
+        callable: formatter(lat, lon) -> str。
+    """
+    number = '{}' if precision is None else f'{{:.{precision}f}}'
+    if compact:
+        template = f'\n<trkpt lat="{number}" lon="{number}"/>'
+    else:
+        template = f'''
+        <trkpt lat="{number}" lon="{number}">
+        </trkpt>'''
+    return template.format
+
+def iter_trkpts(source):
+    """流式读取GPX中的轨迹点，不构建完整DOM。
+
+    解析过程中每处理完一个节点就将其从父节点移除，内存占用与文件大小无关。
+
+    Args:
+        source: GPX文件路径（.gpx 或 .gpx.gz）或已打开的二进制文件对象。
+
+    Yields:
+        tuple: (lat, lon) 浮点坐标。
+
+    Raises:
+        GPXError: 文件不是合法的GPX或坐标无效。
+    """
+    if isinstance(source, (str, os.PathLike)) and str(source).lower().endswith(GZIP_EXTENSION):
+        with open_gpx(source, 'rb') as f:
+            yield from iter_trkpts(f)
+        return
+
+    import xml.etree.ElementTree as ET
+
+    stack = []
+    index = 0
+    try:
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if not stack and _local_name(elem.tag) != 'gpx':
+                    raise GPXError(f"根节点不是 gpx: {_local_name(elem.tag)} / Root element is not gpx: {_local_name(elem.tag)}")
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            if _local_name(elem.tag) == 'trkpt':
+                try:
+                    lat = float(elem.get('lat'))
+                    lon = float(elem.get('lon'))
+                except (TypeError, ValueError):
+                    raise GPXError(f"第 {index} 个轨迹点缺少有效的 lat/lon / Track point {index} has no valid lat/lon") from None
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    raise GPXError(f"第 {index} 个轨迹点坐标越界: {lat}, {lon} / Track point {index} out of range: {lat}, {lon}")
+                yield lat, lon
+                index += 1
+            # 处理完的节点立即从父节点移除，父节点始终最多只有一个子节点
+            if stack:
+                stack[-1].remove(elem)
+    except ET.ParseError as e:
+        raise GPXError(f"GPX解析失败: {e} / Failed to parse GPX: {e}") from None
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        raise GPXError(f"GPX压缩文件损坏: {e} / Corrupt compressed GPX: {e}") from None
+
+class Coordinates:
+    """基于 array 的紧凑坐标存储，每个点只占 16 字节。
+
+    Attributes:
+        lats (array): 纬度序列。
+        lons (array): 经度序列。
+        bounds (tuple): (minlat, minlon, maxlat, maxlon)，空轨迹时为 None。
+        length (float): 轨迹总长度，单位为米。
+    """
+
+    def __init__(self):
+        self.lats = array('d')
+        self.lons = array('d')
+        self.bounds = None
+        self.length = 0.0
+
+    def __len__(self):
+        return len(self.lats)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(self.lats[index], self.lons[index]))
+        return self.lats[index], self.lons[index]
+
+    def __iter__(self):
+        return zip(self.lats, self.lons)
+
+    def extend(self, points):
+        """追加坐标，并在同一遍历中更新边界和长度。"""
+        lats, lons = self.lats, self.lons
+        if self.bounds is None:
+            minlat = minlon = math.inf
+            maxlat = maxlon = -math.inf
+        else:
+            minlat, minlon, maxlat, maxlon = self.bounds
+        length = self.length
+        prev = (lats[-1], lons[-1]) if lats else None
+        for lat, lon in points:
+            lats.append(lat)
+            lons.append(lon)
+            if lat < minlat: minlat = lat
+            if lat > maxlat: maxlat = lat
+            if lon < minlon: minlon = lon
+            if lon > maxlon: maxlon = lon
+            if prev is not None:
+                length += haversine(prev[0], prev[1], lat, lon)
+            prev = (lat, lon)
+        if lats:
+            self.bounds = (minlat, minlon, maxlat, maxlon)
+        self.length = length
+
+def load_gpx(source):
+    """流式解析GPX文件并返回紧凑坐标存储。
+
+    Args:
+        source: GPX文件路径（.gpx 或 .gpx.gz）或已打开的二进制文件对象。
+
+    Returns:
+        Coordinates: 解析得到的坐标及其边界、长度。
+
+    Raises:
+        GPXError: 文件格式错误或不包含任何轨迹点。
+    """
+    coordinates = Coordinates()
+    coordinates.extend(iter_trkpts(source))
+    if not len(coordinates):
+        raise GPXError("GPX文件中没有轨迹点 / GPX file contains no track points")
+    return coordinates
+
+def write_gpx_points(file, points, bounds=None, buffer_size=64 * 1024, precision=None, compact=False):
+    """将坐标序列写为单轨迹段的GPX文件。
+
+    Args:
+        file: 任意带有 write 方法的文本可写对象，如 open_gpx(path, 'w') 的返回值。
+        points: (lat, lon) 坐标的可迭代对象。
+        bounds (tuple): 可选的 (minlat, minlon, maxlat, maxlon)，写入 metadata。
+        buffer_size (int): 累积多少字符后写入一次，默认64K。
+        precision (int): 坐标保留的小数位数，默认完整精度。
+        compact (bool): 是否使用单行自闭合的 <trkpt .../> 元素。
+
+    Returns:
+        int: 写入的轨迹点数量。
+    """
+    file.write(GPX_HEADER)
+    if bounds is not None:
+        minlat, minlon, maxlat, maxlon = bounds
+        file.write(f'''
+<metadata><bounds minlat="{minlat}" minlon="{minlon}" maxlat="{maxlat}" maxlon="{maxlon}"/></metadata>''')
+    file.write('''
+<trk><trkseg>''' if compact else '''
+    <trk>
+      <trkseg>''')
+
+    trkpt = trkpt_formatter(precision, compact)
+    buffer = []
+    buffered = 0
+    count = 0
+    for lat, lon in points:
+        chunk = trkpt(lat, lon)
+        buffer.append(chunk)
+        buffered += len(chunk)
+        count += 1
+        if buffered >= buffer_size:
+            file.write(''.join(buffer))
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        file.write(''.join(buffer))
+
+    file.write('''
+</trkseg></trk>''' if compact else '''
+      </trkseg>
+    </trk>''')
+    file.write(GPX_FOOTER)
+    return count
@@ -0,0 +1,255 @@
+"""运行时指标：计数器、直方图和仪表，可通过本地HTTP端点导出。
+
+指标保存在进程内的 MetricsRegistry 中，记录开销只有一次加锁和几次加法，可在播放
+循环中每个节拍调用。导出格式为 JSON 或 Prometheus 文本格式::
+
+    registry = MetricsRegistry()
+    sent = registry.counter('points_sent_total', '已推送的坐标点数')
+    sent.inc()
+    server = MetricsServer(registry, port=9464).start()
+    # curl http://127.0.0.1:9464/metrics        Prometheus 文本格式
+    # curl http://127.0.0.1:9464/metrics.json   JSON
+"""
+import json
+import math
+import threading
+from bisect import bisect_left
+
+PREFIX = 'campus_run_'
+DEFAULT_PORT = 9464
+# 秒，覆盖从亚毫秒级的本地调用到隧道卡顿时的秒级延迟
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class Counter:
+    """只增不减的计数器。"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+class Gauge:
+    """可任意设置的瞬时值，也可以传入函数在读取时计算。"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help='', function=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        if self.function is not None:
+            return self.function()
+        return self._value
+
+    def snapshot(self):
+        return self.value
+
+class Histogram:
+    """按固定分桶统计的直方图。
+
+    Args:
+        name (str): 指标名。
+        help (str): 说明文字。
+        buckets (tuple): 升序排列的桶上界。
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help='', buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[position] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """由分桶估计分位数，返回所在桶的上界与观测最大值中的较小者（最后一个桶返回最大值）。"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[position], self.max) if position < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.mean,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次，重复获取返回同一个对象。"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.kind} / Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help=''):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help='', function=None):
+        gauge = self._get(Gauge, name, help)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._metrics.values()))
+
+    def snapshot(self):
+        """返回 {指标名: 值} 字典，直方图的值为包含 count、mean、分位数等的字典。"""
+        return {metric.name: metric.snapshot() for metric in self}
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self):
+        """导出为 Prometheus 文本格式。"""
+        lines = []
+        for metric in self:
+            name = PREFIX + metric.name
+            if metric.help:
+                lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            if metric.kind != 'histogram':
+                lines.append(f'{name} {metric.value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, metric.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {metric.count}')
+            lines.append(f'{name}_sum {metric.sum}')
+            lines.append(f'{name}_count {metric.count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """返回适合在终端显示的多行文本。"""
+        lines = []
+        for metric in self:
+            if metric.kind == 'histogram':
+                lines.append(f"{metric.name}: count={metric.count} mean={metric.mean * 1000:.2f}ms "
+                             f"p50={metric.quantile(0.5) * 1000:.2f}ms p95={metric.quantile(0.95) * 1000:.2f}ms "
+                             f"max={metric.max * 1000:.2f}ms")
+            else:
+                value = metric.value
+                lines.append(f"{metric.name}: {value:.2f}" if isinstance(value, float) else f"{metric.name}: {value}")
+        return '\n'.join(lines)
+
+class MetricsServer:
+    """在后台线程中通过HTTP导出指标，只监听本机地址。
+
+    路径 /metrics 返回 Prometheus 文本格式，/metrics.json 返回 JSON。
+
+    Args:
+        registry (MetricsRegistry): 要导出的注册表。
+        host (str): 监听地址，默认 127.0.0.1。
+        port (int): 监听端口，0 表示由系统分配。
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=DEFAULT_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
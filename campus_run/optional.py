@@ -0,0 +1,11 @@
+"""可选依赖的延迟导入，供各模块共用。"""
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """首次使用时才导入 NumPy，未安装时返回 None。"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
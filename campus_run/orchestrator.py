@@ -0,0 +1,238 @@
+"""多设备并发播放。
+
+在一个进程内为每台已连接设备维护独立的隧道监督器和位置服务连接，并用 asyncio
+同时向各设备播放各自的轨迹。相同路径的轨迹只解析一次，在设备之间共享。
+
+用法::
+
+    python -m campus_run.orchestrator data.gpx                       # 所有设备播放同一条轨迹
+    python -m campus_run.orchestrator data.gpx --assign UDID=b.gpx   # 为指定设备分配其他轨迹
+"""
+import argparse
+import asyncio
+import inspect
+import logging
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .gpx_io import load_gpx
+from .playback import DEFAULT_RATE, LocationService, PlaybackError, TickStats, resample
+from .tunnel import TunnelSupervisor, probe_tunneld
+
+logger = logging.getLogger(__name__)
+
+def discover_devices():
+    """返回通过 USB 连接的所有设备 UDID。"""
+    from pymobiledevice3.usbmux import list_devices
+    return sorted({device.serial for device in list_devices()})
+
+class TrackCache:
+    """按路径缓存已解析的轨迹，多台设备播放同一文件时只解析一次。
+
+    每个路径对应一个加载任务，只有请求同一文件的调用会等待，不同文件并行加载。
+    加载失败时移除该任务，下次请求重新加载。
+    """
+
+    def __init__(self, loader=load_gpx):
+        self.loader = loader
+        self._tracks = {}
+
+    async def get(self, path):
+        task = self._tracks.get(path)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(self.loader, path))
+            self._tracks[path] = task
+        try:
+            # shield 使单个调用被取消时不会取消其他设备共享的加载任务
+            return await asyncio.shield(task)
+        except Exception:
+            if task.done() and self._tracks.get(path) is task:
+                del self._tracks[path]
+            raise
+
+class DevicePlayer:
+    """单台设备的异步播放任务。
+
+    节拍按 start + k / rate 计算，与 TickScheduler 一致。服务的 set 方法若为
+    协程函数则直接 await，否则在该设备专用的单线程执行器中调用，保证同一设备
+    上的推送顺序，同时不阻塞事件循环。
+
+    Args:
+        udid (str): 设备标识。
+        service: 提供 set(lat, lon) 的位置服务。
+        points: 已按 rate 采样、支持 len() 和下标访问的坐标序列。
+        rate (float): 每秒推送的点数。
+        clock (callable): 单调时钟。
+    """
+
+    def __init__(self, udid, service, points, rate=DEFAULT_RATE, clock=time.monotonic):
+        self.udid = udid
+        self.service = service
+        self.points = points
+        self.rate = rate
+        self.clock = clock
+        self.stats = TickStats()
+        self.sent = 0
+        self._executor = None if inspect.iscoroutinefunction(service.set) else \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'device-{udid}')
+
+    async def run(self, start_index=0):
+        loop = asyncio.get_running_loop()
+        start = self.clock()
+        try:
+            for tick, index in enumerate(range(start_index, len(self.points))):
+                deadline = start + tick / self.rate
+                delay = deadline - self.clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.stats.record(self.clock() - deadline)
+
+                lat, lon = self.points[index]
+                try:
+                    if self._executor is None:
+                        await self.service.set(lat, lon)
+                    else:
+                        await loop.run_in_executor(self._executor, self.service.set, lat, lon)
+                except Exception as e:
+                    raise PlaybackError(f"设备 {self.udid} 第 {index} 个点推送失败: {e} / Device {self.udid} failed to send point {index}: {e}", index) from e
+                self.sent += 1
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+        return self.sent
+
+class Orchestrator:
+    """在单个进程中驱动多台设备。
+
+    Args:
+        connect (callable): connect(udid) -> 位置服务，默认 LocationService.open。
+        spawn (callable): spawn(command) -> Popen；为 None 时不管理隧道进程（如测试或
+            iOS 16 及以下设备）。
+        python_cmd (str): 启动 pymobiledevice3 所用的 Python 解释器。
+        ios17 (bool): 是否使用 lockdown start-tunnel（iOS 17.4+）。
+        loader (callable): loader(path) -> 坐标序列，默认 load_gpx。
+    """
+
+    def __init__(self, connect=None, spawn=None, python_cmd=sys.executable, ios17=False, loader=load_gpx):
+        self.connect = connect or (lambda udid: LocationService.open(udid=udid))
+        self.spawn = spawn
+        self.python_cmd = python_cmd
+        self.ios17 = ios17
+        self.tracks = TrackCache(loader)
+        self.tunneld = None
+        self.tunnels = {}
+        self.services = {}
+        self.players = {}
+
+    async def _ensure_tunnel(self, udid):
+        if self.spawn is None or udid in self.tunnels:
+            return
+        command = f"{self.python_cmd} -m pymobiledevice3 {'lockdown' if self.ios17 else 'remote'} start-tunnel --udid {udid}"
+        # tunneld 重启后依赖它的设备隧道随之重启；只有 iOS 17.4+ 的隧道会登记到 tunneld
+        supervisor = TunnelSupervisor(self.spawn, [(f'tunnel[{udid}]', command)],
+                                      probe=partial(probe_tunneld, udid=udid, require_device=self.ios17),
+                                      parent=self.tunneld)
+        if not await asyncio.to_thread(supervisor.start):
+            supervisor.stop()
+            raise PlaybackError(f"设备 {udid} 隧道建立失败 / Failed to establish tunnel for device {udid}")
+        logger.info(f"设备 {udid} 隧道已建立，耗时 {supervisor.connect_latency:.2f} 秒 / Tunnel for {udid} ready in {supervisor.connect_latency:.2f}s")
+        self.tunnels[udid] = supervisor
+
+    async def connect_devices(self, udids):
+        """为每台设备建立隧道和位置服务连接，已连接的设备直接复用。"""
+        if self.spawn is not None and self.tunneld is None:
+            self.tunneld = TunnelSupervisor(self.spawn, [('tunneld', f"{self.python_cmd} -m pymobiledevice3 remote tunneld")],
+                                            probe=partial(probe_tunneld, require_device=False))
+            if not await asyncio.to_thread(self.tunneld.start):
+                raise PlaybackError("tunneld 启动失败 / Failed to start tunneld")
+
+        async def connect_one(udid):
+            await self._ensure_tunnel(udid)
+            if udid not in self.services:
+                self.services[udid] = await asyncio.to_thread(self.connect, udid)
+
+        await asyncio.gather(*(connect_one(udid) for udid in udids))
+
+    async def play(self, assignments, rate=DEFAULT_RATE):
+        """并发播放。
+
+        Args:
+            assignments (dict): UDID 到轨迹路径的映射。
+            rate (float): 每秒推送的点数。
+
+        Returns:
+            dict: UDID 到推送点数或异常的映射，单台设备失败不影响其他设备。
+        """
+        await self.connect_devices(assignments)
+        for udid, path in assignments.items():
+            points = resample(await self.tracks.get(path), rate)
+            self.players[udid] = DevicePlayer(udid, self.services[udid], points, rate)
+
+        udids = list(assignments)
+        results = await asyncio.gather(*(self.players[udid].run() for udid in udids), return_exceptions=True)
+        for udid, result in zip(udids, results):
+            if isinstance(result, Exception):
+                # 失败设备的连接可能已失效，下次播放时重新建立
+                self.close_service(udid)
+        return dict(zip(udids, results))
+
+    def close_service(self, udid):
+        service = self.services.pop(udid, None)
+        if service is not None and hasattr(service, 'close'):
+            try:
+                service.close()
+            except Exception as e:
+                logger.warning(f"关闭设备 {udid} 连接失败: {e} / Failed to close connection to {udid}: {e}")
+
+    def close(self):
+        for udid in list(self.services):
+            self.close_service(udid)
+        for supervisor in self.tunnels.values():
+            supervisor.stop()
+        self.tunnels.clear()
+        if self.tunneld is not None:
+            self.tunneld.stop()
+            self.tunneld = None
+
+def _spawn(command):
+    return subprocess.Popen(command.split(' '), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def main():
+    parser = argparse.ArgumentParser(description="多设备并发位置模拟 / Concurrent multi-device location simulation")
+    parser.add_argument('track', help="默认轨迹文件 / Default track file")
+    parser.add_argument('--assign', action='append', default=[], metavar='UDID=PATH',
+                        help="为指定设备分配轨迹 / Assign a track to a specific device")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="每秒更新次数 / Updates per second")
+    parser.add_argument('--ios17', action='store_true', help="用于iOS 17.4及以上版本 / For iOS 17.4 and above")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    udids = discover_devices()
+    if not udids:
+        logger.error("未发现已连接的设备 / No connected devices found")
+        sys.exit(1)
+    assignments = {udid: args.track for udid in udids}
+    for item in args.assign:
+        udid, _, path = item.partition('=')
+        assignments[udid] = path
+    logger.info(f"发现 {len(udids)} 台设备 / Found {len(udids)} devices: {', '.join(udids)}")
+
+    orchestrator = Orchestrator(spawn=_spawn, ios17=args.ios17)
+    try:
+        results = asyncio.run(orchestrator.play(assignments, args.rate))
+    except KeyboardInterrupt:
+        logger.info("停止位置模拟... / Stopping location simulation...")
+        results = {}
+    finally:
+        orchestrator.close()
+    for udid, result in results.items():
+        if isinstance(result, Exception):
+            logger.error(f"{udid}: {result}")
+        else:
+            logger.info(f"{udid}: 推送 {result} 个坐标点，{orchestrator.players[udid].stats.summary()} / sent {result} points")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""分阶段的流式播放管线。
+
+    读取线程 --[有界队列]--> 重采样线程 --[有界队列]--> 发送（调用方线程）
+
+读取和重采样在后台线程中进行，队列满时阻塞（反压），内存占用与轨迹长度无关。
+发送端按单调时钟节拍推送；设备卡顿导致落后超过 max_lag 时，直接跳到当前时刻
+对应的点，中间已过期的点被合并丢弃，而不是在恢复后集中补发，位置始终与实际
+时间保持一致。
+
+可使用假设备端到端验证::
+
+    python -m campus_run.pipeline data.gpx --points 400 --latency 0.005 --stall 100:1.5
+"""
+import argparse
+import itertools
+import json
+import queue
+import threading
+import time
+
+from .fake import FakeLocationService, parse_stalls
+from .gpx_io import iter_trkpts
+from .metrics import MetricsRegistry
+from .playback import DEFAULT_RATE, SAMPLE_RATE, PlaybackError, TickScheduler
+
+DEFAULT_QUEUE_SIZE = 256
+_END = object()
+
+def source_offset(index, source_rate, target_rate):
+    """重采样后第 index 个点所在区间的起点在原序列中的下标。"""
+    return int(index * (source_rate / target_rate))
+
+def iter_resampled(points, source_rate, target_rate, start=0):
+    """流式重采样，输出与 ResampledTrack 相同，但只需要一次顺序遍历。
+
+    Args:
+        points: (lat, lon) 的任意可迭代对象，从原序列第 source_offset(start) 个点开始。
+        source_rate (float): 原序列的采样率（每秒点数）。
+        target_rate (float): 目标更新频率（每秒点数）。
+        start (int): 第一个输出点在重采样序列中的下标。
+
+    Yields:
+        tuple: 重采样后的 (lat, lon)，即 ResampledTrack 的第 start 个点及之后的点。
+    """
+    ratio = source_rate / target_rate
+    iterator = iter(points)
+    current = next(iterator, None)
+    if current is None:
+        return
+    following = next(iterator, None)
+    base = source_offset(start, source_rate, target_rate)
+    index = start
+    while True:
+        position = index * ratio
+        target = int(position)
+        while base < target:
+            if following is None:
+                return
+            base += 1
+            current = following
+            following = next(iterator, None)
+        lat, lon = current
+        fraction = position - target
+        if fraction:
+            if following is None:
+                return
+            lat += (following[0] - lat) * fraction
+            lon += (following[1] - lon) * fraction
+        yield lat, lon
+        index += 1
+
+def _iter_from(points, offset):
+    """从原序列第 offset 个点开始遍历。
+
+    Coordinates、Track 等支持 len() 和下标访问的序列直接按下标跳转，续播时耗时
+    与起点位置无关；一般的迭代器只能逐个跳过。
+    """
+    if hasattr(points, '__getitem__') and hasattr(points, '__len__'):
+        return (points[index] for index in range(offset, len(points)))
+    return itertools.islice(points, offset, None)
+
+class PlaybackPipeline:
+    """读取、重采样与发送三个阶段通过有界队列连接的播放管线。
+
+    Args:
+        service: 带有 set(lat, lon) 方法的位置服务。
+        rate (float): 每秒推送的点数。
+        source_rate (float): 输入轨迹的采样率。
+        queue_size (int): 每个队列的容量。
+        max_lag (float): 落后超过该时长（秒）时丢弃过期点，默认一个节拍间隔。
+        late_threshold (float): 推送晚于截止时间超过该值（秒）即计为迟到，默认半个节拍间隔。
+        clock (callable): 单调时钟，默认 time.monotonic。
+        metrics (MetricsRegistry): 指标注册表，默认新建一个。
+
+    Attributes:
+        stats (TickStats): 最近一次播放的节拍统计。
+        sent (int): 已推送的点数。
+        dropped (int): 因落后被合并丢弃的点数。
+        late (int): 推送时已迟到的点数。
+        position (int): 下一个待推送点的下标，播放完成时等于总点数。
+        last_point (tuple): 最近一次推送的 (lat, lon)，可在其他线程中读取以显示当前位置。
+    """
+
+    def __init__(self, service, rate=DEFAULT_RATE, source_rate=SAMPLE_RATE, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_lag=None, late_threshold=None, clock=time.monotonic, metrics=None):
+        self.service = service
+        self.rate = rate
+        self.source_rate = source_rate
+        self.queue_size = queue_size
+        self.max_lag = 1 / rate if max_lag is None else max_lag
+        self.late_threshold = 0.5 / rate if late_threshold is None else late_threshold
+        self.clock = clock
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.stats = None
+        self.sent = 0
+        self.dropped = 0
+        self.late = 0
+        self.position = 0
+        self.last_point = None
+        self._stop = threading.Event()
+        self._error = None
+
+    def stop(self):
+        """请求停止当前播放，可在其他线程中调用。"""
+        self._stop.set()
+
+    def summary(self):
+        return (f"推送 {self.sent} 个坐标点，丢弃过期点 {self.dropped} 个，迟到 {self.late} 个 / "
+                f"{self.sent} points sent, {self.dropped} stale points dropped, {self.late} late")
+
+    def _put(self, target, item):
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source):
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _drain(self, source):
+        while True:
+            item = self._get(source)
+            if item is _END:
+                return
+            yield item
+
+    def _read(self, points, raw, offset):
+        try:
+            for point in _iter_from(points, offset):
+                if not self._put(raw, point):
+                    return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(raw, _END)
+
+    def _resample(self, raw, ticks, start_index):
+        try:
+            resampled = iter_resampled(self._drain(raw), self.source_rate, self.rate, start_index)
+            for index, (lat, lon) in enumerate(resampled, start_index):
+                if not self._put(ticks, (index - start_index, index, lat, lon)):
+                    return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._put(ticks, _END)
+
+    def run(self, points, start_index=0, on_point=None):
+        """播放坐标流。
+
+        Args:
+            points: (lat, lon) 的任意可迭代对象，如 iter_trkpts(path) 或 Coordinates。
+            start_index (int): 按 rate 采样后的起始点下标。
+            on_point (callable): 每推送一个点后调用 on_point(index, lat, lon)。
+
+        Returns:
+            int: 本次推送的点数。
+
+        Raises:
+            PlaybackError: 位置服务推送失败。
+        """
+        self._stop.clear()
+        self._error = None
+        self.sent = self.dropped = self.late = 0
+        self.position = start_index
+        raw = queue.Queue(self.queue_size)
+        ticks = queue.Queue(self.queue_size)
+        offset = source_offset(start_index, self.source_rate, self.rate)
+        workers = [
+            threading.Thread(target=self._read, args=(points, raw, offset), name='pipeline-reader', daemon=True),
+            threading.Thread(target=self._resample, args=(raw, ticks, start_index), name='pipeline-resampler', daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        scheduler = TickScheduler(self.rate, self.clock, self._stop)
+        self.stats = scheduler.stats
+        points_sent = self.metrics.counter('points_sent_total', '已推送的坐标点数 / Points sent')
+        send_errors = self.metrics.counter('send_errors_total', '推送失败次数 / Failed sends')
+        points_dropped = self.metrics.counter('points_dropped_total', '因落后被丢弃的过期点 / Stale points dropped')
+        points_late = self.metrics.counter('points_late_total', '迟到推送的点数 / Points sent late')
+        send_latency = self.metrics.histogram('send_latency_seconds', '单次推送耗时 / Per-update send latency')
+        lateness = self.metrics.histogram('schedule_lateness_seconds', '节拍相对截止时间的延迟 / Tick lateness')
+        self.metrics.gauge('playback_rate_hz', '当前播放频率 / Playback rate').set(self.rate)
+        self.metrics.gauge('pipeline_queue_depth', '待发送队列长度 / Points waiting to be sent', ticks.qsize)
+        clock = self.clock
+
+        try:
+            item = self._get(ticks)
+            while item is not _END:
+                tick, index, lat, lon = item
+                if not scheduler.wait(tick):
+                    break
+                lag = clock() - scheduler.deadline(tick)
+                if lag > self.max_lag:
+                    # 落后过多：跳到当前时刻对应的点，中间已过期的点合并丢弃
+                    current = int((clock() - scheduler.start) * self.rate)
+                    while tick < current:
+                        following = self._get(ticks)
+                        if following is _END:
+                            break
+                        self.dropped += 1
+                        points_dropped.inc()
+                        tick, index, lat, lon = following
+                    lag = clock() - scheduler.deadline(tick)
+                lateness.observe(max(0.0, lag))
+                if lag > self.late_threshold:
+                    self.late += 1
+                    points_late.inc()
+
+                begin = clock()
+                try:
+                    self.service.set(lat, lon)
+                except Exception as e:
+                    send_errors.inc()
+                    raise PlaybackError(f"第 {index} 个点推送失败: {e} / Failed to send point {index}: {e}", index) from e
+                send_latency.observe(clock() - begin)
+                points_sent.inc()
+                self.sent += 1
+                self.position = index + 1
+                self.last_point = (lat, lon)
+                if on_point is not None:
+                    on_point(index, lat, lon)
+                item = self._get(ticks)
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+        if self._error is not None:
+            raise self._error
+        return self.sent
+
+def main():
+    parser = argparse.ArgumentParser(description="使用假设备端到端运行播放管线 / Run the playback pipeline end to end against a fake device")
+    parser.add_argument('track', help="GPX文件 / GPX file")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="每秒推送的点数 / Updates per second")
+    parser.add_argument('--points', type=int, help="最多读取的原始点数 / Maximum source points to read")
+    parser.add_argument('--latency', type=float, default=0.0, help="每次推送的固定耗时（秒） / Fixed send latency (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="额外随机耗时上限（秒） / Extra random latency (s)")
+    parser.add_argument('--stall', default='', help="卡顿设置，如 100:1.5,300:0.5 / Stalls, e.g. 100:1.5,300:0.5")
+    args = parser.parse_args()
+
+    def source():
+        for count, point in enumerate(iter_trkpts(args.track)):
+            if args.points is not None and count >= args.points:
+                return
+            yield point
+
+    service = FakeLocationService(args.latency, args.jitter, parse_stalls(args.stall))
+    pipeline = PlaybackPipeline(service, rate=args.rate)
+    begin = time.monotonic()
+    pipeline.run(source())
+    print(json.dumps({
+        'sent': pipeline.sent,
+        'dropped': pipeline.dropped,
+        'late': pipeline.late,
+        'position': pipeline.position,
+        'seconds': time.monotonic() - begin,
+        'mean_jitter_ms': pipeline.stats.mean_jitter * 1000,
+        'max_lateness_ms': pipeline.stats.max_jitter * 1000,
+        'metrics': pipeline.metrics.snapshot(),
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
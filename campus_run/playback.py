@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# 生成路线时的采样率：generate 模块按 speed/SAMPLE_RATE 计算坐标间隔，
+# 即每个点代表 1/SAMPLE_RATE 秒的移动
+SAMPLE_RATE = 20
+DEFAULT_RATE = SAMPLE_RATE
+# 距截止时间小于该值时改为忙等，弥补系统 sleep 的粒度（Windows 上约 15 毫秒）
+SPIN_THRESHOLD = 0.002
+
+class PlaybackError(RuntimeError):
+    """位置推送失败。
+
+    Attributes:
+        index (int): 推送失败的坐标点下标。
+    """
+
+    def __init__(self, message, index=None):
+        super().__init__(message)
+        self.index = index
+
+def _tunneld_lockdown(udid=None):
+    """通过 tunneld 获取 iOS 17.4+ 设备的 RSD 连接。"""
+    try:
+        from pymobiledevice3.tunneld.api import get_tunneld_devices
+    except ImportError:
+        from pymobiledevice3.tunneld import get_tunneld_devices
+
+    devices = get_tunneld_devices()
+    if not devices:
+        raise PlaybackError("tunneld 中没有可用设备 / No devices available from tunneld")
+    selected = None
+    for rsd in devices:
+        if udid is None or rsd.udid == udid:
+            selected = rsd
+        else:
+            rsd.close()
+    if selected is None:
+        raise PlaybackError(f"tunneld 中找不到设备 {udid} / Device {udid} not found in tunneld")
+    return selected
+
+def _usbmux_lockdown(udid=None):
+    """通过 usbmux 获取 iOS 16 及以下设备的 lockdown 连接。"""
+    from pymobiledevice3.lockdown import create_using_usbmux
+    return create_using_usbmux(serial=udid)
+
+class LocationService:
+    """DVT 位置模拟服务的长连接封装，在多次播放之间复用。
+
+    任何提供 set(lat, lon) 和 clear() 方法的对象都可以代替它传给
+    PlaybackPipeline，便于用假服务在本地测试。
+    """
+
+    def __init__(self, dvt, simulation, lockdown=None):
+        self._dvt = dvt
+        self._simulation = simulation
+        self._lockdown = lockdown
+
+    @classmethod
+    def open(cls, udid=None):
+        """建立到设备的 DVT 连接。
+
+        与 pymobiledevice3 命令行行为一致：先尝试 usbmux 直连，失败后再通过
+        tunneld 连接（iOS 17+ 的开发者服务只能经由隧道访问）。
+
+        Args:
+            udid (str): 指定设备，默认使用第一个可用设备。
+
+        Returns:
+            LocationService: 已完成握手的服务对象。
+        """
+        try:
+            return cls._connect(_usbmux_lockdown(udid))
+        except Exception as e:
+            logger.info(f"usbmux 连接失败，尝试通过 tunneld 连接: {e} / usbmux connection failed, trying tunneld: {e}")
+        return cls._connect(_tunneld_lockdown(udid))
+
+    @classmethod
+    def _connect(cls, lockdown):
+        from pymobiledevice3.services.dvt.dvt_secure_socket_proxy import DvtSecureSocketProxyService
+        from pymobiledevice3.services.dvt.instruments.location_simulation import LocationSimulation
+
+        try:
+            dvt = DvtSecureSocketProxyService(lockdown=lockdown)
+            dvt.perform_handshake()
+        except Exception as e:
+            lockdown.close()
+            raise PlaybackError(f"无法连接位置模拟服务: {e} / Failed to connect to location simulation service: {e}") from e
+        return cls(dvt, LocationSimulation(dvt), lockdown)
+
+    def set(self, lat, lon):
+        self._simulation.set(lat, lon)
+
+    def clear(self):
+        self._simulation.clear()
+
+    def close(self):
+        try:
+            self._dvt.close()
+        finally:
+            if self._lockdown is not None:
+                self._lockdown.close()
+
+class TickStats:
+    """节拍计时统计。
+
+    Attributes:
+        ticks (int): 已执行的节拍数。
+        total_jitter (float): 各节拍实际时刻与截止时间之差的累计值（秒）。
+        max_jitter (float): 单个节拍的最大延迟（秒）。
+        drift (float): 最近一个节拍相对理想时刻的偏移（秒），即累计漂移。
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+        self.drift = 0.0
+
+    @property
+    def mean_jitter(self):
+        return self.total_jitter / self.ticks if self.ticks else 0.0
+
+    def record(self, lateness):
+        self.ticks += 1
+        self.total_jitter += abs(lateness)
+        if lateness > self.max_jitter:
+            self.max_jitter = lateness
+        self.drift = lateness
+
+    def summary(self):
+        return (f"节拍 {self.ticks}，平均抖动 {self.mean_jitter * 1000:.2f} 毫秒，最大延迟 {self.max_jitter * 1000:.2f} 毫秒，"
+                f"累计漂移 {self.drift * 1000:.2f} 毫秒 / {self.ticks} ticks, mean jitter {self.mean_jitter * 1000:.2f} ms, "
+                f"max lateness {self.max_jitter * 1000:.2f} ms, drift {self.drift * 1000:.2f} ms")
+
+class TickScheduler:
+    """无漂移的高精度节拍调度器。
+
+    第 k 个节拍的截止时间固定为 start + k / rate，由单调时钟的起点直接计算，
+    不依赖上一次 sleep 的实际时长，因此误差不会随播放时间累积。
+
+    Args:
+        rate (float): 每秒节拍数。
+        clock (callable): 单调时钟，默认 time.monotonic。
+        stop_event (threading.Event): 置位后 wait() 立即返回 False。
+        spin_threshold (float): 最后一段改用忙等的时长（秒），为 0 时只使用 sleep。
+    """
+
+    def __init__(self, rate, clock=time.monotonic, stop_event=None, spin_threshold=SPIN_THRESHOLD):
+        if rate <= 0:
+            raise ValueError(f"更新频率必须为正数: {rate} / Update rate must be positive: {rate}")
+        self.rate = rate
+        self.clock = clock
+        self.stop_event = stop_event or threading.Event()
+        self.spin_threshold = spin_threshold
+        self.stats = TickStats()
+        self.start = None
+
+    def deadline(self, tick):
+        return self.start + tick / self.rate
+
+    def wait(self, tick):
+        """等待第 tick 个节拍到来并记录抖动。
+
+        Returns:
+            bool: 到达截止时间返回 True，被停止返回 False。
+        """
+        if self.start is None:
+            self.start = self.clock()
+        deadline = self.deadline(tick)
+        delay = deadline - self.clock() - self.spin_threshold
+        if delay > 0 and self.stop_event.wait(delay):
+            return False
+        while self.clock() < deadline:
+            if self.stop_event.is_set():
+                return False
+        if self.stop_event.is_set():
+            return False
+        self.stats.record(self.clock() - deadline)
+        return True
+
+def _resampled_length(count, ratio):
+    """重采样后的点数，即满足 i * ratio <= count - 1 的下标 i 的个数。
+
+    与 pipeline.iter_resampled 使用同一个浮点表达式 i * ratio 判断边界，
+    直接计算 (count - 1) / ratio 在某些频率下会因舍入多算或少算一个点。
+    """
+    if not count:
+        return 0
+    last = count - 1
+    length = int(last / ratio) + 1
+    while length > 1 and (length - 1) * ratio > last:
+        length -= 1
+    while length * ratio <= last:
+        length += 1
+    return length
+
+class ResampledTrack:
+    """将坐标序列按新的更新频率重采样的惰性视图。
+
+    第 i 个输出点对应原序列中 i * source_rate / target_rate 的位置，在相邻
+    两点之间线性插值，只在访问时计算，不复制原数据。
+
+    Args:
+        points: 支持 len() 和下标访问的 (lat, lon) 序列。
+        source_rate (float): 原序列的采样率（每秒点数）。
+        target_rate (float): 目标更新频率（每秒点数）。
+    """
+
+    def __init__(self, points, source_rate, target_rate):
+        self.points = points
+        self.ratio = source_rate / target_rate
+        self._length = _resampled_length(len(points), self.ratio)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("轨迹下标越界 / Track index out of range")
+        position = index * self.ratio
+        base = int(position)
+        fraction = position - base
+        lat, lon = self.points[base]
+        if fraction and base + 1 < len(self.points):
+            next_lat, next_lon = self.points[base + 1]
+            lat += (next_lat - lat) * fraction
+            lon += (next_lon - lon) * fraction
+        return lat, lon
+
+    def __iter__(self):
+        return (self[i] for i in range(self._length))
+
+def resample(points, target_rate, source_rate=SAMPLE_RATE):
+    """按目标更新频率重采样，频率相同时直接返回原序列。"""
+    if target_rate == source_rate:
+        return points
+    return ResampledTrack(points, source_rate, target_rate)
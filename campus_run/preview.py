@@ -0,0 +1,247 @@
+"""轨迹预览的多级细节（LOD）金字塔与视图变换，不依赖 tkinter。
+
+直接把几十万个点画到画布上会让界面卡死。这里预先把轨迹投影到局部平面，
+按容差逐级加倍抽稀得到一组折线，并把每一级切成带包围盒的小块。绘制时按
+当前缩放（米/像素）选择误差不超过约一个像素的最粗一级，只取与可见区域相交的
+块；多圈重叠的长轨迹在这一级仍然过多时，继续换用更粗的级别，使每帧绘制的
+点数不超过 max_points，与轨迹总点数无关::
+
+    pyramid = TrackPyramid(load_gpx('data.gpx'))    # 较慢，可在后台线程中构建
+    view = PreviewView(600, 400)
+    view.fit(pyramid.bounds)
+    for xs, ys in pyramid.polylines(view.scale, view.viewport()):
+        canvas.create_line(view.flatten(xs, ys))
+"""
+import math
+from array import array
+
+from .geo import EARTH_RADIUS
+
+BASE_TOLERANCE = 0.25  # 米，第一级抽稀的容差，之后每级加倍
+MIN_LEVEL_POINTS = 256
+CHUNK_SIZE = 256
+MAX_FRAME_POINTS = 20000  # 每帧最多绘制的点数，Tk 画布在此规模下仍可保持流畅
+
+def _thin(xs, ys, tolerance):
+    """径向距离抽稀：丢弃距上一个保留点不足 tolerance 的点，首尾点始终保留。
+
+    被丢弃的点都在上一个保留点的 tolerance 范围内，因此与抽稀后折线的偏差
+    不超过 tolerance。
+    """
+    count = len(xs)
+    keep_x = array('d', xs[:1])
+    keep_y = array('d', ys[:1])
+    if count < 2:
+        return keep_x, keep_y
+    lx, ly = xs[0], ys[0]
+    limit = tolerance * tolerance
+    for i in range(1, count - 1):
+        x = xs[i]
+        y = ys[i]
+        dx = x - lx
+        dy = y - ly
+        if dx * dx + dy * dy >= limit:
+            keep_x.append(x)
+            keep_y.append(y)
+            lx, ly = x, y
+    keep_x.append(xs[-1])
+    keep_y.append(ys[-1])
+    return keep_x, keep_y
+
+class Level:
+    """金字塔中的一级折线。
+
+    Attributes:
+        tolerance (float): 相对原始轨迹的最大偏差上界（米），原始分辨率为 0。
+        xs, ys (array): 局部平面坐标（米）。
+        chunks (list): [(start, end, xmin, ymin, xmax, ymax), ...]，end 包含在内，
+            相邻块共用端点，拼接后是连续的折线。
+    """
+
+    def __init__(self, tolerance, xs, ys, chunk_size=CHUNK_SIZE):
+        self.tolerance = tolerance
+        self.xs = xs
+        self.ys = ys
+        self.chunks = []
+        last = len(xs) - 1
+        for start in range(0, max(last, 1), chunk_size):
+            end = min(start + chunk_size, last)
+            chunk_x = xs[start:end + 1]
+            chunk_y = ys[start:end + 1]
+            self.chunks.append((start, end, min(chunk_x), min(chunk_y), max(chunk_x), max(chunk_y)))
+
+    def __len__(self):
+        return len(self.xs)
+
+class TrackPyramid:
+    """轨迹的多级细节金字塔。
+
+    Args:
+        points: (lat, lon) 序列，如 load_gpx() 返回的 Coordinates。
+        base_tolerance (float): 第一级抽稀的容差（米），之后每级加倍。
+        min_points (int): 点数不超过该值时不再继续生成更粗的一级。
+        chunk_size (int): 每个包围盒块包含的点数。
+
+    Attributes:
+        origin (tuple): 投影原点 (lat, lon)，即第一个点。
+        levels (list): 由细到粗的 Level，levels[0] 为原始分辨率。
+        bounds (tuple): (xmin, ymin, xmax, ymax)，单位为米。
+    """
+
+    def __init__(self, points, base_tolerance=BASE_TOLERANCE, min_points=MIN_LEVEL_POINTS, chunk_size=CHUNK_SIZE):
+        iterator = iter(points)
+        first = next(iterator, None)
+        if first is None:
+            raise ValueError("轨迹中没有坐标点 / Track contains no points")
+        self.origin = first
+        self._scale_y = math.radians(EARTH_RADIUS)
+        self._scale_x = self._scale_y * math.cos(math.radians(first[0]))
+
+        xs = array('d', [0.0])
+        ys = array('d', [0.0])
+        lat0, lon0 = first
+        scale_x, scale_y = self._scale_x, self._scale_y
+        for lat, lon in iterator:
+            xs.append((lon - lon0) * scale_x)
+            ys.append((lat - lat0) * scale_y)
+
+        level = Level(0.0, xs, ys, chunk_size)
+        self.levels = [level]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        tolerance = base_tolerance
+        while len(level) > min_points:
+            thin_x, thin_y = _thin(level.xs, level.ys, tolerance)
+            if len(thin_x) == len(level):
+                tolerance *= 2
+                continue
+            # 每级都从上一级抽稀，偏差上界为各级容差之和，不超过当前容差的两倍
+            level = Level(tolerance * 2, thin_x, thin_y, chunk_size)
+            self.levels.append(level)
+            tolerance *= 2
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def project(self, lat, lon):
+        """将经纬度投影到金字塔的局部平面坐标（米）。"""
+        return (lon - self.origin[1]) * self._scale_x, (lat - self.origin[0]) * self._scale_y
+
+    def level_for(self, scale):
+        """返回误差不超过 scale（米/像素，即一个像素）的最粗一级。"""
+        chosen = self.levels[0]
+        for level in self.levels[1:]:
+            if level.tolerance > scale:
+                break
+            chosen = level
+        return chosen
+
+    @staticmethod
+    def _visible_runs(level, viewport):
+        """返回与可见区域相交的连续块区间 [(start, end), ...] 及其总点数。"""
+        runs = []
+        count = 0
+        run_start = run_end = None
+        for start, end, xmin, ymin, xmax, ymax in level.chunks:
+            if viewport is not None and (xmax < viewport[0] or xmin > viewport[2] or
+                                         ymax < viewport[1] or ymin > viewport[3]):
+                continue
+            count += end - start
+            if run_end == start:
+                run_end = end
+                continue
+            if run_start is not None:
+                runs.append((run_start, run_end))
+            run_start, run_end = start, end
+        if run_start is not None:
+            runs.append((run_start, run_end))
+        return runs, count
+
+    def polylines(self, scale, viewport=None, max_points=MAX_FRAME_POINTS):
+        """返回需要绘制的折线列表。
+
+        Args:
+            scale (float): 当前缩放，单位为米/像素。
+            viewport (tuple): 可见区域 (xmin, ymin, xmax, ymax)，为 None 时返回整条轨迹。
+            max_points (int): 可见点数超过该值时改用更粗的一级。
+
+        Returns:
+            list: [(xs, ys), ...]，每项是一段连续折线的坐标数组切片。
+        """
+        index = self.levels.index(self.level_for(scale))
+        level = self.levels[index]
+        runs, count = self._visible_runs(level, viewport)
+        while count > max_points and index + 1 < len(self.levels):
+            index += 1
+            level = self.levels[index]
+            runs, count = self._visible_runs(level, viewport)
+        return [(level.xs[start:end + 1], level.ys[start:end + 1]) for start, end in runs]
+
+class PreviewView:
+    """画布的平移缩放状态以及局部平面坐标到像素坐标的变换。
+
+    Args:
+        width, height (int): 画布大小（像素）。
+
+    Attributes:
+        center_x, center_y (float): 画布中心对应的局部坐标（米）。
+        scale (float): 每像素对应的米数，越小越放大。
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.center_x = 0.0
+        self.center_y = 0.0
+        self.scale = 1.0
+
+    def resize(self, width, height):
+        self.width = max(1, width)
+        self.height = max(1, height)
+
+    def fit(self, bounds, margin=0.05):
+        """缩放并居中使 bounds 完整显示，四周保留 margin 比例的空白。"""
+        xmin, ymin, xmax, ymax = bounds
+        self.center_x = (xmin + xmax) / 2
+        self.center_y = (ymin + ymax) / 2
+        usable = 1 - 2 * margin
+        self.scale = max((xmax - xmin) / (self.width * usable), (ymax - ymin) / (self.height * usable), 1e-3)
+
+    def zoom(self, factor, px=None, py=None):
+        """以像素点 (px, py) 为中心缩放，factor > 1 为放大，默认以画布中心缩放。"""
+        if px is None:
+            px, py = self.width / 2, self.height / 2
+        x, y = self.to_local(px, py)
+        self.scale /= factor
+        # 保持鼠标下的点不动
+        self.center_x = x - (px - self.width / 2) * self.scale
+        self.center_y = y + (py - self.height / 2) * self.scale
+
+    def pan(self, dx, dy):
+        """按像素平移画面内容。"""
+        self.center_x -= dx * self.scale
+        self.center_y += dy * self.scale
+
+    def viewport(self):
+        """当前可见区域 (xmin, ymin, xmax, ymax)，单位为米。"""
+        half_w = self.width / 2 * self.scale
+        half_h = self.height / 2 * self.scale
+        return (self.center_x - half_w, self.center_y - half_h, self.center_x + half_w, self.center_y + half_h)
+
+    def to_pixels(self, x, y):
+        return ((x - self.center_x) / self.scale + self.width / 2,
+                self.height / 2 - (y - self.center_y) / self.scale)
+
+    def to_local(self, px, py):
+        return (self.center_x + (px - self.width / 2) * self.scale,
+                self.center_y - (py - self.height / 2) * self.scale)
+
+    def flatten(self, xs, ys):
+        """将坐标数组转换为 Tk create_line 使用的 [x0, y0, x1, y1, ...] 像素坐标。"""
+        inverse = 1 / self.scale
+        offset_x = self.width / 2 - self.center_x * inverse
+        offset_y = self.height / 2 + self.center_y * inverse
+        coords = []
+        extend = coords.extend
+        for x, y in zip(xs, ys):
+            extend((x * inverse + offset_x, offset_y - y * inverse))
+        return coords
@@ -0,0 +1,184 @@
+"""命令级性能剖析：按阶段记录墙钟与CPU耗时，可选输出 cProfile 文件。
+
+代码中用 span 标出各阶段，只有在剖析某条命令时才会计时，平时只是一次线程局部
+变量查询::
+
+    with span('load_gpx'):
+        coordinates = load_gpx(path)
+
+    profiler = Profiler(output_dir='profiles')
+    profiler.run('start data.gpx', lambda: shell.do_start('data.gpx'), use_cprofile=True)
+    print(profiler.report())
+
+阶段按嵌套关系记录，只统计执行命令的线程中的阶段；CPU耗时为整个进程的
+process_time，包含播放管线后台线程的计算，不包含子进程。
+"""
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_HISTORY = 50
+DEFAULT_OUTPUT_DIR = 'profiles'
+
+_local = threading.local()
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """一个已计时的阶段。
+
+    Attributes:
+        name (str): 阶段名。
+        depth (int): 嵌套深度，命令本身的直接子阶段为 0。
+        wall (float): 墙钟耗时（秒）。
+        cpu (float): 进程CPU耗时（秒）。
+    """
+
+    def __init__(self, profile, name, depth):
+        self.profile = profile
+        self.name = name
+        self.depth = depth
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self):
+        self.profile.spans.append(self)
+        self.profile.depth += 1
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        self.profile.depth -= 1
+        return False
+
+def span(name):
+    """标记一个阶段，当前线程正在剖析命令时计时，否则不做任何事。"""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return _NULL_SPAN
+    return Span(profile, name, profile.depth)
+
+class CommandProfile:
+    """一条命令的剖析结果。
+
+    Attributes:
+        command (str): 命令行。
+        started (float): 开始时刻（time.time()）。
+        wall (float): 总墙钟耗时（秒）。
+        cpu (float): 总进程CPU耗时（秒）。
+        spans (list): 按开始顺序排列的 Span。
+        output (str): cProfile 输出文件路径，未启用时为 None。
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.started = time.time()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.spans = []
+        self.depth = 0
+        self.output = None
+
+    def summary(self):
+        """返回按阶段缩进的多行耗时明细。"""
+        lines = [f"{self.command}: 墙钟 / wall {self.wall * 1000:.1f} ms, CPU {self.cpu * 1000:.1f} ms"]
+        covered = 0.0
+        for item in self.spans:
+            if item.depth == 0:
+                covered += item.wall
+            lines.append(f"{'  ' * (item.depth + 1)}{item.name}: {item.wall * 1000:.1f} ms (CPU {item.cpu * 1000:.1f} ms)")
+        if self.spans:
+            lines.append(f"  (其他 / other): {(self.wall - covered) * 1000:.1f} ms")
+        if self.output:
+            lines.append(f"  cProfile: {self.output}")
+        return '\n'.join(lines)
+
+class Profiler:
+    """剖析命令并保留最近的结果。
+
+    Args:
+        enabled (bool): 是否剖析每一条命令（对应命令行的 --profile）。
+        output_dir (str): cProfile 输出目录，为 None 时只在显式要求时输出到 DEFAULT_OUTPUT_DIR。
+        history (int): 保留的最近命令数量。
+    """
+
+    def __init__(self, enabled=False, output_dir=None, history=DEFAULT_HISTORY):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.history = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def run(self, command, func, use_cprofile=None):
+        """剖析 func() 的执行，返回 (func 的返回值, CommandProfile)。
+
+        Args:
+            command (str): 记录用的命令行。
+            func (callable): 要执行的无参函数。
+            use_cprofile (bool): 是否同时运行 cProfile，默认在设置了 output_dir 时启用。
+        """
+        profile = CommandProfile(command)
+        previous = getattr(_local, 'profile', None)
+        _local.profile = profile
+        profiler = None
+        if use_cprofile if use_cprofile is not None else self.output_dir is not None:
+            import cProfile
+            profiler = cProfile.Profile()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                result = func()
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            profile.wall = time.perf_counter() - wall
+            profile.cpu = time.process_time() - cpu
+            _local.profile = previous
+            if profiler is not None:
+                profile.output = self._dump(profiler, command, profile.started)
+            with self._lock:
+                self.history.append(profile)
+        return result, profile
+
+    def _dump(self, profiler, command, started):
+        directory = self.output_dir or DEFAULT_OUTPUT_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = ''.join(c if c.isalnum() else '_' for c in (command.split() or ['command'])[0])
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+        path = os.path.join(directory, f'{stamp}-{name}.prof')
+        profiler.dump_stats(path)
+        return path
+
+    def slowest(self, count=10):
+        """返回最近命令中墙钟耗时最长的 count 条。"""
+        with self._lock:
+            profiles = list(self.history)
+        return sorted(profiles, key=lambda profile: profile.wall, reverse=True)[:count]
+
+    def report(self, count=10):
+        """返回最慢的最近命令及其主要阶段，适合在终端或GUI中显示。"""
+        profiles = self.slowest(count)
+        if not profiles:
+            return "还没有剖析过的命令，使用 'profile <命令>' 或 --profile 启动 / No profiled commands yet, use 'profile <command>' or start with --profile"
+        lines = [f"最慢的 {len(profiles)} 条命令 / Slowest {len(profiles)} commands:"]
+        for profile in profiles:
+            top = sorted((item for item in profile.spans if item.depth == 0), key=lambda item: item.wall, reverse=True)[:3]
+            phases = ', '.join(f"{item.name} {item.wall * 1000:.0f}ms" for item in top)
+            stamp = time.strftime('%H:%M:%S', time.localtime(profile.started))
+            lines.append(f"  {stamp} {profile.command}: {profile.wall * 1000:.1f} ms (CPU {profile.cpu * 1000:.1f} ms)"
+                         + (f" [{phases}]" if phases else ''))
+        return '\n'.join(lines)
@@ -0,0 +1,374 @@
+"""按弧长参数化的路线。
+
+路线只保存一次控制几何（局部平面坐标下的折线）和累计距离索引，任意间距或
+速度的坐标点都通过在索引上二分查找后插值惰性得到，改变速度无需重新生成整条路线。
+
+除 generate_gpx 的三点操场外，Route.polygon 支持任意 N 个控制点围成的闭合路线，
+拐角可以是尖角、圆弧或样条。多圈路线先用 Route.template 按固定间距生成一圈的
+模板，之后每一圈只在模板上叠加随机浮动，生成开销与一圈的长度成正比，与圈数无关::
+
+    route = Route.polygon(points, corners='arc', radius=15)
+    template = route.template(spacing=speed / SAMPLE_RATE)
+    for lat, lon in template.iter_points(laps=10, fluctuation_range=0.5):
+        ...
+"""
+import math
+import random
+from array import array
+from bisect import bisect_right
+
+from .geo import METERS_PER_DEGREE, from_local, to_local
+from .optional import _numpy
+from .playback import SAMPLE_RATE
+
+# 半圆弯道折线化的段数，半径 50 米时弦高误差约 1.5 厘米
+ARC_SEGMENTS = 64
+CORNER_STYLES = ('sharp', 'arc', 'spline')
+DEFAULT_CORNER_RADIUS = 10.0  # 米，圆弧拐角的默认半径
+MIN_POLYGON_AREA = 1.0  # 平方米，控制点围成的面积小于该值时视为共线
+
+def _arc(start, end, bulge, segments=ARC_SEGMENTS):
+    """生成以 start、end 为直径端点、向 bulge 方向凸出的半圆折线（不含起点）。"""
+    cx, cy = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+    vx, vy = start[0] - cx, start[1] - cy
+    # 旋转 90° 后与凸出方向同向则逆时针，否则顺时针
+    sign = 1 if (-vy * bulge[0] + vx * bulge[1]) >= 0 else -1
+    vertices = []
+    for i in range(1, segments + 1):
+        angle = sign * math.pi * i / segments
+        cos_a, sin_a = math.cos(angle), math.sin(angle)
+        vertices.append((cx + vx * cos_a - vy * sin_a, cy + vx * sin_a + vy * cos_a))
+    return vertices
+
+def _unit(dx, dy):
+    length = math.hypot(dx, dy)
+    return (dx / length, dy / length) if length else (0.0, 0.0)
+
+def _fillet(previous, corner, following, radius, segments=ARC_SEGMENTS):
+    """用与两条边相切的圆弧替换拐角，返回圆弧折线顶点（含两个切点）。
+
+    半径过大时缩小到切点不超过相邻边长的一半；两边共线或折返时保留尖角。
+    segments 为半圆对应的段数，实际段数按转角比例计算。
+    """
+    ux, uy = _unit(previous[0] - corner[0], previous[1] - corner[1])
+    vx, vy = _unit(following[0] - corner[0], following[1] - corner[1])
+    # 两条边之间的夹角
+    angle = math.acos(max(-1.0, min(1.0, ux * vx + uy * vy)))
+    if angle < 1e-6 or math.pi - angle < 1e-6:
+        return [corner]
+    half = angle / 2
+    tangent = radius / math.tan(half)
+    limit = min(math.dist(previous, corner), math.dist(following, corner)) / 2
+    if tangent > limit:
+        tangent = limit
+        radius = tangent * math.tan(half)
+    bx, by = _unit(ux + vx, uy + vy)
+    offset = radius / math.sin(half)
+    cx, cy = corner[0] + bx * offset, corner[1] + by * offset
+    start = math.atan2(corner[1] + uy * tangent - cy, corner[0] + ux * tangent - cx)
+    end = math.atan2(corner[1] + vy * tangent - cy, corner[0] + vx * tangent - cx)
+    sweep = (end - start + math.pi) % (2 * math.pi) - math.pi
+    count = max(1, math.ceil(segments * abs(sweep) / math.pi))
+    return [(cx + radius * math.cos(start + sweep * i / count), cy + radius * math.sin(start + sweep * i / count))
+            for i in range(count + 1)]
+
+def _catmull_rom(p0, p1, p2, p3, segments):
+    """向心 Catmull-Rom 样条在 p1 到 p2 之间的折线顶点（含 p1，不含 p2）。
+
+    向心参数化不会在控制点间距不均匀时产生尖点或自相交。
+    """
+    def knot(t, a, b):
+        return t + max(math.dist(a, b) ** 0.5, 1e-9)
+
+    t0 = 0.0
+    t1 = knot(t0, p0, p1)
+    t2 = knot(t1, p1, p2)
+    t3 = knot(t2, p2, p3)
+
+    def lerp(a, b, ta, tb, t):
+        wa = (tb - t) / (tb - ta)
+        return (a[0] * wa + b[0] * (1 - wa), a[1] * wa + b[1] * (1 - wa))
+
+    vertices = []
+    for i in range(segments):
+        t = t1 + (t2 - t1) * i / segments
+        a1 = lerp(p0, p1, t0, t1, t)
+        a2 = lerp(p1, p2, t1, t2, t)
+        a3 = lerp(p2, p3, t2, t3, t)
+        b1 = lerp(a1, a2, t0, t2, t)
+        b2 = lerp(a2, a3, t1, t3, t)
+        vertices.append(lerp(b1, b2, t1, t2, t))
+    return vertices
+
+class Route:
+    """闭合或开放折线路线，带累计距离索引。
+
+    Args:
+        vertices (list): 局部平面坐标 (x, y) 折线顶点，单位为米。
+        origin (tuple): 局部坐标原点 (lat, lon)。
+    """
+
+    def __init__(self, vertices, origin):
+        if len(vertices) < 2:
+            raise ValueError("路线至少需要两个顶点 / A route needs at least two vertices")
+        self.origin = origin
+        self.xs = array('d', (x for x, _ in vertices))
+        self.ys = array('d', (y for _, y in vertices))
+        self.distances = array('d', [0.0])
+        for i in range(1, len(vertices)):
+            self.distances.append(self.distances[-1] + math.hypot(self.xs[i] - self.xs[i - 1],
+                                                                  self.ys[i] - self.ys[i - 1]))
+
+    @property
+    def length(self):
+        """路线长度，单位为米。"""
+        return self.distances[-1]
+
+    @property
+    def bounds(self):
+        """路线的经纬度边界 (minlat, minlon, maxlat, maxlon)。"""
+        minlat, minlon = from_local(min(self.xs), min(self.ys), self.origin)
+        maxlat, maxlon = from_local(max(self.xs), max(self.ys), self.origin)
+        return minlat, minlon, maxlat, maxlon
+
+    @classmethod
+    def from_coordinates(cls, coordinates):
+        """由 (lat, lon) 坐标序列构建路线，以第一个点为局部原点。"""
+        coordinates = list(coordinates)
+        origin = coordinates[0]
+        return cls([to_local(lat, lon, origin) for lat, lon in coordinates], origin)
+
+    @classmethod
+    def stadium(cls, points, arc_segments=ARC_SEGMENTS):
+        """由 generate_gpx 的三点定义构建一圈操场路线。
+
+        Args:
+            points (list): [(lat0, lon0), (lat1, lon1), (lat2, lon2)]，点0到点1为直道，
+                点1到点2为弯道直径。
+            arc_segments (int): 每个半圆弯道的折线段数。
+
+        Returns:
+            Route: 起点和终点都在点0的闭合路线。
+        """
+        origin = points[0]
+        p0, p1, p2 = (to_local(lat, lon, origin) for lat, lon in points[:3])
+        direction = (p1[0] - p0[0], p1[1] - p0[1])
+        p3 = (p2[0] - direction[0], p2[1] - direction[1])
+
+        vertices = [p0, p1]
+        vertices += _arc(p1, p2, direction, arc_segments)
+        vertices.append(p3)
+        vertices += _arc(p3, p0, (-direction[0], -direction[1]), arc_segments)
+        return cls(vertices, origin)
+
+    @classmethod
+    def polygon(cls, points, corners='sharp', radius=DEFAULT_CORNER_RADIUS, segments=ARC_SEGMENTS):
+        """由任意 N 个控制点构建闭合路线，起点和终点都在第一个控制点。
+
+        Args:
+            points (list): [(lat, lon), ...]，至少三个控制点，按行进顺序排列，末点不必与首点重复。
+            corners (str): 拐角样式：'sharp' 直接连接控制点；'arc' 在每个拐角用半径为
+                radius 的相切圆弧过渡（起点处也是圆弧，路线从第一条边上的切点开始）；
+                'spline' 用经过所有控制点的闭合向心 Catmull-Rom 样条。
+            radius (float): 圆弧拐角的半径（米），边太短时自动缩小。
+            segments (int): 圆弧每半圈、样条每段的折线段数。
+
+        Returns:
+            Route: 闭合路线。
+
+        Raises:
+            ValueError: 控制点少于三个、控制点共线（围成的面积为零）或拐角样式无效。
+        """
+        if corners not in CORNER_STYLES:
+            raise ValueError(f"无效的拐角样式: {corners} / Invalid corner style: {corners}")
+        points = list(points)
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        if len(points) < 3:
+            raise ValueError("闭合路线至少需要三个控制点 / A closed route needs at least three control points")
+        origin = points[0]
+        local = [to_local(lat, lon, origin) for lat, lon in points]
+        count = len(local)
+        # 鞋带公式求控制点围成的面积，共线的控制点无法构成闭合路线
+        area = abs(sum(local[i - 1][0] * local[i][1] - local[i][0] * local[i - 1][1] for i in range(count))) / 2
+        if area < MIN_POLYGON_AREA:
+            raise ValueError("控制点共线，无法构成闭合路线 / Control points are collinear and do not enclose an area")
+
+        if corners == 'sharp':
+            vertices = local + [local[0]]
+        elif corners == 'arc':
+            vertices = []
+            for i in range(count):
+                vertices += _fillet(local[i - 1], local[i], local[(i + 1) % count], radius, segments)
+            vertices.append(vertices[0])
+        else:
+            vertices = []
+            for i in range(count):
+                vertices += _catmull_rom(local[i - 1], local[i], local[(i + 1) % count], local[(i + 2) % count], segments)
+            vertices.append(vertices[0])
+        return cls(vertices, origin)
+
+    @property
+    def closed(self):
+        """终点与起点重合（相距不足 1 毫米）时为 True。"""
+        return math.hypot(self.xs[-1] - self.xs[0], self.ys[-1] - self.ys[0]) < 1e-3
+
+    def locate(self, distance):
+        """返回沿路线 distance 米处的局部平面坐标 (x, y)，超出范围时截断到端点。"""
+        if distance <= 0:
+            return self.xs[0], self.ys[0]
+        if distance >= self.length:
+            return self.xs[-1], self.ys[-1]
+        i = bisect_right(self.distances, distance)
+        segment = self.distances[i] - self.distances[i - 1]
+        t = (distance - self.distances[i - 1]) / segment if segment else 0.0
+        return (self.xs[i - 1] + (self.xs[i] - self.xs[i - 1]) * t,
+                self.ys[i - 1] + (self.ys[i] - self.ys[i - 1]) * t)
+
+    def point_at(self, distance):
+        """返回沿路线 distance 米处的 (lat, lon)。"""
+        return from_local(*self.locate(distance), self.origin)
+
+    def sample(self, spacing=None, speed=None, rate=SAMPLE_RATE, laps=1):
+        """按间距或速度惰性采样路线。
+
+        Args:
+            spacing (float): 相邻两点的距离（米）。
+            speed (float): 速度（米每秒），未指定 spacing 时按 speed / rate 计算间距。
+            rate (float): 每秒点数，与 speed 一起使用。
+            laps (int): 重复圈数，每圈从起点重新开始。
+
+        Returns:
+            RouteSamples: 支持 len() 和下标访问的惰性坐标序列。
+        """
+        if spacing is None:
+            if speed is None:
+                raise ValueError("需要指定 spacing 或 speed / Either spacing or speed is required")
+            spacing = speed / rate
+        if spacing <= 0:
+            raise ValueError(f"间距必须为正数: {spacing} / Spacing must be positive: {spacing}")
+        return RouteSamples(self, spacing, laps)
+
+    def iter_points(self, spacing=None, speed=None, rate=SAMPLE_RATE, laps=1):
+        """sample() 的迭代器形式，逐个产出 (lat, lon)。"""
+        return iter(self.sample(spacing, speed, rate, laps))
+
+    def template(self, spacing=None, speed=None, rate=SAMPLE_RATE):
+        """按固定间距采样一圈，返回可重复播放的 LapTemplate。参数同 sample()。"""
+        if spacing is None:
+            if speed is None:
+                raise ValueError("需要指定 spacing 或 speed / Either spacing or speed is required")
+            spacing = speed / rate
+        if spacing <= 0:
+            raise ValueError(f"间距必须为正数: {spacing} / Spacing must be positive: {spacing}")
+        return LapTemplate(self, spacing)
+
+class RouteSamples:
+    """路线按固定间距采样的惰性视图，构建为 O(1)，每次访问为 O(log n)。"""
+
+    def __init__(self, route, spacing, laps=1):
+        self.route = route
+        self.spacing = spacing
+        self.laps = laps
+        self.per_lap = int(route.length / spacing) + 1
+
+    def __len__(self):
+        return self.per_lap * self.laps
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("轨迹下标越界 / Track index out of range")
+        return self.route.point_at((index % self.per_lap) * self.spacing)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+class LapTemplate:
+    """一圈路线按固定间距采样得到的坐标模板。
+
+    模板只在构建时沿累计距离索引顺序走一遍路线，之后每一圈都直接复用。闭合路线
+    的间距会微调为圈长的整数分之一（相对误差不超过半个间距与圈长之比），使每圈
+    恰好包含相同数量的点，圈与圈衔接处的间距也保持一致；第 k 圈的点在输出中的
+    下标为 k * len(template) 起。
+
+    Args:
+        route (Route): 要采样的路线。
+        spacing (float): 相邻两点的目标距离（米）。
+
+    Attributes:
+        spacing (float): 实际使用的间距（米）。
+        closed (bool): 路线是否闭合。闭合时模板不含终点，最后一圈结束后再回到起点。
+        lats, lons (array): 模板各点的纬度、经度。
+    """
+
+    def __init__(self, route, spacing):
+        self.route = route
+        self.closed = route.closed
+        length = route.length
+        if self.closed:
+            count = max(1, round(length / spacing))
+            spacing = length / count
+        else:
+            count = int(length / spacing) + 1
+        self.spacing = spacing
+
+        self.lats = array('d')
+        self.lons = array('d')
+        xs, ys, distances = route.xs, route.ys, route.distances
+        last = len(distances) - 1
+        j = 1
+        for i in range(count):
+            distance = i * spacing
+            while j < last and distances[j] < distance:
+                j += 1
+            segment = distances[j] - distances[j - 1]
+            t = min(1.0, (distance - distances[j - 1]) / segment) if segment else 0.0
+            lat, lon = from_local(xs[j - 1] + (xs[j] - xs[j - 1]) * t, ys[j - 1] + (ys[j] - ys[j - 1]) * t,
+                                  route.origin)
+            self.lats.append(lat)
+            self.lons.append(lon)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def iter_laps(self, laps, fluctuation_range=0.0, use_numpy=None):
+        """逐圈产出叠加了随机浮动的模板坐标。
+
+        Args:
+            laps (int): 圈数。
+            fluctuation_range (float): 坐标的随机浮动范围，单位为米。
+            use_numpy (bool): 是否使用NumPy批量叠加浮动，默认在可用时自动启用。
+
+        Yields:
+            list: 每圈的 (lat, lon) 元组列表，与是否使用NumPy无关。
+        """
+        np = _numpy() if use_numpy is not False else None
+        if use_numpy and np is None:
+            raise ImportError("NumPy 未安装 / NumPy is not installed")
+        scale = fluctuation_range / METERS_PER_DEGREE
+        if np is not None:
+            template = np.column_stack((np.frombuffer(self.lats), np.frombuffer(self.lons)))
+            # 用 random 模块派生种子，使 random.seed() 对两种实现都生效
+            rng = np.random.default_rng(random.getrandbits(64))
+            for _ in range(laps):
+                lap = template + rng.uniform(-scale, scale, size=template.shape) if scale else template
+                yield list(zip(*lap.T.tolist()))
+            return
+
+        uniform = random.uniform
+        for _ in range(laps):
+            if scale:
+                yield [(lat + uniform(-scale, scale), lon + uniform(-scale, scale))
+                       for lat, lon in zip(self.lats, self.lons)]
+            else:
+                yield list(zip(self.lats, self.lons))
+
+    def iter_points(self, laps, fluctuation_range=0.0, use_numpy=None):
+        """iter_laps 的逐点形式，闭合路线在最后一圈后补上终点（即起点）。"""
+        for lap in self.iter_laps(laps, fluctuation_range, use_numpy):
+            yield from lap
+        if self.closed and laps > 0:
+            scale = fluctuation_range / METERS_PER_DEGREE
+            yield (self.lats[0] + random.uniform(-scale, scale), self.lons[0] + random.uniform(-scale, scale))
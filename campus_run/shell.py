@@ -0,0 +1,588 @@
+import argparse
+import cmd
+import json
+import subprocess
+import sys
+import os
+import logging
+from functools import partial
+from pathlib import Path
+import random
+
+from .checkpoint import Checkpoint
+from .gpx_io import GPXError, is_gpx_path, load_gpx
+from .metrics import DEFAULT_PORT, MetricsRegistry, MetricsServer
+from .pipeline import PlaybackPipeline
+from .playback import DEFAULT_RATE, SAMPLE_RATE, LocationService, PlaybackError, resample
+from .profiling import Profiler, span
+from .simplify import decimate
+from .track_format import TRACK_EXTENSION, load_track
+from .tunnel import TunnelSupervisor, probe_tunneld
+
+IS_LINUX = sys.platform.startswith('linux')
+
+logger = logging.getLogger(__name__)
+
+class CampusRunShell(cmd.Cmd):
+    intro = '''
+Welcome to Campus-Real-Run CLI!
+Type help or ? to list commands.
+Start with 'init' to setup the connection.
+Note: 
+    - !important: Please run this program with administrator privileges.
+    - !important: Use 'init --ios17' for iOS 17.4+ devices.
+    - !important: Connect your device to the computer before running the commands.
+    - !important: DO NOT close the terminal window while the program is running.
+
+输入 help 或 ? 查看命令列表。
+使用 'init' 命令初始化设备连接。
+注意：
+    - !重要：请以管理员权限运行此程序。
+    - !重要：对于iOS 17.4+设备，请使用 'init --ios17' 命令。
+    - !重要：在运行命令前请先连接设备到电脑。
+    - !重要：程序运行时请勿关闭终端窗口。
+    '''
+    prompt = 'run> '
+    
+    def __init__(self):
+        super().__init__()
+        self.tunnel = None
+        self.location_service = None
+        self.service_generation = None
+        self.checkpoint = Checkpoint()
+        # 命令参数中相对路径的基准目录，None 表示进程当前目录；后台服务按客户端的目录设置
+        self.cwd = None
+        self.is_ios17_plus = False
+        self.coordinates = []
+        self.route_loaded = False
+        self._route_key = None
+        self.initialized = False
+        self.python_cmd = sys.executable if IS_LINUX else f'"{sys.executable}"'
+        self.pipeline = None
+        self.metrics_server = None
+        self.profiler = Profiler()
+        self.metrics = MetricsRegistry()
+        self.metrics.gauge('tunnel_up', '隧道进程是否全部存活 / Whether all tunnel processes are alive',
+                           lambda: int(bool(self.tunnel) and all(p.alive() for p in self.tunnel.processes)))
+        self.metrics.gauge('tunnel_uptime_seconds', '隧道自最近一次就绪以来的秒数 / Seconds since the tunnel became ready',
+                           lambda: self.tunnel.uptime if self.tunnel else 0.0)
+        self.metrics.gauge('tunnel_restarts', '隧道进程自动重启次数 / Tunnel process restarts',
+                           lambda: self.tunnel.restarts if self.tunnel else 0)
+        self.metrics.gauge('tunnel_connect_latency_seconds', '最近一次建立隧道的耗时 / Latest tunnel connect latency',
+                           lambda: (self.tunnel.connect_latency or 0.0) if self.tunnel else 0.0)
+        self.metrics.gauge('route_points', '已加载路线的坐标点数 / Points in the loaded route',
+                           lambda: len(self.coordinates))
+
+    def detect_python_version(self):
+        try:
+            subprocess.check_output("python3 --version", shell=True)
+            return "python3"
+        except subprocess.CalledProcessError:
+            return "python"
+
+    def check_admin(self):
+        try:
+            return os.getuid() == 0
+        except AttributeError:
+            import ctypes
+            return ctypes.windll.shell32.IsUserAnAdmin() != 0
+
+    def onecmd(self, line):
+        # --profile 时剖析每一条命令，profile 命令自身除外
+        words = line.split()
+        if self.profiler.enabled and words and words[0] != 'profile':
+            return self.run_profiled(line)
+        return super().onecmd(line)
+
+    def run_profiled(self, line, use_cprofile=None):
+        """剖析执行一条命令，结束后输出各阶段耗时。"""
+        stop, profile = self.profiler.run(line.strip(), lambda: cmd.Cmd.onecmd(self, line), use_cprofile)
+        logger.info(f"性能剖析 / Profile:\n{profile.summary()}")
+        return stop
+
+    def run_command(self, command, check_output=False):
+        try:
+            if check_output:
+                return subprocess.check_output(command, shell=True, text=True)
+            else:
+                process = subprocess.Popen(
+                    command.split(' ') if IS_LINUX else command,
+                    shell=False,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                )
+                return process
+        except subprocess.CalledProcessError as e:
+            logger.error(f"命令执行失败: {e} / Command execution failed: {e}")
+            return None
+
+    def do_init(self, arg):
+        """
+        初始化设备连接 / Initialize device connection
+        用法 / Usage: init [--ios17]
+        示例 / Example:
+            init         # 用于iOS 16及以下版本 / For iOS 16 and below
+            init --ios17 # 用于iOS 17.4及以上版本 / For iOS 17.4 and above
+        """
+        if self.initialized:
+            logger.warning("已经初始化过了！如需重新初始化，请先使用 'cleanup' 命令清理现有连接 / Already initialized! To reinitialize, please use the 'cleanup' command to clear existing connections")
+            return
+
+        self.is_ios17_plus = "--ios17" in arg
+        
+        if not self.check_admin():
+            logger.error("请使用管理员权限运行此程序！ / Please run this program with administrator privileges!")
+            return
+
+        logger.info("检查开发者模式状态... / Checking developer mode status...")
+        with span('check_dev_mode'):
+            dev_mode_status = self.run_command(f"{self.python_cmd} -m pymobiledevice3 amfi developer-mode-status", check_output=True)
+        if dev_mode_status == str():
+            logger.error("设备未连接 / Device is not connected.")
+            return
+        elif "false" in dev_mode_status.lower():
+            logger.error("开发者模式未启用，请使用 'enable_dev_mode' 命令启用开发者模式 / Developer mode is not enabled, please use the 'enable_dev_mode' command to enable developer mode")
+            return
+
+        logger.info("正在启动tunneld和tunnel服务... / Starting tunneld and tunnel services...")
+        tunnel_command = f"{self.python_cmd} -m pymobiledevice3 lockdown start-tunnel" if self.is_ios17_plus else \
+                        f"{self.python_cmd} -m pymobiledevice3 remote start-tunnel"
+        # 只有 iOS 17.4+ 的隧道会登记到 tunneld，较低版本只要 tunneld 可访问即可
+        self.tunnel = TunnelSupervisor(self.run_command, [
+            ('tunneld', f"{self.python_cmd} -m pymobiledevice3 remote tunneld"),
+            ('tunnel', tunnel_command),
+        ], probe=partial(probe_tunneld, require_device=self.is_ios17_plus))
+
+        with span('tunnel.start'):
+            ready = self.tunnel.start()
+        if ready:
+            logger.info(f"连接成功建立！耗时 {self.tunnel.connect_latency:.2f} 秒 / Connection established successfully in {self.tunnel.connect_latency:.2f}s!")
+            self.initialized = True
+        else:
+            logger.error("连接失败，请检查设备连接和权限设置 / Connection failed, please check device connection and permission settings")
+            for managed in self.tunnel.processes:
+                if managed.process is not None and not managed.alive():
+                    managed.wait_output()
+                    logger.error(str(managed.process.args) + "fails with output: ")
+                    logger.error(managed.output.dump())
+            self.do_cleanup('')
+
+    def do_enable_dev_mode(self, arg):
+        """
+        启用开发者模式 / Enable developer mode
+        用法 / Usage: enable_dev_mode
+        """
+        logger.info("启用开发者模式... / Enabling developer mode...")
+        self.run_command(f"{self.python_cmd} -m pymobiledevice3 amfi enable-developer-mode")
+        logger.info("设备正在重启，请稍后再检查开发者模式状态 / Device is restarting, please check developer mode status later")
+
+    def do_check_dev_mode_status(self, arg):
+        """
+        检查开发者模式状态 / Check developer mode status
+        用法 / Usage: check_dev_mode_status
+        """
+        logger.info("检查开发者模式状态... / Checking developer mode status...")
+        status = self.run_command(f"{self.python_cmd} -m pymobiledevice3 amfi developer-mode-status", check_output=True)
+        logger.info(f"开发者模式状态: {status.strip()} / Developer mode status: {status.strip()}")
+
+    def do_start(self, arg):
+        """
+        开始模拟位置移动 / Start simulating location movement
+        用法 / Usage: start [data.gpx|data.trk] [--rate HZ] [--tolerance M] [--resume]
+        字段说明 / Field description:
+            [data.gpx]    - GPX文件（支持 .gpx.gz）或二进制轨迹 .trk 的路径 / GPX file (.gpx.gz supported) or binary .trk track, 必填（--resume 时可省略） / Required (optional with --resume)
+            --rate HZ     - 每秒更新位置的次数，默认20 / Location updates per second, default 20
+            --tolerance M - 按时间抽稀路线，偏差不超过M米；未指定 --rate 时相应降低更新频率（不低于1Hz）
+                            / Decimate the route within M metres; lowers the update rate accordingly (min 1 Hz) unless --rate is given
+            --resume      - 从上次中断的位置继续 / Resume from where the last run was interrupted
+        提示 / Note: 使用Ctrl+C可以停止模拟 / Use Ctrl+C to stop simulation
+        """
+        if not self.initialized:
+            logger.error("请先使用 'init' 命令初始化连接！ / Please initialize connection first using 'init' command!")
+            return
+
+        options = self.parse_options(arg, {'--rate': float, '--tolerance': float, '--resume': bool})
+        if options is None:
+            return
+        path = options.pop('path')
+        rate = options.get('--rate', DEFAULT_RATE)
+        tolerance = options.get('--tolerance')
+        resume = options.get('--resume', False)
+        if rate <= 0:
+            logger.error("更新频率必须为正数！ / Update rate must be positive!")
+            return
+        if tolerance is not None and tolerance <= 0:
+            logger.error("抽稀容差必须为正数！ / Decimation tolerance must be positive!")
+            return
+
+        saved = self.checkpoint.load() if resume else None
+        if resume and not path:
+            if saved is None:
+                logger.error("没有可恢复的播放进度！ / No playback checkpoint to resume from!")
+                return
+            path = saved['track']
+
+        if not path:
+            logger.error("请提供GPX文件路径！ / Please provide the GPX file path!")
+            return
+        
+        is_track = path.lower().endswith(TRACK_EXTENSION)
+        if not is_gpx_path(path) and not is_track:
+            logger.error("无效的路线文件路径，需要 .gpx、.gpx.gz 或 .trk！ / Invalid route file path, expected .gpx, .gpx.gz or .trk!")
+            return
+        
+        gpx_file = Path(self.cwd, path) if self.cwd else Path(path)
+
+        try:
+            stat = gpx_file.stat()
+            route_key = (str(gpx_file.resolve()), stat.st_size, stat.st_mtime_ns)
+            if self.route_loaded and route_key == self._route_key:
+                # 续播同一个未修改的文件时复用已解析的坐标
+                logger.info("路线未变化，使用已加载的坐标 / Route unchanged, reusing loaded coordinates")
+            else:
+                self.close_route()
+                if is_track:
+                    # 二进制轨迹以内存映射打开，无需解析，续播时按下标直接定位
+                    logger.info("正在打开轨迹文件... / Opening track file...")
+                    with span('load_track'):
+                        self.coordinates = load_track(str(gpx_file))
+                else:
+                    logger.info("正在解析GPX文件... / Parsing GPX file...")
+                    with span('load_gpx'):
+                        self.coordinates = load_gpx(str(gpx_file))
+                self._route_key = route_key
+        except (ValueError, OSError) as e:
+            self.close_route()
+            logger.error(f"路线文件无效: {e} / Invalid route file: {e}")
+            return
+        if not len(self.coordinates):
+            self.close_route()
+            logger.error("路线中没有坐标点！ / Route contains no points!")
+            return
+        self.route_loaded = True
+        minlat, minlon, maxlat, maxlon = self.coordinates.bounds
+        if is_track:
+            logger.info(f"已加载 {len(self.coordinates)} 个坐标点 / Loaded {len(self.coordinates)} points")
+        else:
+            logger.info(f"已加载 {len(self.coordinates)} 个坐标点，总长度 {self.coordinates.length:.0f} 米 / Loaded {len(self.coordinates)} points, total length {self.coordinates.length:.0f} m")
+        logger.info(f"路线范围 / Route bounds: ({minlat}, {minlon}) - ({maxlat}, {maxlon})")
+
+        logger.info("开始模拟位置移动... / Starting location simulation...")
+        logger.info("按Ctrl+C可以停止模拟 / Press Ctrl+C to stop simulation")
+
+        logger.info('启动模拟位置 / Simulating location')
+
+        source, source_rate = self.coordinates, SAMPLE_RATE
+        if tolerance is not None:
+            with span('decimate'):
+                source, report = decimate(self.coordinates, tolerance)
+            source_rate = SAMPLE_RATE / report.factor
+            if '--rate' not in options:
+                rate = max(1.0, min(rate, source_rate))
+            logger.info(report.summary())
+
+        with span('resample'):
+            total = len(resample(source, rate, source_rate))
+        report_every = max(1, round(rate * 5))
+        track = str(gpx_file.resolve())
+
+        start_index = 0
+        if resume:
+            if saved is None or saved['track'] != track or saved['total'] != len(resample(source, saved['rate'], source_rate)):
+                logger.warning("没有与该文件匹配的播放进度，从头开始 / No matching checkpoint for this file, starting from the beginning")
+            else:
+                # 检查点下标按保存时的频率计算，换算到当前频率
+                start_index = min(round(saved['index'] * rate / saved['rate']), total - 1)
+                logger.info(f"从第 {start_index}/{total} 个坐标点继续 / Resuming from point {start_index}/{total}")
+
+        def report_progress(index, lat, lon):
+            self.checkpoint.update(index + 1)
+            if (index + 1) % report_every == 0 or index + 1 == total:
+                print(f"已推送 {index + 1}/{total} 个坐标点 / Sent {index + 1}/{total} points: {lat}, {lon}")
+
+        pipeline = None
+        if not self.tunnel.healthy():
+            logger.warning("隧道不可用，等待自动恢复... / Tunnel unavailable, waiting for recovery...")
+            with span('wait_tunnel'):
+                recovered = self.tunnel.wait_ready()
+            if not recovered:
+                logger.error("隧道未能恢复，请使用 'cleanup' 后重新 'init' / Tunnel did not recover, please 'cleanup' and 'init' again")
+                return
+        if self.service_generation != self.tunnel.generation:
+            # 隧道重建后旧的设备连接已失效
+            self.close_location_service()
+
+        try:
+            if self.location_service is None:
+                logger.info("正在连接位置模拟服务... / Connecting to location simulation service...")
+                with span('connect_service'):
+                    self.location_service = LocationService.open()
+                self.service_generation = self.tunnel.generation
+            pipeline = self.pipeline = PlaybackPipeline(self.location_service, rate=rate, source_rate=source_rate, metrics=self.metrics)
+            remaining = total - start_index
+            logger.info(f"更新频率 {rate:g} Hz，预计用时 {remaining / rate:.0f} 秒 / Update rate {rate:g} Hz, estimated duration {remaining / rate:.0f} s")
+            self.checkpoint.begin(track, total, rate, start_index)
+            with span('playback'):
+                sent = pipeline.run(source, start_index=start_index, on_point=report_progress)
+            if pipeline.position >= total:
+                logger.info(f"模拟完成，共推送 {sent} 个坐标点 / Simulation finished, {sent} points sent")
+                self.checkpoint.clear()
+            else:
+                logger.info(f"模拟已停止，共推送 {sent} 个坐标点 / Simulation stopped, {sent} points sent")
+                logger.info("可使用 'start --resume' 从当前位置继续 / Use 'start --resume' to continue from here")
+
+        except KeyboardInterrupt:
+            logger.info("\n停止位置模拟... / Stopping location simulation...")
+            logger.info("可使用 'start --resume' 从当前位置继续 / Use 'start --resume' to continue from here")
+        except PlaybackError:
+            # 连接可能已失效，下次 start 时重新建立
+            self.close_location_service()
+            raise
+        finally:
+            self.pipeline = None
+            if self.checkpoint.state is not None:
+                self.checkpoint.save()
+            if pipeline is not None and pipeline.stats is not None and pipeline.stats.ticks:
+                logger.info(pipeline.stats.summary())
+                logger.info(pipeline.summary())
+
+    def close_route(self):
+        """释放已加载的路线，内存映射的轨迹文件同时关闭。"""
+        if hasattr(self.coordinates, 'close'):
+            self.coordinates.close()
+        self.coordinates = []
+        self.route_loaded = False
+        self._route_key = None
+
+    def do_stop(self, arg):
+        """
+        停止当前播放 / Stop the current playback
+        用法 / Usage: stop
+        提示 / Note: 用于GUI或后台服务客户端，命令行中直接按Ctrl+C即可 / For the GUI and daemon clients; in the CLI just press Ctrl+C
+        """
+        pipeline = self.pipeline
+        if pipeline is None:
+            logger.info("当前没有正在进行的播放 / No playback in progress")
+            return
+        pipeline.stop()
+        logger.info("正在停止播放... / Stopping playback...")
+
+    def parse_options(self, arg, spec):
+        """解析 '路径 --选项 值' 形式的参数。
+
+        Args:
+            arg (str): 命令参数字符串。
+            spec (dict): 选项名到类型转换函数的映射，类型为 bool 的选项不带值。
+
+        Returns:
+            dict: 包含 'path' 和已出现选项的字典，解析失败时返回 None。
+        """
+        options = {}
+        path_parts = []
+        tokens = arg.split()
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in spec:
+                convert = spec[token]
+                if convert is bool:
+                    options[token] = True
+                    i += 1
+                    continue
+                if i + 1 >= len(tokens):
+                    logger.error(f"选项 {token} 缺少参数值！ / Option {token} requires a value!")
+                    return None
+                try:
+                    options[token] = convert(tokens[i + 1])
+                except ValueError:
+                    logger.error(f"选项 {token} 的参数值无效: {tokens[i + 1]} / Invalid value for option {token}: {tokens[i + 1]}")
+                    return None
+                i += 2
+            elif token.startswith('--'):
+                logger.error(f"未知选项: {token} / Unknown option: {token}")
+                return None
+            else:
+                path_parts.append(token)
+                i += 1
+        options['path'] = ' '.join(path_parts)
+        return options
+
+    def close_location_service(self):
+        if self.location_service is not None:
+            try:
+                self.location_service.close()
+            except Exception as e:
+                logger.warning(f"关闭位置模拟服务失败: {e} / Failed to close location simulation service: {e}")
+            self.location_service = None
+
+    def do_cleanup(self, arg):
+        """
+        清理所有连接和进程 / Clean up all connections and processes
+        用法 / Usage: cleanup
+        """
+        with span('close_service'):
+            self.close_location_service()
+        if self.tunnel:
+            with span('tunnel.stop'):
+                self.tunnel.stop()
+            self.tunnel = None
+        self.initialized = False
+        self.route_loaded = False
+        logger.info("已清理所有进程和连接 / All processes and connections have been cleaned up")
+
+    def do_status(self, arg):
+        """
+        显示当前状态 / Show current status
+        用法 / Usage: status [--logs [N]]
+        字段说明 / Field description: --logs N - 同时显示隧道进程最近 N 行输出，默认20 / Also show the last N lines of tunnel process output, default 20
+        提示 / Note: 播放指标的导出方式见 'help metrics' / See 'help metrics' for exporting playback metrics
+        """
+        print("\n当前状态 / Current status:")
+        print(f"初始化状态: {'已初始化' if self.initialized else '未初始化'} / Initialization status: {'Initialized' if self.initialized else 'Not initialized'}")
+        print(f"路线加载状态: {'已加载' if self.route_loaded else '未加载'} / Route load status: {'Loaded' if self.route_loaded else 'Not loaded'}")
+        if self.tunnel:
+            latency = f"{self.tunnel.connect_latency:.2f}s" if self.tunnel.connect_latency is not None else "-"
+            print(f"隧道状态: {'正常' if self.tunnel.healthy() else '异常'} / Tunnel health: {'Healthy' if self.tunnel.healthy() else 'Unhealthy'}")
+            print(f"隧道建立耗时: {latency}，自动重启次数: {self.tunnel.restarts} / Tunnel connect latency: {latency}, restarts: {self.tunnel.restarts}")
+        print(f"iOS版本设置: {'iOS 17.4+' if self.is_ios17_plus else 'iOS 16及以下'} / iOS version setting: {'iOS 17.4+' if self.is_ios17_plus else 'iOS 16 and below'}")
+        print(f"已加载坐标点数量: {len(self.coordinates)} / Number of loaded coordinates: {len(self.coordinates)}")
+        if self.metrics_server is not None:
+            print(f"指标端点 / Metrics endpoint: {self.metrics_server.address}")
+        print("\n指标 / Metrics:")
+        print(self.metrics.summary())
+        print()
+
+        tokens = arg.split()
+        if '--logs' in tokens and self.tunnel:
+            position = tokens.index('--logs')
+            count = int(tokens[position + 1]) if position + 1 < len(tokens) and tokens[position + 1].isdigit() else 20
+            for managed in self.tunnel.processes:
+                print(f"--- {managed.name} 最近输出 / recent output ---")
+                print(managed.output.dump(count) or "(无输出 / no output)")
+            print()
+
+    def do_metrics(self, arg):
+        """
+        导出运行指标 / Export runtime metrics
+        用法 / Usage: metrics [--json | --serve [PORT] | --stop]
+        字段说明 / Field description:
+            (无参数 / no option) - 以 Prometheus 文本格式输出 / Print in Prometheus text format
+            --json        - 以 JSON 格式输出 / Print as JSON
+            --serve PORT  - 在 127.0.0.1:PORT 启动HTTP端点（默认9464），路径 /metrics 与 /metrics.json
+                            / Serve /metrics and /metrics.json on 127.0.0.1:PORT (default 9464)
+            --stop        - 停止HTTP端点 / Stop the HTTP endpoint
+        """
+        tokens = arg.split()
+        if not tokens:
+            print(self.metrics.to_prometheus(), end='')
+        elif tokens[0] == '--json':
+            print(json.dumps(self.metrics.snapshot(), indent=2))
+        elif tokens[0] == '--serve':
+            if self.metrics_server is not None:
+                logger.info(f"指标端点已在运行: {self.metrics_server.address} / Metrics endpoint already running: {self.metrics_server.address}")
+                return
+            try:
+                port = int(tokens[1]) if len(tokens) > 1 else DEFAULT_PORT
+                self.metrics_server = MetricsServer(self.metrics, port=port).start()
+            except (ValueError, OSError) as e:
+                logger.error(f"无法启动指标端点: {e} / Failed to start metrics endpoint: {e}")
+                return
+            logger.info(f"指标端点已启动: {self.metrics_server.address} / Metrics endpoint started: {self.metrics_server.address}")
+        elif tokens[0] == '--stop':
+            self.stop_metrics_server()
+        else:
+            logger.error(f"未知选项: {tokens[0]} / Unknown option: {tokens[0]}")
+
+    def do_profile(self, arg):
+        """
+        剖析命令耗时 / Profile command timings
+        用法 / Usage: profile [--cprofile] [command] | profile --on | profile --off
+        字段说明 / Field description:
+            (无参数 / no option) - 显示最近最慢的命令及其主要阶段 / Show the slowest recent commands and their main phases
+            command       - 执行该命令并输出各阶段的墙钟与CPU耗时 / Run the command and print wall and CPU time per phase
+            --cprofile    - 同时将 cProfile 结果写入 profiles/ 目录 / Also write cProfile output to profiles/
+            --on, --off   - 剖析之后的每一条命令（同启动参数 --profile） / Profile every following command (like the --profile option)
+        示例 / Example:
+            profile init --ios17
+            profile --cprofile start data.gpx
+        """
+        words = arg.split()
+        if not words:
+            print(self.profiler.report())
+        elif words == ['--on'] or words == ['--off']:
+            self.profiler.enabled = words[0] == '--on'
+            logger.info(f"逐命令剖析已{'开启' if self.profiler.enabled else '关闭'} / Per-command profiling {'enabled' if self.profiler.enabled else 'disabled'}")
+        elif words[0] == '--cprofile':
+            if len(words) == 1:
+                logger.error("请指定要剖析的命令！ / Please specify a command to profile!")
+                return
+            return self.run_profiled(arg.split(None, 1)[1], use_cprofile=True)
+        elif words[0].startswith('--'):
+            logger.error(f"未知选项: {words[0]} / Unknown option: {words[0]}")
+        else:
+            return self.run_profiled(arg)
+
+    def stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+            logger.info("指标端点已停止 / Metrics endpoint stopped")
+
+    def do_exit(self, arg):
+        """
+        退出程序 / Exit the program
+        用法 / Usage: exit
+        """
+        self.do_cleanup(arg)
+        self.stop_metrics_server()
+        logger.info("退出程序... / Exiting the program...")
+        return True
+
+    # 别名
+    do_quit = do_exit
+    do_EOF = do_exit
+
+def main():
+    parser = argparse.ArgumentParser(description="Campus-Real-Run 命令行 / Campus-Real-Run CLI")
+    parser.add_argument('--connect', action='store_true', help="连接正在运行的后台服务 / Attach to a running daemon")
+    parser.add_argument('--profile', action='store_true', help="剖析每一条命令的各阶段耗时 / Profile the phases of every command")
+    parser.add_argument('--profile-dir', help="同时将 cProfile 结果写入该目录 / Also write cProfile output to this directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    if args.connect:
+        # 作为后台服务的轻量客户端运行，设备连接由 python -m campus_run.daemon 保持
+        from .daemon import connect_main
+        connect_main()
+        return
+    shell = CampusRunShell()
+    shell.profiler.enabled = args.profile or args.profile_dir is not None
+    shell.profiler.output_dir = args.profile_dir
+    try:
+        shell.cmdloop()
+    except KeyboardInterrupt:
+        logger.info("\n程序被中断，正在清理... / Program interrupted, cleaning up...")
+        shell.do_cleanup('')
+        sys.exit(0)
+    except Exception as e:
+        logger.error(f"程序异常终止: {e} / Program terminated with exception: {e}")
+        shell.do_cleanup('')
+        # Show Windows popup
+        if IS_LINUX:
+            sys.exit(1)
+        try:
+            import ctypes
+            ctypes.windll.user32.MessageBoxW(
+                0,
+                f"程序异常终止:\n{e}",
+                "Campus-Real-Run 异常 / Exception",
+                0x10  # MB_ICONERROR
+            )
+        except Exception as popup_err:
+            logger.error(f"无法弹出异常提示窗口: {popup_err}")
+        sys.exit(1)
+        
\ No newline at end of file
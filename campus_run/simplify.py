@@ -0,0 +1,220 @@
+"""轨迹简化与抽稀，在误差允许范围内减少需要写入、解析和推送的坐标点。
+
+提供两种方式：
+
+* ``simplify``: Douglas-Peucker 算法，只保留形状所需的拐点，适合保存和预览，
+  但点与点之间不再是等时间间隔，不能直接按固定频率播放。
+* ``decimate``: 按时间等间隔抽稀，每 factor 个点保留一个，播放时按
+  ``rate / factor`` 重新插值，线性插值与原始点的偏差不超过给定容差。
+
+用法::
+
+    python -m campus_run.simplify data.gpx data_small.gpx --tolerance 0.5
+    python -m campus_run.simplify data.trk data_small.trk --tolerance 0.5 --method dp
+"""
+import argparse
+import math
+
+from .geo import to_local
+from .gpx_io import Coordinates, add_gpx_output_options, load_gpx, open_gpx, write_gpx_points
+from .optional import _numpy
+from .track_format import TRACK_EXTENSION, Track, write_track
+
+DEFAULT_TOLERANCE = 1.0  # 米，与生成路线时的随机浮动同一量级
+
+class SimplifyReport:
+    """简化结果统计。
+
+    Attributes:
+        original (int): 原始点数。
+        kept (int): 保留的点数。
+        max_deviation (float): 被丢弃的点与简化后轨迹的最大偏差，单位为米。
+        factor (int): 抽稀倍数，Douglas-Peucker 时为 None。
+    """
+
+    def __init__(self, original, kept, max_deviation, factor=None):
+        self.original = original
+        self.kept = kept
+        self.max_deviation = max_deviation
+        self.factor = factor
+
+    @property
+    def ratio(self):
+        """保留点数与原始点数之比。"""
+        return self.kept / self.original if self.original else 1.0
+
+    def summary(self):
+        return (f"保留 {self.kept}/{self.original} 个坐标点（减少 {1 - self.ratio:.1%}），最大偏差 {self.max_deviation:.3f} 米 / "
+                f"Kept {self.kept}/{self.original} points ({1 - self.ratio:.1%} fewer), max deviation {self.max_deviation:.3f} m")
+
+def _project(points):
+    """将坐标投影到以首点为原点的局部平面，返回 (xs, ys)。"""
+    origin = None
+    xs, ys = [], []
+    for lat, lon in points:
+        if origin is None:
+            origin = (lat, lon)
+        x, y = to_local(lat, lon, origin)
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+def _select(points, indices):
+    coordinates = Coordinates()
+    coordinates.extend(points[i] for i in indices)
+    return coordinates
+
+def _segment_distance(px, py, ax, ay, bx, by):
+    """点 P 到线段 AB 的距离。"""
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+def simplify(points, tolerance=DEFAULT_TOLERANCE):
+    """Douglas-Peucker 简化。
+
+    使用显式栈代替递归，避免长轨迹超出递归深度。
+
+    Args:
+        points (Sequence): (lat, lon) 序列，如 Coordinates、Track 或 Route.sample() 的结果。
+        tolerance (float): 允许的最大偏差，单位为米。
+
+    Returns:
+        tuple: (Coordinates, SimplifyReport)。
+    """
+    count = len(points)
+    if count < 3:
+        return _select(points, range(count)), SimplifyReport(count, count, 0.0)
+
+    xs, ys = _project(points)
+    keep = bytearray(count)
+    keep[0] = keep[-1] = 1
+    max_deviation = 0.0
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay, bx, by = xs[first], ys[first], xs[last], ys[last]
+        farthest, distance = first, -1.0
+        for i in range(first + 1, last):
+            d = _segment_distance(xs[i], ys[i], ax, ay, bx, by)
+            if d > distance:
+                farthest, distance = i, d
+        if distance > tolerance:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+        elif distance > max_deviation:
+            max_deviation = distance
+
+    indices = [i for i in range(count) if keep[i]]
+    return _select(points, indices), SimplifyReport(count, len(indices), max_deviation)
+
+def _decimation_error(xs, ys, factor):
+    """每 factor 个点保留一个（并保留末点）时，线性插值与原始点的最大偏差。"""
+    np = _numpy()
+    count = len(xs)
+    if np is not None:
+        x, y = np.asarray(xs), np.asarray(ys)
+        index = np.arange(count)
+        a = index // factor * factor
+        b = np.minimum(a + factor, count - 1)
+        span = np.maximum(b - a, 1)
+        t = (index - a) / span
+        return float(np.hypot(x - x[a] - (x[b] - x[a]) * t, y - y[a] - (y[b] - y[a]) * t).max())
+
+    error = 0.0
+    for a in range(0, count - 1, factor):
+        b = min(a + factor, count - 1)
+        ax, ay = xs[a], ys[a]
+        dx, dy = xs[b] - ax, ys[b] - ay
+        span = b - a
+        for i in range(a + 1, b):
+            t = (i - a) / span
+            d = math.hypot(xs[i] - ax - dx * t, ys[i] - ay - dy * t)
+            if d > error:
+                error = d
+    return error
+
+def decimate(points, tolerance=DEFAULT_TOLERANCE, factor=None):
+    """按时间等间隔抽稀。
+
+    偏差按同一时刻的插值位置计算，因此同时约束了形状和速度。未指定 factor 时
+    先倍增再二分，找出偏差不超过 tolerance 的最大倍数。
+
+    Args:
+        points (Sequence): 等时间间隔的 (lat, lon) 序列。
+        tolerance (float): 允许的最大偏差，单位为米。
+        factor (int): 固定的抽稀倍数，指定时忽略 tolerance。
+
+    Returns:
+        tuple: (Coordinates, SimplifyReport)，report.factor 为实际使用的倍数，
+        播放频率应相应除以该倍数。
+    """
+    count = len(points)
+    if count < 3:
+        return _select(points, range(count)), SimplifyReport(count, count, 0.0, 1)
+
+    xs, ys = _project(points)
+    if factor is None:
+        good, error, bad = 1, 0.0, None
+        candidate = 2
+        while candidate < count:
+            candidate_error = _decimation_error(xs, ys, candidate)
+            if candidate_error > tolerance:
+                bad = candidate
+                break
+            good, error = candidate, candidate_error
+            candidate *= 2
+        else:
+            bad = count
+        while bad - good > 1:
+            middle = (good + bad) // 2
+            middle_error = _decimation_error(xs, ys, middle)
+            if middle_error > tolerance:
+                bad = middle
+            else:
+                good, error = middle, middle_error
+        factor = good
+    else:
+        error = _decimation_error(xs, ys, factor)
+
+    indices = list(range(0, count, factor))
+    if indices[-1] != count - 1:
+        indices.append(count - 1)
+    return _select(points, indices), SimplifyReport(count, len(indices), error, factor)
+
+def main():
+    parser = argparse.ArgumentParser(description="轨迹简化与抽稀 / Simplify or decimate a track")
+    parser.add_argument('source', help="输入文件 (.gpx、.gpx.gz 或 .trk) / Input file (.gpx, .gpx.gz or .trk)")
+    parser.add_argument('target', help="输出文件 (.gpx、.gpx.gz 或 .trk) / Output file (.gpx, .gpx.gz or .trk)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="允许的最大偏差（米） / Maximum deviation in metres")
+    parser.add_argument('--method', choices=['decimate', 'dp'], default='decimate',
+                        help="decimate: 等时间间隔抽稀，可直接播放；dp: Douglas-Peucker / "
+                             "decimate: uniform in time, playable; dp: Douglas-Peucker")
+    add_gpx_output_options(parser)
+    args = parser.parse_args()
+
+    if args.source.endswith(TRACK_EXTENSION):
+        with Track(args.source) as track:
+            points = track[:]
+    else:
+        points = load_gpx(args.source)
+    reduce = decimate if args.method == 'decimate' else simplify
+    result, report = reduce(points, args.tolerance)
+
+    if args.target.endswith(TRACK_EXTENSION):
+        with open(args.target, 'wb') as f:
+            write_track(f, result)
+    else:
+        with open_gpx(args.target, 'w') as f:
+            write_gpx_points(f, result, result.bounds, precision=args.precision, compact=args.compact)
+    print(report.summary())
+    if report.factor:
+        print(f"抽稀倍数 {report.factor}，播放频率应除以该倍数 / Decimation factor {report.factor}, divide the playback rate by it")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""紧凑二进制轨迹格式 (.trk)。
+
+文件布局（小端序）：
+    头部 48 字节: magic(4s) version(B) 精度(c: 'd'=float64, 'f'=float32) 保留(2x)
+                 点数(Q) minlat minlon maxlat maxlon(4d)
+    记录区: 每个点为 lat, lon 两个定宽浮点数，按顺序紧密排列
+
+记录定宽，因此可以通过内存映射直接按下标访问任意点，无需解析整个文件。
+"""
+import argparse
+import math
+import mmap
+import struct
+from array import array
+
+from .gpx_io import add_gpx_output_options, iter_trkpts, open_gpx, write_gpx_points
+
+MAGIC = b'CRRT'
+VERSION = 1
+HEADER = struct.Struct('<4sBc2xQ4d')
+TRACK_EXTENSION = '.trk'
+
+def write_track(file, points, precision='d', chunk_points=8192):
+    """将坐标序列流式写为二进制轨迹。
+
+    先写入占位头部，写完所有记录后再回填点数和边界，因此 points 可以是
+    任意长度的生成器。
+
+    Args:
+        file: 以二进制可写、可 seek 方式打开的文件对象。
+        points: (lat, lon) 坐标的可迭代对象。
+        precision (str): 'd' 为 float64，'f' 为 float32。float32 的步长随数值大小变化，
+            在经度 120° 附近约为 7.6e-6°（约 0.75 米），纬度 30° 附近约为 1.9e-6°（约 0.2 米），
+            播放时会带来亚米级的阶梯误差，需要原始精度时应使用 float64。
+        chunk_points (int): 每次写入的点数。
+
+    Returns:
+        int: 写入的点数。
+    """
+    if precision not in ('d', 'f'):
+        raise ValueError(f"不支持的精度: {precision} / Unsupported precision: {precision}")
+
+    start = file.tell()
+    file.write(b'\0' * HEADER.size)
+
+    count = 0
+    minlat = minlon = math.inf
+    maxlat = maxlon = -math.inf
+    buffer = array(precision)
+    for lat, lon in points:
+        buffer.append(lat)
+        buffer.append(lon)
+        if lat < minlat: minlat = lat
+        if lat > maxlat: maxlat = lat
+        if lon < minlon: minlon = lon
+        if lon > maxlon: maxlon = lon
+        count += 1
+        if len(buffer) >= chunk_points * 2:
+            buffer.tofile(file)
+            buffer = array(precision)
+    buffer.tofile(file)
+
+    if count == 0:
+        minlat = minlon = maxlat = maxlon = math.nan
+    end = file.tell()
+    file.seek(start)
+    file.write(HEADER.pack(MAGIC, VERSION, precision.encode(), count, minlat, minlon, maxlat, maxlon))
+    file.seek(end)
+    return count
+
+class Track:
+    """以内存映射方式打开的二进制轨迹，按下标随机访问，不会整体读入内存。
+
+    用法::
+
+        with Track('data.trk') as track:
+            print(len(track), track.bounds)
+            lat, lon = track[100]
+            for lat, lon in track.iter_from(5000):
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"轨迹文件头部不完整: {path} / Truncated track header: {path}")
+            magic, version, precision, count, *bounds = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"不是有效的轨迹文件: {path} / Not a track file: {path}")
+            if version != VERSION:
+                raise ValueError(f"不支持的轨迹版本: {version} / Unsupported track version: {version}")
+            self.precision = precision.decode()
+            self.count = count
+            self.bounds = tuple(bounds)
+
+            item_size = struct.calcsize(self.precision)
+            expected = HEADER.size + count * 2 * item_size
+            self._file.seek(0, 2)
+            if self._file.tell() < expected:
+                raise ValueError(f"轨迹文件记录不完整: {path} / Truncated track records: {path}")
+
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._values = memoryview(self._mmap)[HEADER.size:expected].cast(self.precision)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step > 0:
+                lats = self._values[start * 2:stop * 2:step * 2]
+                lons = self._values[start * 2 + 1:stop * 2 + 1:step * 2]
+            else:
+                lats = [self._values[i * 2] for i in range(start, stop, step)]
+                lons = [self._values[i * 2 + 1] for i in range(start, stop, step)]
+            return list(zip(lats, lons))
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("轨迹下标越界 / Track index out of range")
+        return self._values[index * 2], self._values[index * 2 + 1]
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, index, chunk_points=8192):
+        """从指定下标开始顺序读取坐标，用于续播。
+
+        Args:
+            index (int): 起始点下标。
+            chunk_points (int): 每次从映射中取出的点数。
+
+        Yields:
+            tuple: (lat, lon) 浮点坐标。
+        """
+        for start in range(max(index, 0), self.count, chunk_points):
+            yield from self[start:start + chunk_points]
+
+    def preview(self, max_points=1000):
+        """均匀抽取至多 max_points 个点，用于快速预览。"""
+        step = max(1, math.ceil(self.count / max_points))
+        return self[::step]
+
+    def close(self):
+        if self._values is not None:
+            self._values.release()
+            self._values = None
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_track(path):
+    """内存映射方式打开二进制轨迹文件。"""
+    return Track(path)
+
+def gpx_to_track(gpx_path, track_path, precision='d'):
+    """将GPX文件转换为二进制轨迹，返回写入的点数。"""
+    with open(track_path, 'wb') as f:
+        return write_track(f, iter_trkpts(gpx_path), precision)
+
+def track_to_gpx(track_path, gpx_path, precision=None, compact=False):
+    """将二进制轨迹转换回GPX文件（.gpx 或 .gpx.gz），返回写入的点数。"""
+    with Track(track_path) as track, open_gpx(gpx_path, 'w') as f:
+        return write_gpx_points(f, track, track.bounds if len(track) else None,
+                                precision=precision, compact=compact)
+
+def main():
+    parser = argparse.ArgumentParser(description="GPX 与二进制轨迹互相转换 / Convert between GPX and binary track files")
+    parser.add_argument('source', help="输入文件 (.gpx、.gpx.gz 或 .trk) / Input file (.gpx, .gpx.gz or .trk)")
+    parser.add_argument('target', help="输出文件 / Output file")
+    parser.add_argument('--float32', action='store_true',
+                        help="使用 float32 存储坐标，体积减半，但误差可达亚米级 / Store coordinates as float32, half the size but with sub-metre error")
+    add_gpx_output_options(parser)
+    args = parser.parse_args()
+
+    if args.source.endswith(TRACK_EXTENSION):
+        count = track_to_gpx(args.source, args.target, args.precision, args.compact)
+    else:
+        count = gpx_to_track(args.source, args.target, 'f' if args.float32 else 'd')
+    print(f"已转换 {count} 个坐标点 / Converted {count} points")
+
+if __name__ == '__main__':
+    main()
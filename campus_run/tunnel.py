@@ -0,0 +1,299 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from .profiling import span
+
+logger = logging.getLogger(__name__)
+
+# pymobiledevice3 tunneld 的默认 HTTP 地址
+TUNNELD_URL = 'http://127.0.0.1:49151/'
+
+def kill_subprocess(process):
+    import psutil
+
+    try:
+        parent = psutil.Process(process.pid)
+        for child in parent.children(recursive=True):
+            child.kill()
+        parent.kill()
+    except psutil.NoSuchProcess:
+        pass
+
+def probe_tunneld(url=TUNNELD_URL, timeout=1.0, udid=None, require_device=True):
+    """查询 tunneld 是否已为设备建立隧道。
+
+    Args:
+        url (str): tunneld HTTP 地址。
+        timeout (float): 请求超时（秒）。
+        udid (str): 指定设备时只检查该设备，否则任意设备即可。
+        require_device (bool): 为 False 时只要 tunneld 可访问即视为就绪。
+
+    Returns:
+        bool: tunneld 可访问且已有可用隧道时返回 True。
+    """
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            devices = json.load(response)
+    except (OSError, ValueError):
+        return False
+    if not require_device:
+        return True
+    if udid is not None:
+        return bool(devices.get(udid)) if isinstance(devices, dict) else False
+    return bool(devices)
+
+class OutputRing:
+    """固定容量的子进程输出环形缓冲区，超出容量时丢弃最早的行。
+
+    Args:
+        capacity (int): 最多保留的行数。
+    """
+
+    def __init__(self, capacity=500):
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def append(self, stream, line):
+        with self._lock:
+            self._lines.append((time.time(), stream, line))
+
+    def tail(self, count=None):
+        """返回最近 count 行 (timestamp, stream, line)，默认全部。"""
+        with self._lock:
+            lines = list(self._lines)
+        return lines if count is None else lines[-count:]
+
+    def dump(self, count=None):
+        """格式化为带时间戳的文本，用于打印或写入日志。"""
+        return '\n'.join(f"{time.strftime('%H:%M:%S', time.localtime(ts))} [{stream}] {line}"
+                         for ts, stream, line in self.tail(count))
+
+def drain(pipe, ring, stream):
+    """持续读取子进程管道直到关闭，防止管道写满导致子进程阻塞。"""
+    try:
+        for line in iter(pipe.readline, ''):
+            ring.append(stream, line.rstrip('\n'))
+    except (OSError, ValueError):
+        pass
+    finally:
+        pipe.close()
+
+class ManagedProcess:
+    """由 TunnelSupervisor 管理的子进程。
+
+    Attributes:
+        name (str): 用于日志的名称。
+        command (str): 启动命令。
+        process (subprocess.Popen): 当前进程，未启动时为 None。
+        restarts (int): 被自动重启的次数。
+        started_at (float): 最近一次启动的单调时钟时刻。
+        output (OutputRing): stdout/stderr 的最近输出，跨重启保留。
+    """
+
+    def __init__(self, name, command, output_lines=500):
+        self.name = name
+        self.command = command
+        self.process = None
+        self.restarts = 0
+        self.started_at = None
+        self.output = OutputRing(output_lines)
+        self._drainers = []
+
+    def start(self, spawn):
+        self.process = spawn(self.command)
+        self.started_at = time.monotonic()
+        self._drainers = []
+        for stream in ('stdout', 'stderr'):
+            pipe = getattr(self.process, stream, None)
+            if pipe is not None:
+                thread = threading.Thread(target=drain, args=(pipe, self.output, stream),
+                                          name=f'{self.name}-{stream}', daemon=True)
+                thread.start()
+                self._drainers.append(thread)
+
+    def wait_output(self, timeout=1.0):
+        """进程退出后等待输出读取完毕，以便完整转储。"""
+        for thread in self._drainers:
+            thread.join(timeout)
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.process is not None:
+            kill_subprocess(self.process)
+            self.process.wait()
+            self.process = None
+
+class TunnelSupervisor:
+    """管理 tunneld 与 tunnel 子进程的生命周期。
+
+    启动后轮询 probe 等待隧道就绪（而不是固定 sleep），并在后台线程中定期
+    检查健康状态：进程退出时按指数退避自动重启，探测结果由失败变为成功时视为
+    隧道已重建。同一个监督器在多次 start 之间复用，只有 cleanup 时才会关闭。
+
+    commands 按依赖顺序排列，某个进程退出时其后的进程（如依赖 tunneld 的 tunnel）
+    也一并重启。
+
+    Args:
+        spawn (callable): spawn(command) -> subprocess.Popen，用于启动子进程。
+        commands (list): [(name, command), ...]，按顺序启动。
+        probe (callable): 就绪探测函数，返回 True 表示隧道可用。
+        ready_timeout (float): 等待就绪的最长时间（秒）。
+        probe_interval (float): 健康检查间隔（秒）。
+        max_backoff (float): 重启退避的最长等待时间（秒）。
+        parent (TunnelSupervisor): 所依赖的监督器，其隧道重建后本监督器的进程全部重启。
+    """
+
+    def __init__(self, spawn, commands, probe=probe_tunneld, ready_timeout=30,
+                 probe_interval=5, max_backoff=30, parent=None):
+        self.spawn = spawn
+        self.processes = [ManagedProcess(name, command) for name, command in commands]
+        self.probe = probe
+        self.ready_timeout = ready_timeout
+        self.probe_interval = probe_interval
+        self.max_backoff = max_backoff
+        self.parent = parent
+        # 每次（重新）建立隧道后递增，使用方据此判断已有的设备连接是否需要重建
+        self.generation = 0
+        self.connect_latency = None
+        self.ready_since = None
+        self._down_since = None
+        self._parent_generation = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    @property
+    def restarts(self):
+        return sum(p.restarts for p in self.processes)
+
+    @property
+    def uptime(self):
+        """隧道自最近一次就绪以来的秒数，当前不可用时为 0。"""
+        if self.ready_since is None or not all(p.alive() for p in self.processes):
+            return 0.0
+        return time.monotonic() - self.ready_since
+
+    def start(self):
+        """启动所有子进程并等待隧道就绪。
+
+        Returns:
+            bool: 在 ready_timeout 内就绪返回 True，否则返回 False（进程不会被关闭，
+            调用方可读取其输出后再调用 stop()）。
+        """
+        self.ready_since = None
+        self._down_since = time.monotonic()
+        if self.parent is not None:
+            self._parent_generation = self.parent.generation
+        with self._lock:
+            for managed in self.processes:
+                with span(f'spawn {managed.name}'):
+                    managed.start(self.spawn)
+        with span('wait_ready'):
+            if not self.wait_ready():
+                return False
+
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._run_monitor, name='tunnel-monitor', daemon=True)
+        self._monitor.start()
+        return True
+
+    def wait_ready(self, timeout=None):
+        """轮询直到所有进程存活且探测成功，任一进程退出或超时则返回 False。"""
+        deadline = time.monotonic() + (self.ready_timeout if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            if not all(p.alive() for p in self.processes):
+                return False
+            if self.probe():
+                self._mark_ready()
+                return True
+            if self._stop.wait(0.2):
+                return False
+        return False
+
+    def healthy(self):
+        return all(p.alive() for p in self.processes) and self.probe()
+
+    def _mark_ready(self):
+        """记录隧道由不可用变为就绪，返回是否发生了这一变化。"""
+        with self._lock:
+            if self.ready_since is not None:
+                return False
+            now = time.monotonic()
+            self.connect_latency = now - self._down_since
+            self.ready_since = now
+            self.generation += 1
+            return True
+
+    def _mark_down(self):
+        with self._lock:
+            if self.ready_since is not None:
+                self.ready_since = None
+                self._down_since = time.monotonic()
+
+    def _pending_restarts(self):
+        """返回需要重启的进程：第一个已退出的进程及其后依赖它的进程。"""
+        for position, managed in enumerate(self.processes):
+            if not managed.alive():
+                for dependent in self.processes[position + 1:]:
+                    logger.warning(f"{dependent.name} 依赖的 {managed.name} 已退出，一并重启 / "
+                                   f"{dependent.name} depends on {managed.name}, restarting it too")
+                return self.processes[position:]
+        if self.parent is not None and self.parent.generation != self._parent_generation:
+            logger.warning("依赖的隧道已重建，重启全部进程 / Parent tunnel was re-established, restarting all processes")
+            return self.processes
+        return []
+
+    def _run_monitor(self):
+        backoff = 1
+        while not self._stop.wait(self.probe_interval):
+            with self._lock:
+                pending = self._pending_restarts()
+                for managed in pending:
+                    if not managed.alive():
+                        logger.warning(f"{managed.name} 已退出，{backoff} 秒后重启 / {managed.name} exited, restarting in {backoff}s")
+                        logger.warning(f"{managed.name} 最近输出 / recent output:\n{managed.output.dump(20)}")
+            if not pending:
+                backoff = 1
+                # 进程都存活时，探测结果的变化也意味着隧道断开或（在 wait_ready 超时后）重新就绪
+                if self.probe():
+                    if self._mark_ready():
+                        logger.info(f"隧道已恢复，耗时 {self.connect_latency:.2f} 秒 / Tunnel restored in {self.connect_latency:.2f}s")
+                elif self.ready_since is not None:
+                    logger.warning("隧道探测失败，等待恢复 / Tunnel probe failed, waiting for recovery")
+                    self._mark_down()
+                continue
+
+            self._mark_down()
+            if self._stop.wait(backoff):
+                return
+            with self._lock:
+                for managed in pending:
+                    managed.stop()
+                    managed.start(self.spawn)
+                    managed.restarts += 1
+                if self.parent is not None:
+                    self._parent_generation = self.parent.generation
+            if self.wait_ready():
+                logger.info(f"隧道已恢复，耗时 {self.connect_latency:.2f} 秒 / Tunnel restored in {self.connect_latency:.2f}s")
+                backoff = 1
+            else:
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self):
+        """停止健康检查并关闭所有子进程。"""
+        self._stop.set()
+        self.ready_since = None
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        with self._lock:
+            for managed in self.processes:
+                with span(f'stop {managed.name}'):
+                    managed.stop()
@@ -2,62 +2,46 @@
 # gui_campusrun.py
 
 # Import required libraries
-import importlib.util
-import sys, os, subprocess, threading, io, contextlib, logging
+import sys, os, subprocess, threading, io, contextlib, logging, queue, time
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, scrolledtext
+
+from campus_run.daemon import DaemonClient, DaemonError
+from campus_run.gpx_io import GPXError, load_gpx
+from campus_run.preview import PreviewView, TrackPyramid
+from campus_run.track_format import TRACK_EXTENSION, load_track
+from campus_run.shell import CampusRunShell
 
 ##############################################################################
-# 1. Load main.py dynamically and initialize CampusRunShell
+# 1. Initialize CampusRunShell
 ##############################################################################
-def load_shell_class():
-    # Prompt the user to select the main.py file containing CampusRunShell class
-    path = filedialog.askopenfilename(
-        title="请选择包含 CampusRunShell 的 main.py 文件",
-        filetypes=[("Python file", "*.py")])
-    if not path:
-        messagebox.showerror("未选择文件", "必须选择 main.py 才能继续")
-        sys.exit(1)
-
-    # Dynamically load the selected main.py file
-    spec = importlib.util.spec_from_file_location("campus_main", path)
-    campus_main = importlib.util.module_from_spec(spec)
-    sys.modules["campus_main"] = campus_main
-    spec.loader.exec_module(campus_main)
-
-    # ---------------- Patch 1: Fix undefined 'route_loaded' ---------------- #
-    # The original main.py didn't initialize 'route_loaded' in __init__,
-    # causing AttributeError during 'do_status' or 'do_cleanup' calls.
-    original_init = campus_main.CampusRunShell.__init__
-    def patched_init(self, *args, **kwargs):
-        original_init(self, *args, **kwargs)
-        self.route_loaded = False
-    campus_main.CampusRunShell.__init__ = patched_init
-
-    # ---------------- Patch 2: Cross-platform run_command with output capture -------------- #
-    # The original implementation used 'start cmd /k' on Windows, 
-    # which was platform-dependent and couldn't capture the output.
-    # Here, we replace it with a cross-platform solution.
-    def patched_run_command(self, command, check_output=False):
+class GuiShell(CampusRunShell):
+    # The tunnel processes are started through a shell and have stderr merged
+    # into stdout, so all of their output ends up in one ring buffer that the
+    # 'status --logs' command can show in the GUI.
+    def run_command(self, command, check_output=False):
         try:
             if check_output:
                 return subprocess.check_output(
                     command, shell=True, text=True, stderr=subprocess.STDOUT)
             else:
-                # Return Popen object to handle output in GUI later
                 return subprocess.Popen(
                     command, shell=True, stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT, text=True)
         except subprocess.CalledProcessError as e:
             logging.error(f"命令执行失败: {e}")
             return None
-    campus_main.CampusRunShell.run_command = patched_run_command
 
-    return campus_main.CampusRunShell
+shell = GuiShell()  # Singleton instance for reusing the same connection
+# --profile: print a per-phase timing breakdown after every command
+shell.profiler.enabled = '--profile' in sys.argv[1:]
 
-# Dynamically load and instantiate the patched CampusRunShell class
-ShellClass = load_shell_class()
-shell = ShellClass()  # Singleton instance for reusing the same connection
+# If a background daemon (python -m campus_run.daemon) is running, the GUI is a
+# thin client: every command is forwarded to the daemon, which owns the tunnel
+# and keeps playing after the window is closed.
+daemon = DaemonClient.find()
+if daemon is not None:
+    daemon.close()
 
 ##############################################################################
 # 2. GUI components setup
@@ -69,39 +53,95 @@ root.title("Campus-Real-Run GUI")
 btn_frame = tk.Frame(root)
 btn_frame.pack(side=tk.LEFT, fill=tk.Y, padx=6, pady=6)
 
-# Right-side scrollable output frame
+# Rightmost route preview canvas (wheel: zoom, drag: pan, double-click: fit)
+PREVIEW_SIZE = 420
+preview = tk.Canvas(root, width=PREVIEW_SIZE, height=PREVIEW_SIZE, bg="white", highlightthickness=0)
+preview.pack(side=tk.RIGHT, fill=tk.BOTH, padx=4, pady=4)
+
+# Scrollable output frame between the buttons and the preview
 output = scrolledtext.ScrolledText(root, width=100, height=35, state=tk.DISABLED)
 output.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=4, pady=4)
 
+# Output pipeline: worker threads never touch Tk widgets directly. Everything
+# they print or log goes into a thread-safe queue, which the Tk main loop drains
+# in batches via root.after(). The text widget keeps at most MAX_OUTPUT_LINES
+# lines so long sessions use constant memory.
+MAX_OUTPUT_LINES = 5000
+DRAIN_INTERVAL_MS = 50
+DRAIN_BATCH = 500
+
+output_queue = queue.Queue()
+
+class QueueWriter(io.TextIOBase):
+    """File-like object that forwards everything written to output_queue."""
+    def write(self, text):
+        if text:
+            output_queue.put(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
 # Redirect logs to GUI output
 class TextHandler(logging.Handler):
     def emit(self, record):
-        msg = self.format(record) + "\n"
-        output.configure(state=tk.NORMAL)
-        output.insert(tk.END, msg)
-        output.see(tk.END)
-        output.configure(state=tk.DISABLED)
+        output_queue.put(self.format(record) + "\n")
 
 handler = TextHandler()
 logging.getLogger().addHandler(handler)
 logging.getLogger().setLevel(logging.INFO)
 
-# Capture and display command execution output in the GUI
+def drain_output():
+    """
+    Runs on the Tk main loop: moves up to DRAIN_BATCH queued chunks into the
+    output widget with a single insert, trims old lines, then reschedules itself.
+    """
+    chunks = []
+    try:
+        while len(chunks) < DRAIN_BATCH:
+            chunks.append(output_queue.get_nowait())
+    except queue.Empty:
+        pass
+
+    if chunks:
+        output.configure(state=tk.NORMAL)
+        output.insert(tk.END, "".join(chunks))
+        excess = int(output.index("end-1c").split(".")[0]) - MAX_OUTPUT_LINES
+        if excess > 0:
+            output.delete("1.0", f"{excess + 1}.0")
+        output.see(tk.END)
+        output.configure(state=tk.DISABLED)
+
+    root.after(DRAIN_INTERVAL_MS, drain_output)
+
+# Stream command execution output to the GUI while it runs
 def execute_cmd(cmdline):
     """
     Executes shell.onecmd(cmdline) in a separate background thread,
-    capturing both sys.stdout/sys.stderr and shell.stdout into a buffer.
-    Once complete, the captured output is displayed in the GUI.
+    streaming both sys.stdout/sys.stderr and shell.stdout to the GUI
+    through output_queue as the command runs.
     """
+    def _remote():
+        # One connection per command, so 'stop' or 'status' can be sent
+        # while 'start' is still running on another connection
+        try:
+            client = DaemonClient()
+            try:
+                client.run(cmdline, gui_print)
+            finally:
+                client.close()
+        except (OSError, DaemonError) as e:
+            logging.error(f"无法连接后台服务: {e} / Cannot reach daemon: {e}")
+
     def _worker():
-        buf = io.StringIO()
+        writer = QueueWriter()
         # Backup the original shell.stdout
         orig_shell_stdout = shell.stdout
         try:
-            # Redirect stdout and stderr to the buffer
-            with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
-                # Also redirect shell.stdout to the same buffer
-                shell.stdout = buf
+            # Redirect stdout and stderr to the queue
+            with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+                # Also redirect shell.stdout to the same queue
+                shell.stdout = writer
                 shell.onecmd(cmdline)
         except Exception as e:
             logging.error(e)
@@ -109,18 +149,149 @@ def execute_cmd(cmdline):
             # Restore original shell.stdout
             shell.stdout = orig_shell_stdout
 
-        gui_print(buf.getvalue())
-
-    threading.Thread(target=_worker, daemon=True).start()
+    threading.Thread(target=_remote if daemon is not None else _worker, daemon=True).start()
 
-# Function to insert text into the GUI output box
+# Function to queue text for the GUI output box (safe from any thread)
 def gui_print(text):
     if not text:
         return
-    output.configure(state=tk.NORMAL)
-    output.insert(tk.END, text)
-    output.see(tk.END)
-    output.configure(state=tk.DISABLED)
+    output_queue.put(text)
+
+##############################################################################
+# Route preview
+##############################################################################
+# The level-of-detail pyramid is built in a worker thread and handed to the Tk
+# main loop through preview_results. Each redraw only draws the visible chunks
+# of the coarsest level that is still accurate to about one pixel, so zooming
+# and panning stay smooth even for million-point tracks. The playback marker
+# is moved in place every POSITION_INTERVAL_MS without redrawing the track.
+POSITION_INTERVAL_MS = 50
+MARKER_RADIUS = 5
+
+preview_view = PreviewView(PREVIEW_SIZE, PREVIEW_SIZE)
+preview_results = queue.Queue()
+preview_state = {'pyramid': None, 'path': None, 'pending': False, 'drag': None, 'position': None}
+
+def load_preview(path):
+    """Builds the preview pyramid for path in a background thread."""
+    if path == preview_state['path']:
+        return
+    preview_state['path'] = path
+
+    def _worker():
+        begin = time.perf_counter()
+        try:
+            if path.lower().endswith(TRACK_EXTENSION):
+                with load_track(path) as track:
+                    pyramid = TrackPyramid(track)
+            else:
+                pyramid = TrackPyramid(load_gpx(path))
+        except (GPXError, OSError, ValueError) as e:
+            logging.error(f"无法预览路线: {e} / Cannot preview route: {e}")
+            return
+        elapsed = time.perf_counter() - begin
+        gui_print(f"路线预览已就绪：{len(pyramid)} 个点，{len(pyramid.levels)} 级，耗时 {elapsed:.2f} 秒 / "
+                  f"Preview ready: {len(pyramid)} points, {len(pyramid.levels)} levels in {elapsed:.2f}s\n")
+        preview_results.put((path, pyramid))
+
+    threading.Thread(target=_worker, daemon=True).start()
+
+def redraw_preview():
+    preview_state['pending'] = False
+    preview.delete('track')
+    pyramid = preview_state['pyramid']
+    if pyramid is None:
+        return
+    for xs, ys in pyramid.polylines(preview_view.scale, preview_view.viewport()):
+        if len(xs) >= 2:
+            preview.create_line(preview_view.flatten(xs, ys), fill="#1f77b4", tags='track')
+    x, y = preview_view.to_pixels(0.0, 0.0)  # Start point is the projection origin
+    preview.create_oval(x - 3, y - 3, x + 3, y + 3, outline="#2ca02c", width=2, tags='track')
+    preview.tag_raise('marker')
+    update_marker()
+
+def schedule_redraw(event=None):
+    # Coalesce bursts of wheel/drag events into one redraw per idle cycle
+    if not preview_state['pending']:
+        preview_state['pending'] = True
+        root.after_idle(redraw_preview)
+
+def update_marker():
+    pyramid = preview_state['pyramid']
+    point = preview_state['position']
+    if pyramid is None or point is None:
+        preview.itemconfigure('marker', state=tk.HIDDEN)
+        return
+    x, y = preview_view.to_pixels(*pyramid.project(*point))
+    preview.coords('marker', x - MARKER_RADIUS, y - MARKER_RADIUS, x + MARKER_RADIUS, y + MARKER_RADIUS)
+    preview.itemconfigure('marker', state=tk.NORMAL)
+
+def poll_daemon_position():
+    """Daemon mode: keeps preview_state['position'] up to date over one connection."""
+    client = None
+    while True:
+        try:
+            if client is None:
+                client = DaemonClient()
+            preview_state['position'] = client.call('ping').get('position')
+        except (OSError, DaemonError):
+            if client is not None:
+                client.close()
+            client = None
+            preview_state['position'] = None
+            time.sleep(1.0)
+        time.sleep(POSITION_INTERVAL_MS / 1000)
+
+def poll_preview():
+    try:
+        while True:
+            path, pyramid = preview_results.get_nowait()
+            if path == preview_state['path']:
+                preview_state['pyramid'] = pyramid
+                preview_view.fit(pyramid.bounds)
+                schedule_redraw()
+    except queue.Empty:
+        pass
+    if daemon is None:
+        pipeline = shell.pipeline
+        preview_state['position'] = pipeline.last_point if pipeline is not None else None
+    update_marker()
+    root.after(POSITION_INTERVAL_MS, poll_preview)
+
+def on_preview_resize(event):
+    preview_view.resize(event.width, event.height)
+    schedule_redraw()
+
+def on_preview_wheel(event):
+    if getattr(event, 'num', None) == 5 or event.delta < 0:
+        preview_view.zoom(1 / 1.25, event.x, event.y)
+    else:
+        preview_view.zoom(1.25, event.x, event.y)
+    schedule_redraw()
+
+def on_preview_press(event):
+    preview_state['drag'] = (event.x, event.y)
+
+def on_preview_drag(event):
+    last = preview_state['drag']
+    if last is not None:
+        preview_view.pan(event.x - last[0], event.y - last[1])
+        preview_state['drag'] = (event.x, event.y)
+        schedule_redraw()
+
+def on_preview_fit(event):
+    if preview_state['pyramid'] is not None:
+        preview_view.fit(preview_state['pyramid'].bounds)
+        schedule_redraw()
+
+preview.create_oval(0, 0, 0, 0, fill="#d62728", outline="", state=tk.HIDDEN, tags='marker')
+preview.bind("<Configure>", on_preview_resize)
+preview.bind("<MouseWheel>", on_preview_wheel)                  # Windows / macOS
+preview.bind("<Button-4>", on_preview_wheel)                    # Linux scroll up
+preview.bind("<Button-5>", on_preview_wheel)                    # Linux scroll down
+preview.bind("<ButtonPress-1>", on_preview_press)
+preview.bind("<B1-Motion>", on_preview_drag)
+preview.bind("<Double-Button-1>", on_preview_fit)
 
 # Function to display the help panel with command buttons
 def open_help_panel():
@@ -129,8 +300,8 @@ def open_help_panel():
     triggers execute_cmd(f"help {cmd}") to show specific help details.
     """
     cmds = [
-        "init", "start", "check_dev_mode_status", "enable_dev_mode",
-        "cleanup", "status", "exit", "quit", "EOF", "help"
+        "init", "start", "stop", "check_dev_mode_status", "enable_dev_mode",
+        "cleanup", "status", "profile", "exit", "quit", "EOF", "help"
     ]
 
     panel = tk.Toplevel(root)
@@ -165,18 +336,33 @@ def check_dev():
 def start_gpx():
     # Allow user to select GPX file and start command with the selected file
     gpx = filedialog.askopenfilename(
-        title="选择 GPX 文件", filetypes=[("GPX files", "*.gpx")])
+        title="选择 GPX 文件", filetypes=[("GPX files", "*.gpx *.gpx.gz"), ("Track files", "*.trk")])
     if gpx:
+        load_preview(gpx)
         execute_cmd(f"start {gpx}")
 
+def preview_gpx():
+    gpx = filedialog.askopenfilename(
+        title="选择 GPX 文件", filetypes=[("GPX files", "*.gpx *.gpx.gz"), ("Track files", "*.trk")])
+    if gpx:
+        load_preview(gpx)
+
+def stop():
+    execute_cmd("stop")
+
 def status():
     execute_cmd("status")
 
+def profile():
+    execute_cmd("profile")   # Slowest recent commands
+
 def cleanup():
     execute_cmd("cleanup")
 
 def exit_app():
-    cleanup()
+    # In daemon mode the daemon keeps the connection; only close the window
+    if daemon is None:
+        cleanup()
     root.quit()
 
 ##############################################################################
@@ -189,8 +375,11 @@ btn_specs = [
     ("Help", show_help),
     ("Enable Dev-Mode", enable_dev),
     ("Check Dev-Mode", check_dev),
+    ("Preview GPX", preview_gpx),
     ("Start GPX", start_gpx),
+    ("Stop", stop),
     ("Status", status),
+    ("Profile", profile),
     ("Clean Up", cleanup),
     ("Exit", exit_app),
 ]
@@ -199,5 +388,12 @@ btn_specs = [
 for txt, fn in btn_specs:
     tk.Button(btn_frame, text=txt, width=18, command=fn).pack(fill=tk.X, pady=2)
 
-# Start the main loop for the GUI
+if daemon is not None:
+    root.title("Campus-Real-Run GUI (daemon)")
+    gui_print(f"已连接后台服务 / Attached to daemon at {daemon.host}:{daemon.port}\n")
+    threading.Thread(target=poll_daemon_position, daemon=True).start()
+
+# Start draining queued output and polling the preview, then the main loop for the GUI
+root.after(DRAIN_INTERVAL_MS, drain_output)
+root.after(POSITION_INTERVAL_MS, poll_preview)
 root.mainloop()
@@ -1,124 +1,6 @@
-import math
-import random
-
-def generate_gpx(points, round_count, fluctuation_range,speed):
-    """生成GPX文件的主要函数。
-
-    Args:
-        points (list): 各坐标点列表。
-        round_count (int): GPX路径需要重复的圈数。
-        fluctuation_range (float): 坐标的随机浮动范围，单位为米。
-    """
-    def add_fluctuation(value, fluctuation_range):
-        """为坐标点添加随机浮动。
-
-        Args:
-            value (float): 原始坐标点。
-            fluctuation_range (float): 浮动范围。
-
-        Returns:
-            float: 添加浮动后的坐标点。
-        """
-        return value + (random.uniform(-fluctuation_range, fluctuation_range) / 111000)
-    
-    coordinate_spacing = speed/20/111000 # 计算坐标间隔经纬度
-    # 提取初始坐标和边界值
-    lon, lat = points[0][1], points[0][0]
-    minlat = min(points, key=lambda x: x[0])[0]
-    minlon = min(points, key=lambda x: x[1])[1]
-    maxlat = max(points, key=lambda x: x[0])[0]
-    maxlon = max(points, key=lambda x: x[1])[1]
-
-    # GPX文件头部和尾部
-    gpx_header = f'''<?xml version="1.0"?>
-<gpx version="1.1" creator="GDAL 2.2.2" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:ogr="http://osgeo.org/gdal" xmlns="http://www.topografix.com/GPX/1/1" xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd">
-<metadata><bounds minlat="{minlat}" minlon="{minlon}" maxlat="{maxlat}" maxlon="{maxlon}"/></metadata>'''
-    gpx_footer = '</gpx>'
-    gpx_body = ''
-
-    for _ in range(round_count):
-        # 提取坐标点
-        lat0, lon0 = points[0]
-        lat1, lon1 = points[1]
-        lat2, lon2 = points[2]
-
-        # 生成从点0到点1的直线段
-        distance_straight = math.hypot(lat1 - lat0, lon1 - lon0)
-        num_points_straight = int(distance_straight / coordinate_spacing)
-        lat_step = (lat1 - lat0) / num_points_straight
-        lon_step = (lon1 - lon0) / num_points_straight
-
-        gpx_body += '''
-    <trk>
-      <trkseg>'''
-        for i in range(num_points_straight + 1):
-            lat = lat0 + lat_step * i
-            lon = lon0 + lon_step * i
-            lat = add_fluctuation(lat, fluctuation_range)
-            lon = add_fluctuation(lon, fluctuation_range)
-            gpx_body += f'''
-        <trkpt lat="{lat}" lon="{lon}">
-        </trkpt>'''
-
-        # 生成从点1到点2的弯曲段
-        center_lat = (lat1 + lat2) / 2
-        center_lon = (lon1 + lon2) / 2
-        radius = math.hypot(lat1 - center_lat, lon1 - center_lon)
-        num_points_curve = int((math.pi * radius) / coordinate_spacing)
-        begin_angle = math.atan2(lat0 - lat1, -lon0 + lon1)
-
-        for i in range(num_points_curve + 1):
-            angle = math.pi * (1 - i / num_points_curve) + begin_angle
-            lat = center_lat + radius * math.cos(angle)
-            lon = center_lon + radius * math.sin(angle)
-            lat = add_fluctuation(lat, fluctuation_range)
-            lon = add_fluctuation(lon, fluctuation_range)
-            gpx_body += f'''
-        <trkpt lat="{lat}" lon="{lon}">
-        </trkpt>'''
-
-        gpx_body += '''
-      </trkseg>
-    </trk>'''
-
-        # 再次生成直线段
-        gpx_body += '''
-    <trk>
-        <trkseg>'''
-        for i in range(num_points_straight + 1):
-            lat = lat2 - lat_step * i
-            lon = lon2 - lon_step * i
-            lat = add_fluctuation(lat, fluctuation_range)
-            lon = add_fluctuation(lon, fluctuation_range)
-            gpx_body += f'''
-        <trkpt lat="{lat}" lon="{lon}">
-        </trkpt>'''
-        gpx_body += '''
-        </trkseg>
-    </trk>'''
-
-        # 再次生成弯曲段
-        center_lat = (lat + lat0) / 2
-        center_lon = (lon + lon0) / 2
-        gpx_body += '''
-    <trk>
-        <trkseg>'''
-        for i in range(num_points_curve + 1):
-            angle = math.pi * (1 - i / num_points_curve) + begin_angle
-            lat = center_lat - radius * math.cos(angle)
-            lon = center_lon - radius * math.sin(angle)
-            lat = add_fluctuation(lat, fluctuation_range)
-            lon = add_fluctuation(lon, fluctuation_range)
-            gpx_body += f'''
-        <trkpt lat="{lat}" lon="{lon}">
-        </trkpt>'''
-
-        gpx_body += '''
-        </trkseg>
-    </trk>'''
-
-    full_gpx = gpx_header + gpx_body + gpx_footer
-    return full_gpx
+from campus_run.cache import RouteCache
+from campus_run.generate import write_gpx, write_polygon_gpx
+from campus_run.gpx_io import open_gpx, write_gpx_points
 
 def main():
     points = []
@@ -139,10 +21,25 @@ def main():
     fluctuation_range = 0.5  # GPS浮动（米）
     # coordinate_spacing = 0.2 # 坐标间隔（米）
     speed = 3 # 速度（米每秒）
-    result = generate_gpx(points, round_count, fluctuation_range,speed)
-    
-    file_extension = 'gpx'
-    with open(f'data.{file_extension}', 'w') as f:
-        f.write(result)
-
-main()
+    precision = None # 坐标保留的小数位数，None 为完整精度，7 位约 1 厘米
+    compact = False # 使用单行自闭合的 <trkpt/> 元素
+    file_extension = 'gpx' # 改为 'gpx.gz' 可边生成边压缩
+    # 拐角样式：None 为上面三点定义的操场；'sharp'、'arc' 或 'spline' 时将 points 视为
+    # 任意 N 个控制点围成的闭合路线（可继续 append 更多控制点）
+    corners = None
+    corner_radius = 10 # 'arc' 拐角的半径（米）
+    # 随机种子：设置后相同参数总是生成相同路线，并复用 ~/.cache/campus_run/routes 中已生成的结果
+    seed = None
+    with open_gpx(f'data.{file_extension}', 'w') as f:
+        if seed is not None:
+            with RouteCache().get(points, round_count, fluctuation_range, speed, seed,
+                                  corners=corners, radius=corner_radius) as track:
+                write_gpx_points(f, track, track.bounds, precision=precision, compact=compact)
+        elif corners is None:
+            write_gpx(f, points, round_count, fluctuation_range, speed, precision=precision, compact=compact)
+        else:
+            write_polygon_gpx(f, points, round_count, fluctuation_range, speed, corners, corner_radius,
+                              precision=precision, compact=compact)
+
+if __name__ == '__main__':
+    main()